@@ -0,0 +1,89 @@
+"""Проверка пакетной обработки (Batch API) в текстовом и JSON-формате ответа без обращения к сети
+
+Документы из --data извлекаются и очищаются, затем process_documents_batch отправляет их фрагменты в локальную
+замену Batch API (LocalBatchBackend), и результаты сохраняет DataSaver. Работа идет во временной папке, поэтому
+results/, batches/ и база терминов проекта не меняются. Для каждого формата выводятся время, количество терминов
+и сохраненных файлов; если документ не обработан или результат не сохранен, команда завершается с кодом 1.
+
+Запуск из корня проекта: python -m benchmarks.bench_batch_api [--data data] [--formats text,json] [--limit 3]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import contextlib  # Модуль для подавления вывода обработки
+import io  # Модуль для буфера вывода
+import os  # Модуль для работы с файловой системой
+import shutil  # Модуль для удаления временной папки
+import sys  # Модуль для кода завершения при ошибке
+import tempfile  # Модуль для временной папки
+import time  # Модуль для замера времени
+
+from modules.ai_processor import AIProcessor
+from modules.batch_backend import LocalBatchBackend
+from modules.data_saver import DataSaver
+from modules.text_cleaner import TextCleaner
+from modules.text_extractor import TextExtractor
+
+SUPPORTED_FORMATS = ('.pdf', '.doc', '.docx')  # Форматы документов, как в пакетной обработке
+
+def load_documents(data_dir, limit):
+    """Очищенный текст документов папки: {имя файла: текст}"""
+    extractor = TextExtractor(TextCleaner())
+    documents = {}
+    for name in sorted(os.listdir(data_dir)):
+        if not name.lower().endswith(SUPPORTED_FORMATS) or len(documents) >= limit:
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = extractor.extract_clean_text(os.path.join(data_dir, name))
+        if text:
+            documents[name] = text
+    return documents
+
+def run_format(output_format, documents, model, domain):
+    """Пакетная обработка документов в заданном формате ответа: (время, результаты, сохраненные файлы)"""
+    processor = AIProcessor()
+    processor.model_name = model
+    processor.output_format = output_format
+    processor.response_cache.enabled = False  # Каждый формат обрабатывается полностью
+    data_saver = DataSaver()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged = processor.process_documents_batch(documents, domain, backend=LocalBatchBackend(), data_saver=data_saver)
+    elapsed = time.perf_counter() - start
+    saved = [name for name in os.listdir(data_saver.directories['csv']) if name.startswith('terms_')]
+    return elapsed, merged, saved
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка Batch API в текстовом и JSON-формате ответа")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--formats', default='text,json', help="Форматы ответа через запятую")
+    parser.add_argument('--model', default='gpt-4o', help="Модель ИИ")
+    parser.add_argument('--domain', default='БАС', help="Предметная область")
+    parser.add_argument('--limit', type=int, default=3, help="Максимальное количество документов")
+    args = parser.parse_args()
+
+    os.environ.setdefault('OPENAI_API_KEY', 'local')  # Клиент OpenAI создается, но к сети не обращается
+    documents = load_documents(args.data, args.limit)
+    if not documents:
+        print(f"В папке {args.data} нет документов")
+        sys.exit(1)
+
+    root = os.getcwd()
+    failed = False
+    print(f"\nДокументов: {len(documents)}")
+    print(f"{'Формат':<8}{'Время, с':>10}{'Терминов':>10}{'Сохранено':>11}  Ошибки")
+    for output_format in args.formats.split(','):
+        workdir = tempfile.mkdtemp()
+        try:
+            os.chdir(workdir)  # DataSaver, кэш и пакеты работают с папками в текущей папке
+            elapsed, merged, saved = run_format(output_format, documents, args.model, args.domain)
+        finally:
+            os.chdir(root)
+            shutil.rmtree(workdir, ignore_errors=True)
+        errors = [name for name, result in merged.items() if not result or AIProcessor.is_error_result(result)]
+        terms = sum(len(result) if isinstance(result, list) else result.count("Термин:")
+                    for name, result in merged.items() if name not in errors)
+        failed = failed or bool(errors) or len(saved) != len(documents)
+        print(f"{output_format:<8}{elapsed:>10.2f}{terms:>10}{len(saved):>11}  {', '.join(errors) or '-'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
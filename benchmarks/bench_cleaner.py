@@ -0,0 +1,182 @@
+"""Бенчмарк очистки текста: скомпилированные объединенные этапы TextCleaner против прежней последовательности re.sub
+
+Проверяет, что результат clean_text и clean_and_log совпадает побайтно с прежней реализацией и с эталонными хешами
+(benchmarks/golden/cleaner.json), что потоковая очистка iter_clean частями по STREAM_BLOCK символов дает тот же
+текст, что и clean_text, и выводит время каждого этапа очистки. Граничные случаи потоковой очистки (имена и рисунки
+на стыке частей) хранятся в том же файле под ключом STREAMING_KEY.
+
+Запуск из корня проекта: python -m benchmarks.bench_cleaner [--data data] [--repeat 5] [--update-golden]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import contextlib  # Модуль для подавления вывода очистителя
+import hashlib  # Модуль для вычисления эталонных хешей
+import io  # Модуль для буфера вывода
+import json  # Модуль для работы с эталонным файлом
+import os  # Модуль для работы с файловой системой
+import re  # Модуль регулярных выражений (прежняя реализация)
+import sys  # Модуль для кода завершения при расхождении
+import time  # Модуль для замера времени
+
+from modules.text_cleaner import TextCleaner
+from modules.text_extractor import TextExtractor
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'golden', 'cleaner.json')
+STREAMING_KEY = '_streaming'  # Граничные случаи потоковой очистки: [{'name', 'blocks', 'clean_text'}]
+STREAM_BLOCK = 2000  # Размер части документа для проверки потоковой очистки (границы не совпадают с концами строк)
+
+LEGACY_PATTERNS = {
+    'literature': r'(?i)(Литература.*|Список.*литературы.*|Библиографический список.*|References.*)',
+    'figures': r'(?i)Рисунок\s+\d+.*?\.|Рис\.\s*\d+.*?\.',
+    'names': r'\b[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.|[А-ЯЁ]\.\s*[А-ЯЁ]\.\s+[А-ЯЁ][а-яё]+|[А-ЯЁ][а-яё]+\s+и\s+[А-ЯЁ][а-яё]+',
+    'special_chars': r'[^\w\s.,!?;:()\-\"«»]',
+    'multiple_spaces': r'\s+',
+    'multiple_punctuation': r'\.{2,}|,{2,}|!{2,}|\?{2,}|;{2,}',
+    'spaces_before_punctuation': r'\s+([.,!?;:])',
+    'empty_lines': r'\n\s*\n',
+    'dashes_underscores': r'[-_]+',
+}
+
+def legacy_clean_text(text):
+    """Прежняя реализация clean_text: девять вызовов re.sub и шесть замен str.replace"""
+    text = re.split(LEGACY_PATTERNS['literature'], text)[0]
+    text = re.sub(LEGACY_PATTERNS['figures'], '', text)
+    text = re.sub(LEGACY_PATTERNS['names'], '', text)
+    text = re.sub(LEGACY_PATTERNS['dashes_underscores'], ' ', text)
+    text = re.sub(LEGACY_PATTERNS['special_chars'], ' ', text)
+    text = re.sub(LEGACY_PATTERNS['multiple_punctuation'], lambda m: m.group()[0], text)
+    text = re.sub(LEGACY_PATTERNS['spaces_before_punctuation'], r'\1', text)
+    text = re.sub(LEGACY_PATTERNS['multiple_spaces'], ' ', text)
+    text = re.sub(LEGACY_PATTERNS['empty_lines'], '\n', text)
+    for punctuation in ',.!?;:':
+        text = text.replace(' ' + punctuation, punctuation)
+    return text.strip()
+
+def legacy_clean_and_log(text):
+    """Прежняя реализация clean_and_log: пять этапов, затем полный повтор clean_text"""
+    text = re.split(LEGACY_PATTERNS['literature'], text)[0]
+    text = re.sub(LEGACY_PATTERNS['figures'], '', text)
+    text = re.sub(LEGACY_PATTERNS['names'], '', text)
+    text = re.sub(LEGACY_PATTERNS['dashes_underscores'], ' ', text)
+    text = re.sub(LEGACY_PATTERNS['special_chars'], ' ', text)
+    return legacy_clean_text(text)
+
+def digest(text):
+    """Эталонный хеш текста"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def load_documents(data_dir, extractor):
+    """Извлеченный (неочищенный) текст всех поддерживаемых файлов папки"""
+    documents = {}
+    for name in sorted(os.listdir(data_dir)):
+        if not name.lower().endswith(('.pdf', '.docx')):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw_text = extractor.extract_raw_text(os.path.join(data_dir, name))
+        if raw_text:
+            documents[name] = raw_text
+    return documents
+
+def stream_clean(cleaner, blocks):
+    """Результат потоковой очистки, склеенный в одну строку"""
+    return ''.join(cleaner.iter_clean(blocks))
+
+def check_streaming_cases(cleaner, cases):
+    """Граничные случаи потоковой очистки: количество расхождений с эталоном"""
+    failed = 0
+    for case in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            full_text = cleaner.clean_text(''.join(case['blocks']))
+        streamed = stream_clean(cleaner, case['blocks'])
+        ok = full_text == case['clean_text'] and streamed == case['clean_text']
+        failed += not ok
+        print(f"{case['name'][:40]:<42}{'да' if ok else 'НЕТ':>11}")
+        if not ok:
+            print(f"  ожидается: {case['clean_text']!r}\n  clean_text: {full_text!r}\n  iter_clean: {streamed!r}")
+    return failed
+
+def measure(clean, text, repeat):
+    """Лучшее время из нескольких запусков и результат очистки"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = clean(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение скорости и результата очистки текста")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--repeat', type=int, default=5, help="Количество повторов каждого замера")
+    parser.add_argument('--update-golden', action='store_true', help="Перезаписать эталонные хеши по прежней реализации")
+    args = parser.parse_args()
+
+    cleaner = TextCleaner()
+    documents = load_documents(args.data, TextExtractor(cleaner))
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, 'r', encoding='utf-8') as file:
+            golden = json.load(file)
+    streaming_cases = golden.get(STREAMING_KEY, [])  # Граничные случаи задаются вручную и при обновлении сохраняются
+    if args.update_golden:
+        golden = {}
+
+    print(f"\n{'Файл':<24}{'Символов':>10}{'Старый, с':>12}{'Новый, с':>12}{'Ускорение':>11}{'Совпадает':>11}{'Эталон':>9}{'Поток':>7}")
+    total_legacy = total_new = 0.0
+    mismatches = 0
+    timings = {}
+    new_golden = {}
+    for name, text in documents.items():
+        legacy_time, legacy_text = measure(legacy_clean_text, text, args.repeat)
+        new_time, new_text = measure(cleaner.clean_text, text, args.repeat)
+        _, legacy_logged = measure(legacy_clean_and_log, text, 1)
+        _, new_logged = measure(cleaner.clean_and_log, text, 1)
+        for _ in range(args.repeat):
+            cleaner.apply_patterns(text, timings=timings)
+        total_legacy += legacy_time
+        total_new += new_time
+
+        same = new_text == legacy_text and new_logged == legacy_logged
+        streamed_ok = stream_clean(cleaner, [text[i:i + STREAM_BLOCK] for i in range(0, len(text), STREAM_BLOCK)]) == new_text
+        same = same and streamed_ok
+        new_golden[name] = {'raw': digest(text), 'clean_text': digest(legacy_text), 'clean_and_log': digest(legacy_logged)}
+        expected = golden.get(name)
+        if expected is None:
+            golden_status = '-'
+        elif expected['raw'] != digest(text):
+            golden_status = 'другой файл'
+        else:
+            golden_ok = expected['clean_text'] == digest(new_text) and expected['clean_and_log'] == digest(new_logged)
+            golden_status = 'да' if golden_ok else 'НЕТ'
+            same = same and golden_ok
+        mismatches += not same
+        speedup = legacy_time / new_time if new_time else float('inf')
+        print(f"{name[:23]:<24}{len(text):>10}{legacy_time:>12.4f}{new_time:>12.4f}{speedup:>10.1f}x"
+              f"{'да' if same else 'НЕТ':>11}{golden_status:>9}{'да' if streamed_ok else 'НЕТ':>7}")
+    if total_new:
+        print(f"\nИтого: старый {total_legacy:.4f} с, новый {total_new:.4f} с, ускорение {total_legacy / total_new:.1f}x")
+
+    total_rules = sum(timings.values())
+    if total_rules:
+        print(f"\n{'Этап':<24}{'Время, с':>12}{'Доля':>8}")
+        for name, _ in cleaner.rules:
+            seconds = timings.get(name, 0.0) / args.repeat
+            print(f"{name:<24}{seconds:>12.4f}{timings.get(name, 0.0) / total_rules:>8.0%}")
+
+    if streaming_cases:
+        print(f"\n{'Граничный случай потоковой очистки':<42}{'Совпадает':>11}")
+        mismatches += check_streaming_cases(cleaner, streaming_cases)
+
+    if args.update_golden:
+        new_golden[STREAMING_KEY] = streaming_cases
+        os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as file:
+            json.dump(new_golden, file, ensure_ascii=False, indent=2)
+        print(f"\nЭталонные хеши сохранены: {GOLDEN_PATH}")
+    if mismatches:
+        print(f"\nРезультат очистки отличается от прежней реализации: {mismatches} файлов")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
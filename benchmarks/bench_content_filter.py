@@ -0,0 +1,84 @@
+"""Бенчмарк фильтра содержимого: токены и фрагменты до и после удаления колонтитулов, оглавления и таблиц с числами
+
+Полнота проверяется по эталонным терминам reference_terms/: термин считается доступным ИИ, если он встречается
+в очищенном тексте (без учета регистра). Фильтр не должен уменьшать количество доступных терминов.
+
+Запуск из корня проекта: python -m benchmarks.bench_content_filter [--data data] [--max-tokens 4000] [--show 5]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import contextlib  # Модуль для подавления вывода извлечения и очистки
+import io  # Модуль для буфера вывода
+import os  # Модуль для работы с файловой системой
+import sys  # Модуль для кода завершения при потере терминов
+
+from modules.content_filter import ContentFilter
+from modules.text_cleaner import TextCleaner
+from modules.text_extractor import TextExtractor
+from modules.token_splitter import TokenSplitter
+
+def load_reference(name, reference_dir):
+    """Эталонные термины документа в нижнем регистре"""
+    path = os.path.join(reference_dir, f"{os.path.splitext(name)[0]}.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as file:
+        return sorted({line.strip().lower() for line in file if line.strip()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Оценка фильтра содержимого: сэкономленные токены и полнота")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--reference', default='reference_terms', help="Папка с эталонными терминами")
+    parser.add_argument('--model', default='gpt-4o', help="Модель, для которой считаются токены")
+    parser.add_argument('--max-tokens', type=int, default=4000, help="Максимальный размер фрагмента в токенах")
+    parser.add_argument('--show', type=int, default=0, help="Сколько удаленных строк каждого вида показать")
+    args = parser.parse_args()
+
+    cleaner = TextCleaner()
+    extractor = TextExtractor(cleaner)
+    content_filter = ContentFilter(model_name=args.model)
+    splitter = TokenSplitter(args.model)
+
+    print(f"\n{'Файл':<16}{'Токенов':>9}{'После':>8}{'Экономия':>10}{'Фрагм.':>8}{'После':>7}"
+          f"{'Колонт.':>9}{'Оглавл.':>9}{'Таблицы':>9}{'Термины':>9}{'После':>7}")
+    total_before = total_after = lost_total = 0
+    for name in sorted(os.listdir(args.data)):
+        if not name.lower().endswith(('.pdf', '.docx')):
+            continue
+        file_path = os.path.join(args.data, name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw_text = extractor.extract_raw_text(file_path)
+            page_offsets = extractor.get_page_offsets(file_path)
+        if not raw_text:
+            continue
+        filtered_text, report = content_filter.filter(raw_text, page_offsets)
+        before = cleaner.apply_patterns(raw_text)
+        after = cleaner.apply_patterns(filtered_text)
+        tokens_before, tokens_after = splitter.count_tokens(before), splitter.count_tokens(after)
+        chunks_before, chunks_after = len(splitter.split(before, args.max_tokens)), len(splitter.split(after, args.max_tokens))
+        terms = load_reference(name, args.reference)
+        found_before = [term for term in terms if term in before.lower()]
+        found_after = [term for term in found_before if term in after.lower()]
+        lost = [term for term in found_before if term not in found_after]
+        lost_total += len(lost)
+        total_before += tokens_before
+        total_after += tokens_after
+        saving = 1 - tokens_after / tokens_before if tokens_before else 0
+        print(f"{name[:15]:<16}{tokens_before:>9}{tokens_after:>8}{saving:>9.1%}{chunks_before:>8}{chunks_after:>7}"
+              f"{report['lines']['repeated']:>9}{report['lines']['toc']:>9}{report['lines']['low_density']:>9}"
+              f"{len(found_before):>9}{len(found_after):>7}")
+        if lost:
+            print(f"  потеряны термины: {', '.join(lost)}")
+        if args.show:
+            offsets = list(page_offsets or [0]) + [len(raw_text)]
+            _, removed = content_filter.filter_pages([raw_text[start:end] for start, end in zip(offsets, offsets[1:])])
+            for reason, lines in removed.items():
+                for line in lines[:args.show]:
+                    print(f"    {reason:<12}{line.strip()[:100]}")
+    if total_before:
+        print(f"\nИтого: {total_before} -> {total_after} токенов, экономия {1 - total_after / total_before:.1%}, "
+              f"потеряно эталонных терминов: {lost_total}")
+    if lost_total:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
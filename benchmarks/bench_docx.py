@@ -0,0 +1,105 @@
+"""Бенчмарк чтения .docx: потоковый разбор word/document.xml против объектной модели python-docx
+
+Сравнивает время, прирост пиковой памяти процесса и полноту текста: все абзацы python-docx должны найтись
+в тексте потокового чтения, который дополнительно содержит таблицы, элементы управления содержимым и сноски.
+С параметром --scale N дополнительно измеряется документ, тело которого повторено N раз.
+
+Запуск из корня проекта: python -m benchmarks.bench_docx [--data data] [--repeat 3] [--scale 10]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import os  # Модуль для работы с файловой системой
+import re  # Модуль для поиска тела документа при масштабировании
+import resource  # Модуль для замера пиковой памяти процесса (Linux, macOS)
+import tempfile  # Модуль для временного масштабированного документа
+import time  # Модуль для замера времени
+import zipfile  # Модуль для сборки масштабированного документа
+from concurrent.futures import ProcessPoolExecutor  # Отдельный процесс для замера пиковой памяти
+
+import docx
+
+from modules.docx_reader import iter_docx_text
+
+def extract_legacy(file_path):
+    """Прежняя реализация: объектная модель python-docx и text += paragraph.text"""
+    doc = docx.Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+def extract_streaming(file_path):
+    """Потоковый разбор XML с одной склейкой в конце"""
+    return "".join(iter_docx_text(file_path))
+
+def peak_memory(extract_name, file_path):
+    """Прирост пиковой памяти процесса (МБ) при извлечении; выполняется в новом процессе.
+
+    tracemalloc не учитывает память lxml (и дерева python-docx), поэтому измеряется максимальный RSS.
+    """
+    extract = globals()[extract_name]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    extract(file_path)
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+
+def measure(extract, file_path, repeat):
+    """Лучшее время, прирост пиковой памяти в МБ и результат извлечения"""
+    best = float('inf')
+    text = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(file_path)
+        best = min(best, time.perf_counter() - start)
+    with ProcessPoolExecutor(max_workers=1) as executor:  # Память замеряется в процессе, где документ еще не читали
+        memory = executor.submit(peak_memory, extract.__name__, file_path).result()
+    return best, memory, text
+
+def missing_paragraphs(legacy_text, new_text):
+    """Количество непустых абзацев python-docx, которых нет в тексте потокового чтения"""
+    return sum(1 for paragraph in legacy_text.split("\n") if paragraph and paragraph not in new_text)
+
+def make_scaled(source_path, scale, target_path):
+    """Копия документа, тело которого повторено scale раз"""
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(target_path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == 'word/document.xml':
+                xml = data.decode('utf-8')
+                match = re.search(r'(<w:body>)(.*?)(<w:sectPr\b.*</w:body>)', xml, re.S)
+                xml = xml[:match.start()] + match.group(1) + match.group(2) * scale + match.group(3) + xml[match.end():]
+                data = xml.encode('utf-8')
+            target.writestr(item, data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение чтения .docx: потоковый разбор против python-docx")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--repeat', type=int, default=3, help="Количество повторов каждого замера")
+    parser.add_argument('--scale', type=int, default=0, help="Во сколько раз увеличить самый большой документ (0 - не измерять)")
+    args = parser.parse_args()
+
+    files = [os.path.join(args.data, name) for name in sorted(os.listdir(args.data)) if name.lower().endswith('.docx')]
+    scaled_path = None
+    if args.scale > 1 and files:
+        largest = max(files, key=os.path.getsize)
+        scaled_path = os.path.join(tempfile.mkdtemp(), f"{os.path.splitext(os.path.basename(largest))[0]} x{args.scale}.docx")
+        make_scaled(largest, args.scale, scaled_path)
+        files.append(scaled_path)
+
+    print(f"\n{'Файл':<22}{'Старый, с':>11}{'Новый, с':>10}{'Ускор.':>8}{'Старый, МБ':>12}{'Новый, МБ':>11}"
+          f"{'Символов':>10}{'Новых':>8}{'Потеряно':>10}")
+    total_old = total_new = 0.0
+    for file_path in files:
+        old_time, old_memory, old_text = measure(extract_legacy, file_path, args.repeat)
+        new_time, new_memory, new_text = measure(extract_streaming, file_path, args.repeat)
+        total_old += old_time
+        total_new += new_time
+        print(f"{os.path.basename(file_path)[:21]:<22}{old_time:>11.3f}{new_time:>10.3f}{old_time / new_time if new_time else 0:>7.1f}x"
+              f"{old_memory:>12.1f}{new_memory:>11.1f}{len(new_text):>10}{len(new_text) - len(old_text):>8}"
+              f"{missing_paragraphs(old_text, new_text):>10}")
+    if total_new:
+        print(f"\nИтого: старый {total_old:.3f} с, новый {total_new:.3f} с, ускорение {total_old / total_new:.1f}x")
+    if scaled_path:
+        os.remove(scaled_path)
+        os.rmdir(os.path.dirname(scaled_path))
+
+if __name__ == "__main__":
+    main()
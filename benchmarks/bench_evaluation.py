@@ -0,0 +1,260 @@
+"""Оценка качества сохраненных результатов без обращения к ИИ: сетка порогов и нормализаций в пуле процессов
+
+Источники терминов:
+  - CSV из results/csv (terms_<дата>_<время>_<документ>.csv и stream_...csv);
+  - задания checkpoints/: ответы ИИ по фрагментам (недостающие фрагменты берутся из кэша ответов cache/responses).
+Каждый источник сопоставляется с reference_terms/<документ>.txt, и evaluate_terms вычисляется для всех сочетаний
+порога (--thresholds) и нормализации (--normalize: lemma - лемматизация, lower - только нижний регистр).
+Время обработки берется из отчета пакетной обработки (results/reports) или из манифеста задания.
+
+С --output таблица сохраняется в CSV; с --baseline средний F1 каждого документа сравнивается с сохраненной ранее
+таблицей, и при снижении больше чем на --tolerance команда завершается с кодом 1 (регрессия качества).
+
+Запуск из корня проекта: python -m benchmarks.bench_evaluation [--thresholds 80,85,90,95] [--normalize lemma,lower]
+                                                             [--latest] [--workers 4] [--output eval.csv] [--baseline eval.csv]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import csv  # Модуль для чтения результатов и записи таблицы
+import json  # Модуль для чтения манифестов заданий
+import os  # Модуль для работы с файловой системой
+import re  # Модуль для разбора имен файлов результатов
+import sys  # Модуль для кода завершения при регрессии
+import time  # Модуль для замера времени
+import warnings  # Модуль для подавления предупреждения fuzzywuzzy о медленном SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor  # Пул процессов для сетки параметров
+from datetime import datetime  # Класс для разбора времени в манифестах
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    from modules.metrics import load_reference_terms, evaluate_terms
+
+from modules.response_cache import ResponseCache
+from modules.term_records import parse_terms
+
+RESULT_NAME = re.compile(r'^(?:terms|stream)_(\d{8}_\d{6})_(.+)\.csv$')  # Имя CSV с результатами: время и документ
+REPORT_NAME = re.compile(r'^batch_(\d{8}_\d{6})\.csv$')  # Имя отчета пакетной обработки
+FIELDS = ['документ', 'источник', 'нормализация', 'порог', 'терминов', 'эталон', 'Precision', 'Recall', 'F1-score',
+          'оценка, мс', 'обработка, с']
+
+def read_csv_terms(path):
+    """Названия терминов из CSV результатов (строки метрик после пустой строки пропускаются)"""
+    terms = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        column = header.index('термин') if 'термин' in header else 0
+        for row in reader:
+            if not row:  # Дальше идут метрики, дописанные DataSaver
+                break
+            if len(row) > column and row[column].strip():
+                terms.append(row[column])
+    return terms
+
+def load_batch_reports(reports_dir):
+    """Отчеты пакетной обработки по времени создания: [(время, строки)]"""
+    reports = []
+    if not os.path.isdir(reports_dir):
+        return reports
+    for name in sorted(os.listdir(reports_dir)):
+        match = REPORT_NAME.match(name)
+        if not match:
+            continue
+        with open(os.path.join(reports_dir, name), 'r', encoding='utf-8-sig', newline='') as file:  # Отчет записан с BOM для Excel
+            reports.append((match.group(1), list(csv.DictReader(file, delimiter=';'))))
+    return reports
+
+def find_duration(reports, document, stamp, term_count):
+    """Время обработки документа из первого отчета, записанного после файла результатов"""
+    for report_stamp, rows in reports:
+        if report_stamp < stamp:
+            continue
+        rows = [row for row in rows if os.path.splitext(row.get('файл', ''))[0] == document]
+        if len(rows) > 1:  # Документы с одинаковым именем и разным расширением различаются количеством терминов
+            rows = [row for row in rows if row.get('терминов') == str(term_count)] or rows[:1]
+        if rows:
+            return rows[0].get('всего, с') or ''
+    return ''
+
+def collect_csv_sources(results_dir, reports_dir, latest):
+    """Источники терминов из CSV: [(документ, источник, термины, время обработки)]"""
+    sources = []
+    if not os.path.isdir(results_dir):
+        return sources
+    reports = load_batch_reports(reports_dir)
+    for name in sorted(os.listdir(results_dir)):
+        match = RESULT_NAME.match(name)
+        if not match:
+            continue
+        stamp, document = match.groups()
+        terms = read_csv_terms(os.path.join(results_dir, name))
+        kind = 'stream' if name.startswith('stream_') else 'csv'
+        sources.append((document, f"{kind} {stamp}", terms, find_duration(reports, document, stamp, len(terms))))
+    if latest:  # Только последний результат каждого документа
+        by_document = {}
+        for source in sources:
+            by_document[source[0]] = source
+        sources = list(by_document.values())
+    return sources
+
+def prompt_version(settings):
+    """Версия промта задания так же, как в AIProcessor.get_prompt_version (None - режим с известными терминами)"""
+    if settings.get('delta_mode'):  # Версия зависит от списка известных терминов, который в задании не хранится
+        return None
+    version = settings.get('prompt_version')
+    return f"{version}-json" if settings.get('output_format') == 'json' else str(version)
+
+def collect_checkpoint_sources(checkpoints_dir, cache_dir):
+    """Источники терминов из заданий: ответы ИИ по фрагментам; недостающие берутся из кэша ответов"""
+    sources = []
+    if not os.path.isdir(checkpoints_dir):
+        return sources
+    cache = ResponseCache(cache_dir, enabled=os.path.isdir(cache_dir))  # Отсутствующий кэш не создается
+    cache.max_age_seconds = float('inf')  # Оценка только читает ответы, устаревшие записи не удаляются
+    for job_id in sorted(os.listdir(checkpoints_dir)):
+        job_dir = os.path.join(checkpoints_dir, job_id)
+        try:
+            with open(os.path.join(job_dir, 'manifest.json'), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+        except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+            continue
+        if not manifest.get('source_name'):
+            continue
+        results = {}
+        for name in os.listdir(job_dir):
+            if name.startswith('chunk_') and name.endswith('.txt'):
+                with open(os.path.join(job_dir, name), 'r', encoding='utf-8') as file:
+                    results[int(name[6:11])] = file.read()
+        settings = manifest.get('settings', {})
+        version = prompt_version(settings)
+        if len(results) < manifest.get('total_chunks', 0) and version is not None:
+            try:
+                with open(os.path.join(job_dir, 'chunks.json'), 'r', encoding='utf-8') as file:
+                    chunks = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                chunks = []
+            for index, chunk in enumerate(chunks):
+                if index not in results:
+                    cached = cache.get(ResponseCache.make_key(settings.get('model'), settings.get('domain'), version, chunk))
+                    if cached is not None:
+                        results[index] = cached
+        if not results:
+            continue
+        terms = [record['термин'] for index in sorted(results) for record in parse_terms(results[index])
+                 if record.get('термин')]
+        done = f"{len(results)}/{manifest.get('total_chunks', len(results))}"
+        try:
+            duration = (datetime.fromisoformat(manifest['updated']) - datetime.fromisoformat(manifest['created'])).total_seconds()
+        except (KeyError, ValueError):
+            duration = ''
+        document = os.path.splitext(manifest['source_name'])[0]
+        sources.append((document, f"ответы {job_id[:8]} {done}", terms, duration))
+    return sources
+
+_references = {}  # Эталоны, загруженные в процессе пула: {(документ, нормализация): множество}
+
+def evaluate_cell(task):
+    """Одна ячейка сетки: (индекс источника, документ, термины, порог, нормализация) -> метрики и время оценки"""
+    index, document, terms, threshold, normalize = task
+    key = (document, normalize)
+    if key not in _references:
+        _references[key] = load_reference_terms(document, lemmatize=normalize == 'lemma')
+    start = time.perf_counter()
+    precision, recall, f1 = evaluate_terms(terms, _references[key], threshold, lemmatize=normalize == 'lemma')
+    return index, normalize, threshold, len(_references[key]), precision, recall, f1, (time.perf_counter() - start) * 1000
+
+def document_f1(rows):
+    """Средний F1 источников каждого документа: {(документ, нормализация, порог): F1}.
+
+    Источники (время CSV, задание) меняются от запуска к запуску, поэтому сравниваются документы."""
+    values = {}
+    for row in rows:
+        values.setdefault((row['документ'], row['нормализация'], str(row['порог'])), []).append(float(row['F1-score']))
+    return {key: sum(scores) / len(scores) for key, scores in values.items()}
+
+def read_table(path):
+    """Строки таблицы, сохраненной ранее с --output"""
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file, delimiter=';'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Оценка сохраненных результатов по эталонным терминам")
+    parser.add_argument('--results', default='results/csv', help="Папка с CSV результатов")
+    parser.add_argument('--reports', default='results/reports', help="Папка с отчетами пакетной обработки")
+    parser.add_argument('--checkpoints', default='checkpoints', help="Папка заданий с ответами ИИ по фрагментам")
+    parser.add_argument('--cache', default='cache/responses', help="Папка кэша ответов ИИ")
+    parser.add_argument('--thresholds', default='80,85,90,95', help="Пороги fuzz.ratio через запятую")
+    parser.add_argument('--normalize', default='lemma,lower', help="Нормализации через запятую: lemma, lower")
+    parser.add_argument('--latest', action='store_true', help="Только последний CSV каждого документа")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    parser.add_argument('--output', help="Сохранить таблицу в CSV")
+    parser.add_argument('--baseline', help="Сравнить F1 с таблицей, сохраненной ранее с --output")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="Допустимое снижение F1 относительно --baseline")
+    args = parser.parse_args()
+
+    thresholds = [int(value) for value in args.thresholds.split(',')]
+    normalizations = [value.strip() for value in args.normalize.split(',')]
+    sources = collect_csv_sources(args.results, args.reports, args.latest)
+    sources += collect_checkpoint_sources(args.checkpoints, args.cache)
+    sources = [source for source in sources
+               if os.path.exists(os.path.join('reference_terms', f"{source[0]}.txt"))]  # Только документы с эталоном
+    if not sources:
+        print("Нет сохраненных результатов с эталонными терминами")
+        return
+    for document in {source[0] for source in sources}:  # Компилируем эталоны до запуска пула, чтобы процессы их только читали
+        load_reference_terms(document)
+
+    tasks = [(index, document, terms, threshold, normalize)
+             for index, (document, _, terms, _) in enumerate(sources)
+             for normalize in normalizations for threshold in thresholds]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        cells = list(executor.map(evaluate_cell, tasks, chunksize=max(1, len(tasks) // (4 * max(1, args.workers)))))
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    for index, normalize, threshold, reference_count, precision, recall, f1, milliseconds in cells:
+        document, source, terms, duration = sources[index]
+        rows.append({'документ': document, 'источник': source, 'нормализация': normalize, 'порог': str(threshold),
+                     'терминов': len(set(terms)), 'эталон': reference_count, 'Precision': f"{precision:.3f}",
+                     'Recall': f"{recall:.3f}", 'F1-score': f"{f1:.3f}", 'оценка, мс': f"{milliseconds:.1f}",
+                     'обработка, с': f"{float(duration):.1f}" if duration != '' else ''})
+    rows.sort(key=lambda row: (row['документ'], row['источник'], row['нормализация'], int(row['порог'])))
+
+    print(f"\n{'Документ':<12}{'Источник':<28}{'Норм.':<7}{'Порог':>6}{'Терм.':>7}{'Эталон':>8}{'P':>7}{'R':>7}"
+          f"{'F1':>7}{'Оценка, мс':>12}{'Обработка, с':>14}")
+    for row in rows:
+        print(f"{row['документ'][:11]:<12}{row['источник'][:27]:<28}{row['нормализация']:<7}{row['порог']:>6}"
+              f"{row['терминов']:>7}{row['эталон']:>8}{row['Precision']:>7}{row['Recall']:>7}{row['F1-score']:>7}"
+              f"{row['оценка, мс']:>12}{row['обработка, с']:>14}")
+
+    print(f"\nСреднее по {len(sources)} источникам:")
+    for normalize in normalizations:
+        for threshold in thresholds:
+            selected = [row for row in rows if row['нормализация'] == normalize and row['порог'] == str(threshold)]
+            means = [sum(float(row[field]) for row in selected) / len(selected) for field in ('Precision', 'Recall', 'F1-score')]
+            print(f"  {normalize:<6} порог {threshold:>3}: P {means[0]:.3f}, R {means[1]:.3f}, F1 {means[2]:.3f}")
+    print(f"Оценено {len(tasks)} сочетаний за {elapsed:.2f} с (процессов: {max(1, args.workers)})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Таблица сохранена: {args.output}")
+    if args.baseline:
+        baseline = document_f1(read_table(args.baseline))
+        current = document_f1(rows)
+        regressions = [f"  {' / '.join(key)}: F1 {baseline[key]:.3f} -> {value:.3f}"
+                       for key, value in sorted(current.items())
+                       if key in baseline and value < baseline[key] - args.tolerance]
+        compared = sum(1 for key in current if key in baseline)
+        print(f"Сравнение с {args.baseline}: сопоставлено {compared} сочетаний документ/нормализация/порог, "
+              f"снижений F1: {len(regressions)}")
+        for line in regressions:
+            print(line)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Нагрузочный бенчмарк AIProcessor против локального OpenAI-совместимого сервера (modules/mock_server.py)
+
+Сервер запускается в этом же процессе. Одни и те же синтетические фрагменты обрабатываются
+через run_chunks для каждого сочетания параллелизма, потокового режима, дублирования запросов и доли сбоев
+(доля делится поровну между ответами 429, 504 и обрывами соединения). Для каждого сочетания выводятся время,
+пропускная способность, запросы к серверу, внедренные сбои, повторные попытки, ответы 429/5xx, которые увидел
+ограничитель, дублирующие запросы и доля фрагментов, обработанных с ошибкой.
+
+Запуск из корня проекта: python -m benchmarks.bench_mock_server [--concurrency 1,4,8] [--streaming off,on]
+                                                              [--hedging off,on] [--faults 0,0.1] [--chunks 24]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import contextlib  # Модуль для подавления вывода обработки
+import io  # Модуль для буфера вывода
+import itertools  # Модуль для перебора сочетаний параметров
+import os  # Модуль для переменных окружения
+import random  # Модуль для генерации синтетических фрагментов
+import threading  # Модуль для запуска сервера в отдельном потоке
+import time  # Модуль для замера времени
+
+from modules.ai_processor import AIProcessor
+from modules.mock_server import create_server, MockSettings
+
+WORDS = ['беспилотник', 'квадрокоптер', 'телеметрия', 'навигация', 'полезная', 'нагрузка', 'система', 'управления',
+         'аккумулятор', 'маршрут', 'оператор', 'дальность', 'высота', 'полета', 'стабилизация', 'камера']
+
+def make_chunks(count, words, seed):
+    """Синтетические фрагменты с аббревиатурами и длинными словами, которые сервер вернет как термины"""
+    rng = random.Random(seed)
+    return [f"Фрагмент БПЛА{index} СНС ГЛОНАСС " + ' '.join(rng.choice(WORDS) for _ in range(words))
+            for index in range(count)]
+
+def parse_switch(value):
+    """Список значений переключателя: off,on -> [False, True]"""
+    return [item.strip().lower() in ('on', '1', 'true', 'yes') for item in value.split(',')]
+
+def run_scenario(chunks, concurrency, streaming, hedging, args):
+    """Обработка фрагментов одним экземпляром AIProcessor; возвращает статистику обработчика"""
+    os.environ['AI_MAX_CONCURRENCY'] = str(concurrency)  # Количество потоков и верхняя граница ограничителя
+    processor = AIProcessor()
+    processor.model_name = args.model
+    processor.retry_delay = args.retry_delay
+    processor.chunk_pause = 0  # Пауза последовательного режима исказила бы сравнение
+    processor.planned_chunk_tokens = 10 ** 6  # Фрагменты уже подготовлены и не делятся
+    processor.streaming = streaming
+    processor.response_cache.enabled = False  # Каждый запрос доходит до сервера
+    processor.checkpoints.enabled = False
+    processor.progress.listeners.clear()
+    processor.hedge_policy.enabled = hedging
+    processor.hedge_policy.min_threshold = args.hedge_min
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.run_chunks(chunks, args.domain)
+    elapsed = time.perf_counter() - start
+    state = processor.progress.snapshot()
+    return {
+        'elapsed': elapsed,
+        'retries': state['retries'],
+        'failed': state['failed'],
+        'throttled': processor.get_rate_limiter().stats()['throttled'],
+        'hedges': processor.hedge_policy.fired
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк AIProcessor против локального тестового сервера")
+    parser.add_argument('--concurrency', default='1,4,8', help="Количество одновременных запросов через запятую")
+    parser.add_argument('--streaming', default='off,on', help="Потоковый режим: off, on или off,on")
+    parser.add_argument('--hedging', default='off', help="Дублирование запросов: off, on или off,on")
+    parser.add_argument('--faults', default='0,0.1', help="Доли сбоев через запятую (поровну 429, 504 и обрывы)")
+    parser.add_argument('--chunks', type=int, default=24, help="Количество фрагментов")
+    parser.add_argument('--words', type=int, default=300, help="Слов во фрагменте")
+    parser.add_argument('--latency', choices=('constant', 'uniform', 'lognormal'), default='lognormal', help="Распределение задержки")
+    parser.add_argument('--latency-mean', type=float, default=0.3, help="Средняя задержка в секундах")
+    parser.add_argument('--latency-spread', type=float, default=0.8, help="Разброс задержки")
+    parser.add_argument('--tokens-per-second', type=float, default=2000, help="Скорость генерации ответа сервером")
+    parser.add_argument('--retry-after', type=int, default=1, help="Заголовок Retry-After для ответов 429")
+    parser.add_argument('--retry-delay', type=float, default=0.2, help="Начальная задержка повторной попытки клиента")
+    parser.add_argument('--hedge-min', type=float, default=0.2, help="Минимальный порог дублирования в секундах")
+    parser.add_argument('--model', default='gpt-4o', help="Модель (определяет лимиты API)")
+    parser.add_argument('--domain', default='БАС', help="Предметная область")
+    parser.add_argument('--seed', type=int, default=0, help="Seed задержек, сбоев и фрагментов")
+    parser.add_argument('--port', type=int, default=8011, help="Порт тестового сервера")
+    args = parser.parse_args()
+
+    server = create_server(port=args.port)
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    os.environ['OPENAI_BASE_URL'] = base_url  # Статистика размеров ответов тестового сервера хранится отдельно от настоящего API
+    os.environ['OPENAI_API_KEY'] = 'mock'  # Тестовый сервер ключ не проверяет
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    chunks = make_chunks(args.chunks, args.words, args.seed)
+    print(f"\nТестовый сервер: {base_url}; фрагментов: {len(chunks)}, задержка {args.latency} {args.latency_mean} с")
+    print(f"{'Потоков':>7} {'Поток.':>6} {'Дубл.':>5} {'Сбои':>5} {'Время, с':>9} {'Фрагм./с':>9} {'Запросов':>9}"
+          f" {'Сбоев':>6} {'Повторов':>9} {'429/5xx':>8} {'Дублей':>7} {'Ошибки':>7}")
+    try:
+        for concurrency, streaming, hedging, fault_rate in itertools.product(
+                [int(value) for value in args.concurrency.split(',')], parse_switch(args.streaming),
+                parse_switch(args.hedging), [float(value) for value in args.faults.split(',')]):
+            settings = MockSettings(args.latency, args.latency_mean, args.latency_spread, args.tokens_per_second,
+                                    fault_rate / 3, fault_rate / 3, fault_rate / 3, args.retry_after, args.seed)
+            server.RequestHandlerClass.settings = settings  # Новые настройки и счетчики для каждого сочетания
+            result = run_scenario(chunks, concurrency, streaming, hedging, args)
+            stats = settings.stats
+            faults = stats['429'] + stats['504'] + stats['eof']
+            print(f"{concurrency:>7} {'да' if streaming else 'нет':>6} {'да' if hedging else 'нет':>5} {fault_rate:>5.0%}"
+                  f" {result['elapsed']:>9.2f} {len(chunks) / result['elapsed']:>9.2f} {stats['requests']:>9} {faults:>6}"
+                  f" {result['retries']:>9} {result['throttled']:>8} {result['hedges']:>7} {result['failed'] / len(chunks):>7.0%}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Бенчмарк извлечения текста из PDF: параллельное извлечение по диапазонам страниц против последовательного с конкатенацией
+
+Запуск из корня проекта: python -m benchmarks.bench_pdf_extract [--data data] [--workers 4] [--repeat 3]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import contextlib  # Модуль для подавления вывода отчета о страницах
+import io  # Модуль для буфера вывода
+import os  # Модуль для работы с файловой системой
+import time  # Модуль для замера времени
+
+import PyPDF2
+
+from modules.text_extractor import TextExtractor
+
+def extract_legacy(file_path):
+    """Прежняя реализация: последовательный обход страниц и text += page.extract_text()"""
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text()
+        return text
+
+def measure(extract, file_path, repeat):
+    """Лучшее время из нескольких запусков и результат извлечения"""
+    best = float('inf')
+    text = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = extract(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best, text
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение скорости извлечения текста из PDF")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    parser.add_argument('--min-pages', type=int, default=8, help="Минимальное количество страниц для параллельного извлечения")
+    parser.add_argument('--repeat', type=int, default=3, help="Количество повторов каждого замера")
+    args = parser.parse_args()
+
+    extractor = TextExtractor(None)
+    extractor.pdf_workers = args.workers
+    extractor.min_parallel_pages = args.min_pages
+
+    files = [name for name in sorted(os.listdir(args.data)) if name.lower().endswith('.pdf')]
+    print(f"Процессов: {args.workers}, параллельно от {args.min_pages} страниц")
+    print(f"\n{'Файл':<24}{'Страниц':>9}{'Старый, с':>12}{'Новый, с':>12}{'Ускорение':>11}{'Совпадает':>11}")
+    total_old = total_new = 0.0
+    for name in files:
+        file_path = os.path.join(args.data, name)
+        old_time, old_text = measure(extract_legacy, file_path, args.repeat)
+        new_time, new_text = measure(extractor._extract_from_pdf, file_path, args.repeat)
+        total_old += old_time
+        total_new += new_time
+        print(f"{name:<24}{len(extractor.page_timings):>9}{old_time:>12.3f}{new_time:>12.3f}"
+              f"{old_time / new_time if new_time else 0:>10.1f}x{'да' if old_text == new_text else 'НЕТ':>11}")
+    if files:
+        print(f"\n{'Итого':<33}{total_old:>12.3f}{total_new:>12.3f}{total_old / total_new if total_new else 0:>10.1f}x")
+
+if __name__ == "__main__":
+    main()
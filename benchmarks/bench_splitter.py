@@ -0,0 +1,148 @@
+"""Бенчмарк разбиения текста: split_text (однопроходный, по смещениям токенов) против прежнего split_text_legacy
+
+Запуск из корня проекта: python -m benchmarks.bench_splitter [--model gpt-4o] [--max-tokens 4000]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import os  # Модуль для работы с файловой системой
+import time  # Модуль для замера времени
+
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')  # Клиент OpenAI создается в конструкторе, но запросы не отправляются
+
+from modules.ai_processor import AIProcessor
+from modules.text_cleaner import TextCleaner
+from modules.text_extractor import TextExtractor
+
+def load_documents(data_dir):
+    """Извлечение и очистка текста всех поддерживаемых файлов из папки"""
+    cleaner = TextCleaner()
+    extractor = TextExtractor(cleaner)
+    documents = {}
+    for name in sorted(os.listdir(data_dir)):
+        if not name.lower().endswith(('.pdf', '.docx')):
+            continue
+        path = os.path.join(data_dir, name)
+        raw_text = extractor.extract_raw_text(path)
+        if raw_text:
+            documents[name] = extractor.extract_clean_text(path, raw_text)
+    return documents
+
+def split_text_legacy(processor, text, max_tokens=4000):
+    """Прежнее разделение текста из AIProcessor: токены считаются для каждого абзаца, предложения и слова"""
+    if not text:
+        return []
+        
+    # Подсчитываем токены в тексте
+    total_tokens = processor.count_tokens(text, processor.model_name)
+    
+    # Если текст помещается в лимит, возвращаем его целиком
+    if total_tokens <= max_tokens:
+        return [text]
+        
+    # Разделяем текст на абзацы
+    paragraphs = text.split('\n\n')
+    
+    chunks = []
+    current_chunk = ""
+    current_tokens = 0
+    
+    for paragraph in paragraphs:
+        paragraph_tokens = processor.count_tokens(paragraph, processor.model_name)
+        
+        # Если абзац слишком большой, разделяем его на предложения
+        if paragraph_tokens > max_tokens:
+            sentences = paragraph.replace('. ', '.\n').split('\n')
+            for sentence in sentences:
+                sentence_tokens = processor.count_tokens(sentence, processor.model_name)
+                
+                # Если предложение все еще слишком большое, разделяем его на части
+                if sentence_tokens > max_tokens:
+                    words = sentence.split(' ')
+                    temp_sentence = ""
+                    temp_tokens = 0
+                    
+                    for word in words:
+                        word_tokens = processor.count_tokens(word + ' ', processor.model_name)
+                        if temp_tokens + word_tokens > max_tokens:
+                            if temp_sentence:
+                                if current_tokens + temp_tokens > max_tokens and current_chunk:
+                                    chunks.append(current_chunk)
+                                    current_chunk = temp_sentence
+                                    current_tokens = temp_tokens
+                                else:
+                                    current_chunk += " " + temp_sentence if current_chunk else temp_sentence
+                                    current_tokens += temp_tokens
+                            temp_sentence = word
+                            temp_tokens = word_tokens
+                        else:
+                            temp_sentence += " " + word if temp_sentence else word
+                            temp_tokens += word_tokens
+                    
+                    if temp_sentence:
+                        if current_tokens + temp_tokens > max_tokens and current_chunk:
+                            chunks.append(current_chunk)
+                            current_chunk = temp_sentence
+                            current_tokens = temp_tokens
+                        else:
+                            current_chunk += " " + temp_sentence if current_chunk else temp_sentence
+                            current_tokens += temp_tokens
+                else:
+                    # Если текущий чанк + предложение превышает лимит, начинаем новый чанк
+                    if current_tokens + sentence_tokens > max_tokens and current_chunk:
+                        chunks.append(current_chunk)
+                        current_chunk = sentence
+                        current_tokens = sentence_tokens
+                    else:
+                        current_chunk += " " + sentence if current_chunk else sentence
+                        current_tokens += sentence_tokens
+        else:
+            # Если текущий чанк + абзац превышает лимит, начинаем новый чанк
+            if current_tokens + paragraph_tokens > max_tokens and current_chunk:
+                chunks.append(current_chunk)
+                current_chunk = paragraph
+                current_tokens = paragraph_tokens
+            else:
+                current_chunk += "\n\n" + paragraph if current_chunk else paragraph
+                current_tokens += paragraph_tokens
+    
+    # Добавляем последний чанк, если он не пустой
+    if current_chunk:
+        chunks.append(current_chunk)
+        
+    return chunks
+
+def measure(split, text, max_tokens, repeat):
+    """Лучшее время из нескольких запусков и результат разбиения"""
+    best = float('inf')
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text, max_tokens)
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение скорости разбиения текста на фрагменты")
+    parser.add_argument('--data', default='data', help="Папка с документами")
+    parser.add_argument('--model', default='gpt-4o', help="Модель, для которой считаются токены")
+    parser.add_argument('--max-tokens', type=int, default=4000, help="Максимальный размер фрагмента в токенах")
+    parser.add_argument('--repeat', type=int, default=3, help="Количество повторов каждого замера")
+    args = parser.parse_args()
+
+    processor = AIProcessor()
+    processor.model_name = args.model
+    documents = load_documents(args.data)
+
+    print(f"\n{'Файл':<24}{'Символов':>10}{'Старый, с':>12}{'Фрагм.':>8}{'Новый, с':>12}{'Фрагм.':>8}{'Ускорение':>11}")
+    total_legacy = total_new = 0.0
+    for name, text in documents.items():
+        legacy_time, legacy_chunks = measure(lambda text, max_tokens: split_text_legacy(processor, text, max_tokens), text, args.max_tokens, args.repeat)
+        new_time, new_chunks = measure(processor.split_text, text, args.max_tokens, args.repeat)
+        total_legacy += legacy_time
+        total_new += new_time
+        speedup = legacy_time / new_time if new_time else float('inf')
+        print(f"{name[:23]:<24}{len(text):>10}{legacy_time:>12.4f}{len(legacy_chunks):>8}{new_time:>12.4f}{len(new_chunks):>8}{speedup:>10.1f}x")
+    if total_new:
+        print(f"\nИтого: старый {total_legacy:.4f} с, новый {total_new:.4f} с, ускорение {total_legacy / total_new:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Бенчмарк нечеткого сопоставления терминов: индекс по длинам и символам против перебора всех пар
+
+Эталон - термины reference_terms/, увеличенные в --scale раз синтетическими вариантами (опечатки, склейки слов).
+Предсказания - эталонные термины с 0-3 правками и случайные термины-шум. Перебор всех пар (прежний evaluate_terms)
+медленный, поэтому он выполняется для выборки из --sample предсказаний, а его время пересчитывается на весь набор.
+Совпадения на выборке должны быть одинаковыми; Precision/Recall/F1 полного набора сравниваются при --full.
+
+Запуск из корня проекта: python -m benchmarks.bench_term_matcher [--scales 1,4,16] [--sample 200] [--full]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import os  # Модуль для работы с файловой системой
+import random  # Модуль для генерации синтетических терминов
+import sys  # Модуль для кода завершения при расхождении
+import time  # Модуль для замера времени
+import warnings  # Модуль для подавления предупреждения fuzzywuzzy о медленном SequenceMatcher
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    from fuzzywuzzy import fuzz
+
+from modules.term_matcher import TermMatcher
+
+def load_terms(reference_dir):
+    """Все эталонные термины в нижнем регистре"""
+    terms = set()
+    for name in sorted(os.listdir(reference_dir)):
+        with open(os.path.join(reference_dir, name), 'r', encoding='utf-8') as file:
+            terms.update(line.strip().lower() for line in file if line.strip())
+    return sorted(terms)
+
+def mutate(term, edits, rng, alphabet):
+    """Термин с заданным количеством случайных правок (вставка, удаление, замена символа)"""
+    chars = list(term)
+    for _ in range(edits):
+        position = rng.randrange(len(chars) + 1)
+        action = rng.choice(('insert', 'delete', 'replace')) if chars else 'insert'
+        if action == 'insert':
+            chars.insert(position, rng.choice(alphabet))
+        elif position < len(chars):
+            if action == 'delete':
+                del chars[position]
+            else:
+                chars[position] = rng.choice(alphabet)
+    return ''.join(chars)
+
+def make_dataset(base, scale, rng):
+    """Эталон, увеличенный в scale раз, и предсказания того же размера"""
+    alphabet = sorted({char for term in base for char in term if char.isalpha()})
+    references = set(base)
+    while len(references) < len(base) * scale:
+        if rng.random() < 0.3:  # Склейка двух терминов
+            references.add(f"{rng.choice(base)} {rng.choice(base).split()[-1]}")
+        else:  # Вариант термина с правками
+            references.add(mutate(rng.choice(base), rng.randint(1, 4), rng, alphabet))
+    references = sorted(references)
+    predicted = set()
+    while len(predicted) < len(references):
+        if rng.random() < 0.6:
+            predicted.add(mutate(rng.choice(references), rng.randint(0, 3), rng, alphabet))
+        else:  # Шум: случайная последовательность букв
+            predicted.add(''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 30))))
+    return references, sorted(predicted)
+
+def match_legacy(predicted, references, threshold):
+    """Прежний алгоритм: fuzz.ratio для каждой пары до первого совпадения"""
+    matched = set()
+    for pred in predicted:
+        for ref in references:
+            if fuzz.ratio(pred, ref) >= threshold:
+                matched.add(pred)
+                break
+    return matched
+
+def scores(true_positives, predicted, references):
+    """Precision, Recall и F1 так же, как в metrics.evaluate_terms"""
+    precision = true_positives / len(predicted) if predicted else 0
+    recall = true_positives / len(references) if references else 0
+    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0
+    return precision, recall, f1
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение нечеткого сопоставления терминов: индекс против перебора")
+    parser.add_argument('--reference', default='reference_terms', help="Папка с эталонными терминами")
+    parser.add_argument('--scales', default='1,4,16', help="Во сколько раз увеличить эталон (через запятую)")
+    parser.add_argument('--sample', type=int, default=200, help="Сколько предсказаний сравнивать перебором")
+    parser.add_argument('--threshold', type=int, default=90, help="Порог fuzz.ratio")
+    parser.add_argument('--full', action='store_true', help="Перебор для всех предсказаний (медленно)")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора синтетических терминов")
+    args = parser.parse_args()
+
+    base = load_terms(args.reference)
+    print(f"\n{'Масштаб':>8}{'Эталонов':>10}{'Предск.':>9}{'Перебор, с':>12}{'Индекс, с':>11}{'Ускор.':>8}"
+          f"{'Оценено пар':>13}{'Доля':>8}{'Совпало':>9}{'F1':>7}{'Расхожд.':>10}")
+    failed = False
+    for scale in [int(value) for value in args.scales.split(',')]:
+        rng = random.Random(args.seed + scale)
+        references, predicted = make_dataset(base, scale, rng)
+        sample = predicted if args.full else rng.sample(predicted, min(args.sample, len(predicted)))
+
+        start = time.perf_counter()
+        legacy = match_legacy(sample, references, args.threshold)
+        legacy_time = (time.perf_counter() - start) * len(predicted) / len(sample)  # Пересчет на весь набор
+
+        start = time.perf_counter()
+        matcher = TermMatcher(references, args.threshold)
+        matches = matcher.match_many(predicted)
+        indexed_time = time.perf_counter() - start
+
+        mismatches = sum(1 for term in sample if (term in legacy) != (term in matches))
+        if args.full:
+            mismatches += scores(len(legacy), predicted, references) != scores(len(matches), predicted, references)
+        failed = failed or mismatches > 0
+        f1 = scores(len(matches), predicted, references)[2]
+        pairs = len(predicted) * len(references)
+        print(f"{scale:>8}{len(references):>10}{len(predicted):>9}{legacy_time:>12.2f}{indexed_time:>11.3f}"
+              f"{legacy_time / indexed_time if indexed_time else 0:>7.0f}x{matcher.scored_pairs:>13}"
+              f"{matcher.scored_pairs / pairs:>8.2%}{len(matches):>9}{f1:>7.3f}{mismatches:>10}")
+    if not args.full:
+        print("\nВремя перебора пересчитано с выборки на весь набор предсказаний")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Бенчмарк базы терминов: SQLite (WAL, индексы) против JSON файла, который читается и переписывается целиком
+
+Синтетическая база из N терминов создается во временной папке; замеряются перенос из JSON, поиск термина,
+проверка отсутствующего термина, добавление пакетов терминов и поиск известных терминов во фрагменте текста.
+Результаты обоих хранилищ сравниваются.
+
+Запуск из корня проекта: python -m benchmarks.bench_term_store [--sizes 1000,10000,100000] [--repeat 20]
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import json  # Модуль для записи синтетической базы
+import os  # Модуль для работы с файловой системой
+import random  # Модуль для генерации синтетических терминов
+import shutil  # Модуль для удаления временной папки
+import tempfile  # Модуль для временной папки
+import time  # Модуль для замера времени
+
+from modules.json_manager import JsonTermManager
+from modules.term_store import SqliteTermManager
+
+LETTERS = 'абвгдежзиклмнопрстуфхцчшэюя'
+
+def make_terms(count, rng):
+    """Синтетическая база: {название: запись}"""
+    terms = {}
+    while len(terms) < count:
+        name = ' '.join(''.join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10))) for _ in range(rng.randint(1, 3)))
+        terms[name] = {'term': name, 'definition': f"Определение термина {name}", 'translation': name[::-1],
+                       'relevance': float(rng.randint(50, 100)), 'timestamp': '2025-01-01 00:00:00'}
+    return terms
+
+def timed(function, calls):
+    """Среднее время вызова в миллисекундах и результаты"""
+    start = time.perf_counter()
+    results = [function(*args) for args in calls]
+    return (time.perf_counter() - start) * 1000 / len(calls), results
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение базы терминов SQLite и JSON")
+    parser.add_argument('--sizes', default='1000,10000,50000', help="Размеры базы через запятую")
+    parser.add_argument('--repeat', type=int, default=20, help="Количество вызовов каждой операции")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора синтетических терминов")
+    args = parser.parse_args()
+
+    root = os.getcwd()
+    print(f"\n{'Терминов':>9}  {'Операция':<22}{'JSON, мс':>11}{'SQLite, мс':>12}{'Ускор.':>9}{'Совпадает':>11}")
+    for size in [int(value) for value in args.sizes.split(',')]:
+        rng = random.Random(args.seed + size)
+        terms = make_terms(size, rng)
+        names = list(terms)
+        workdir = tempfile.mkdtemp()
+        try:
+            os.chdir(workdir)  # JsonTermManager работает с db/ в текущей папке
+            os.makedirs('db')
+            with open('db/db_terms.json', 'w', encoding='utf-8') as file:
+                json.dump(terms, file, ensure_ascii=False, indent=4)
+            json_store = JsonTermManager()
+            start = time.perf_counter()
+            sqlite_store = SqliteTermManager()
+            migration = (time.perf_counter() - start) * 1000
+
+            existing = [(name,) for name in rng.sample(names, args.repeat)]
+            missing = [(f"отсутствующий {index}",) for index in range(args.repeat)]
+            texts = [(' '.join(rng.sample(names, 30)) + ' ' + ' '.join(rng.choice(LETTERS * 3) for _ in range(3000)), 30)
+                     for _ in range(max(1, args.repeat // 4))]
+            batches = [({name: dict(terms[name], definition='обновлено') for name in rng.sample(names, 10)},)
+                       for _ in range(max(1, args.repeat // 4))]
+            print(f"{size:>9}  {'перенос из JSON':<22}{'':>11}{migration:>12.1f}")
+            for label, method, calls in [('поиск термина', 'get_term', existing), ('проверка отсутствующего', 'term_exists', missing),
+                                         ('поиск в тексте', 'find_terms_in_text', texts), ('добавление 10 терминов', 'add_terms', batches)]:
+                json_time, json_results = timed(getattr(json_store, method), calls)
+                sqlite_time, sqlite_results = timed(getattr(sqlite_store, method), calls)
+                print(f"{'':>9}  {label:<22}{json_time:>11.2f}{sqlite_time:>12.2f}{json_time / sqlite_time if sqlite_time else 0:>8.0f}x"
+                      f"{'да' if json_results == sqlite_results else 'НЕТ':>11}")
+            same = json_store.get_all_terms() == sqlite_store.get_all_terms()
+            print(f"{'':>9}  {'итоговая база':<22}{'':>11}{'':>12}{'':>9}{'да' if same else 'НЕТ':>11}")
+        finally:
+            os.chdir(root)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
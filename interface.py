@@ -4,10 +4,10 @@ from modules.text_extractor import TextExtractor  # Импортирует кл
 from modules.text_cleaner import TextCleaner  # Импортирует класс для очистки текста
 from modules.ai_processor import AIProcessor  # Импортирует класс для обработки текста через ИИ
 from modules.data_saver import DataSaver  # Импортирует класс для сохранения данных
-import time  # Импортирует модуль для работы со временем
 from colorama import init, Fore, Back, Style  # Импортирует библиотеку для цветного вывода в консоль
 from tqdm import tqdm  # Импортирует библиотеку для отображения прогресс-баров
 from modules.metrics import load_reference_terms, evaluate_terms
+from modules.term_records import format_terms  # Импортирует текстовое представление структурированных терминов
 
 # Инициализация colorama для Windows
 init()  # Инициализирует библиотеку colorama для корректной работы в Windows
@@ -51,24 +51,29 @@ class Interface:  # Определяет основной класс интер
         print(f"{Colors.GRAY}Версия 1.0 | {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}{Colors.RESET}")  # Выводит версию и текущую дату/время серым цветом
         print(f"{Colors.ORANGE}{'='*80}{Colors.RESET}")  # Выводит разделительную линию оранжевым цветом
         
-    def show_progress(self, description, seconds):  # Метод для отображения прогресс-бара
-        for _ in tqdm(range(100), desc=description, bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt}", colour="#F9633B"):  # Создает прогресс-бар с 100 шагами и оранжевым цветом
-            time.sleep(seconds/100)  # Задержка для каждого шага (общее время = seconds)
+    def show_progress(self, description):  # Метод для отображения этапа обработки файла
+        return self.ai_processor.progress.stage(description)  # Этап завершается вместе с реальной операцией, без искусственной задержки
 
     def display_terms(self, ai_response):  # Метод для отображения найденных терминов
+        if isinstance(ai_response, list):  # Структурированный ответ (JSON-режим) выводится в формате глоссария
+            ai_response = format_terms(ai_response)
         print(f"\n{Colors.HEADER}Найденные термины:{Colors.RESET}")  # Выводит заголовок оранжевым
         print(f"{Colors.ORANGE}{'='*80}{Colors.RESET}")  # Выводит разделительную линию оранжевым
         print(f"{Colors.WHITE}{ai_response}{Colors.RESET}")  # Выводит ответ ИИ с терминами белым
         print(f"{Colors.ORANGE}{'='*80}{Colors.RESET}")  # Выводит разделительную линию оранжевым
 
+    def show_streamed_term(self, term_block):  # Метод для отображения термина, полученного в потоковом режиме
+        tqdm.write(f"{Colors.WHITE}{term_block}{Colors.RESET}\n")  # Выводит термин, не ломая прогресс-бары
+        self.data_saver.save_streamed_term(term_block)  # Сразу дописывает термин в промежуточный CSV-файл
+
     def process_file(self, file_path):  # Метод для обработки файла
         print(f"\n{Colors.HEADER}Обработка файла:{Colors.RESET} {file_path}")  # Выводит информацию о файле
         print(f"{Colors.ORANGE}{'='*80}{Colors.RESET}")  # Выводит разделительную линию оранжевым
 
         # Извлечение текста
         print(f"\n{Colors.WHITE}Извлечение текста из файла...{Colors.RESET}")  # Сообщение о начале извлечения текста
-        self.show_progress("Чтение файла", 1)  # Показывает прогресс-бар чтения файла (1 секунда)
-        original_text = self.extractor.extract_raw_text(file_path)  # Извлекает текст из файла
+        with self.show_progress("Чтение файла"):  # Показывает этап чтения файла
+            original_text = self.extractor.extract_raw_text(file_path)  # Извлекает текст из файла
         
         if not original_text:  # Проверяет, успешно ли извлечен текст
             print(f"{Colors.ERROR}Ошибка: Не удалось извлечь текст из файла{Colors.RESET}")  # Выводит сообщение об ошибке
@@ -86,8 +91,8 @@ class Interface:  # Определяет основной класс интер
 
         # Очистка текста
         print(f"\n{Colors.WHITE}Выполняется очистка текста...{Colors.RESET}")  # Сообщение о начале очистки текста
-        self.show_progress("Очистка текста", 1)  # Показывает прогресс-бар очистки текста (1 секунда)
-        cleaned_text = self.extractor.cleaner.clean_and_log(original_text)  # Очищает текст
+        with self.show_progress("Очистка текста"):  # Показывает этап очистки текста
+            cleaned_text = self.extractor.extract_clean_text(file_path, original_text, method='clean_and_log')  # Очищает текст (повторно - из кэша)
 
         if not cleaned_text:  # Проверяет, успешно ли очищен текст
             print(f"{Colors.ERROR}Ошибка: Не удалось очистить текст{Colors.RESET}")  # Выводит сообщение об ошибке
@@ -100,6 +105,11 @@ class Interface:  # Определяет основной класс интер
         print(f"{Colors.WHITE}Исходный размер: {original_length} символов{Colors.RESET}")  # Выводит исходный размер белым
         print(f"{Colors.WHITE}После очистки: {cleaned_length} символов{Colors.RESET}")  # Выводит размер после очистки белым
         print(f"{Colors.WHITE}Сокращение: {reduction:.1f}%{Colors.RESET}")  # Выводит процент сокращения белым
+        filter_report = self.extractor.get_filter_report(file_path)  # Отчет о колонтитулах, оглавлении и таблицах, удаленных до очистки
+        if filter_report:  # Если фильтр содержимого что-то удалил
+            print(Colors.WHITE, end="")  # Отчет выводится белым
+            self.extractor.content_filter.print_report(filter_report)  # Выводит сэкономленные токены по причинам
+            print(Colors.RESET, end="")  # Сбрасывает цвет
 
         # Вывод очищенного текста
         print(f"\n{Colors.HEADER}Очищенный текст:{Colors.RESET}")  # Заголовок для очищенного текста оранжевым
@@ -120,7 +130,11 @@ class Interface:  # Определяет основной класс интер
         if ai_choice == 'да':  # Если пользователь выбрал обработку через ИИ
             print(f"\n{Colors.WHITE}Отправка текста на обработку через ИИ...{Colors.RESET}")  # Сообщение о начале обработки
             self.ai_processor.model_name = None  # Сбрасывает имя модели ИИ для запроса у пользователя
-            result = self.ai_processor.process_text(cleaned_text)  # Обрабатывает текст через ИИ
+            if self.ai_processor.streaming:  # В потоковом режиме термины выводятся и сохраняются по мере получения
+                stream_path = self.data_saver.start_stream(filename)
+                print(f"{Colors.GRAY}Потоковый режим: термины сохраняются в {stream_path} по мере получения{Colors.RESET}")
+                self.ai_processor.on_term = self.show_streamed_term
+            result = self.ai_processor.process_text(cleaned_text, source_name=filename)  # Обрабатывает текст через ИИ
             
             if result == "return_to_main":  # Проверяет специальный флаг для возврата в главное меню
                 return "return_to_main"  # Возвращает специальный флаг
@@ -152,7 +166,6 @@ class Interface:  # Определяет основной класс интер
 
         if save_choice == 'да':
             print(f"\n{Colors.WHITE}Сохранение результатов...{Colors.RESET}")
-            self.show_progress("Сохранение", 1)
 
             # --- Добавлено: сохраняем метрики, если они считались ---
             metrics_dict = None
@@ -163,9 +176,12 @@ class Interface:  # Определяет основной класс интер
                     "F1-score": f"{f1:.2f}"
                 }
 
-            if not self.data_saver.save_terms(result, filename, metrics=metrics_dict):
+            with self.show_progress("Сохранение"):
+                saved = self.data_saver.save_terms(result, filename, metrics=metrics_dict)
+            if not saved:
                 print(f"{Colors.GRAY}Предупреждение: Возникли проблемы при сохранении терминов{Colors.RESET}")
             else:
+                self.ai_processor.checkpoints.set_status(self.ai_processor.checkpoint_job, 'saved')  # Задание больше не предлагается для возобновления
                 print(f"{Colors.ORANGE}Результаты успешно сохранены!{Colors.RESET}")
             print(f"{Colors.GRAY}{'-' * 80}{Colors.RESET}")  # Выводит разделительную линию серым
         else:
@@ -1,9 +1,64 @@
-from interface import Interface  # Импортирует класс Interface из модуля interface
+import argparse  # Импортирует модуль для разбора аргументов командной строки
+
+def resume(job_id=None):
+    """Продолжение прерванного задания или вывод списка незавершенных заданий"""
+    from modules.ai_processor import AIProcessor  # Импортирует класс для обработки текста через ИИ
+    from modules.data_saver import DataSaver  # Импортирует класс для сохранения данных
+    ai_processor = AIProcessor()  # Создает экземпляр обработчика ИИ
+    if not job_id:  # Если задание не указано, выводит список незавершенных заданий
+        jobs = ai_processor.checkpoints.list_jobs()
+        if not jobs:
+            print("Незавершенных заданий нет")
+        for job in jobs:
+            print(f"{job['job_id']}  {job.get('source_name') or '-'}  {job['done_chunks']}/{job['total_chunks']} фрагментов  "
+                  f"{job['status']}  {job['settings']['model']}  {job['updated']}")
+        return
+    ai_processor.resume_job(job_id, DataSaver())  # Дообрабатывает недостающие фрагменты и сохраняет результат
+
+def batch(args):
+    """Обработка всех документов папки без диалога с пользователем"""
+    from modules.batch_runner import BatchRunner  # Импортирует класс пакетной обработки документов
+    runner = BatchRunner(args.model, args.domain, workers=args.workers, use_batch_api=args.batch_api,
+                         report_dir=args.report_dir, streaming_pipeline=args.pipeline)
+    runner.run(args.directory)
+
+def export_terms(path=None):
+    """Выгрузка базы терминов SQLite в JSON"""
+    from modules.term_store import SqliteTermManager  # Импортирует базу терминов SQLite
+    term_manager = SqliteTermManager()
+    count = term_manager.export_json(path)
+    print(f"Выгружено терминов: {count} -> {path or term_manager.json_path}")
 
 def main():
     """Точка входа в программу"""  # Докстринг, описывающий функцию
+    parser = argparse.ArgumentParser(description="DroneTerms AI - извлечение терминов из документов")  # Создает разборщик аргументов
+    subparsers = parser.add_subparsers(dest='command')  # Команды без интерактивного меню
+    resume_parser = subparsers.add_parser('resume', help="Продолжить прерванную обработку документа")
+    resume_parser.add_argument('job_id', nargs='?', help="Идентификатор задания (без него выводится список заданий)")
+    batch_parser = subparsers.add_parser('batch', help="Обработать все документы папки без диалога")
+    batch_parser.add_argument('directory', nargs='?', default='data', help="Папка с документами (по умолчанию data)")
+    batch_parser.add_argument('--model', default='gpt-4o', choices=['gpt-4o', 'deepseek-chat'], help="Модель ИИ")
+    batch_parser.add_argument('--domain', required=True, help="Предметная область для извлечения терминов")
+    batch_parser.add_argument('--workers', type=int, default=2, help="Количество документов, обрабатываемых одновременно")
+    batch_parser.add_argument('--batch-api', action='store_true', help="Отправить фрагменты всех документов одним пакетом через Batch API")
+    batch_parser.add_argument('--pipeline', action='store_true', help="Отправлять фрагменты по мере чтения страниц, не дожидаясь всего текста")
+    batch_parser.add_argument('--report-dir', default='results/reports', help="Папка для отчета")
+    export_parser = subparsers.add_parser('export-terms', help="Выгрузить базу терминов в JSON")
+    export_parser.add_argument('path', nargs='?', help="Файл выгрузки (по умолчанию db/db_terms.json)")
+    args = parser.parse_args()  # Разбирает аргументы командной строки
+
+    if args.command == 'resume':  # Если запрошено возобновление задания
+        resume(args.job_id)
+        return
+    if args.command == 'batch':  # Если запрошена пакетная обработка папки
+        batch(args)
+        return
+    if args.command == 'export-terms':  # Если запрошена выгрузка базы терминов
+        export_terms(args.path)
+        return
+    from interface import Interface  # Импортирует класс Interface из модуля interface
     interface = Interface()  # Создает экземпляр класса Interface
     interface.run()  # Вызывает метод run(), запускающий основной функционал программы
 
 if __name__ == "__main__":  # Проверяет, запущен ли файл напрямую (не импортирован)
-    main()  # Если файл запущен напрямую, вызывает функцию main()
\ No newline at end of file
+    main()  # Если файл запущен напрямую, вызывает функцию main()
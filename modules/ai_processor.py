@@ -1,20 +1,41 @@
 from openai import OpenAI  # Импортируем класс OpenAI из библиотеки openai
 import os  # Импортируем модуль для работы с операционной системой
 from dotenv import load_dotenv  # Импортируем функцию для загрузки переменных окружения из .env файла
-from tqdm import tqdm  # Импортируем класс для отображения прогресс-бара
 import threading  # Импортируем модуль для работы с потоками
 import time  # Импортируем модуль для работы со временем
 import textwrap  # Импортируем модуль для работы с текстом
 import tiktoken  # Импортируем библиотеку для подсчета токенов
 import requests  # Импортируем библиотеку для HTTP-запросов
 import json  # Импортируем библиотеку для работы с JSON
+import hashlib  # Импортируем модуль для вычисления хешей
+import random  # Импортируем модуль для случайного разброса задержек
+import openai  # Импортируем исключения клиента OpenAI
+from concurrent.futures import ThreadPoolExecutor  # Импортируем пул потоков для параллельной отправки фрагментов
+from .response_cache import ResponseCache  # Импортируем кэш ответов ИИ
+from .token_splitter import TokenSplitter, get_encoding  # Импортируем разбиение текста по смещениям токенов
+from .term_stream import TermStreamParser  # Импортируем пошаговый разбор терминов из потокового ответа
+from .term_store import create_term_manager  # Импортируем базу известных терминов (SQLite или JSON)
+from .term_records import TERMS_SCHEMA, JSON_FORMAT_INSTRUCTION, parse_json_terms, parse_terms, format_term_block, KNOWN_TERM_MARKER  # Импортируем структурированный формат ответа
+from .rate_limiter import AdaptiveRateLimiter  # Импортируем ограничитель запросов к API
+from .batch_backend import OpenAIBatchBackend, FINAL_STATUSES  # Импортируем пакетную обработку через Batch API
+from .token_budget import TokenBudgetPlanner  # Импортируем планировщик бюджета токенов
+from .progress import ProgressTracker, ConsoleProgress  # Импортируем отображение прогресса по событиям фрагментов
+from .checkpoint import CheckpointStore  # Импортируем контрольные точки для возобновления прерванных запусков
+from .hedging import HedgePolicy  # Импортируем дублирование задержавшихся запросов
+from .lemmatizer import get_lemmatizer  # Импортируем общий лемматизатор для объединения форм одного термина
+from datetime import datetime  # Импортируем класс для работы с датой и временем
+
+# Версия шаблона промта: увеличивается при любом изменении текста промта, чтобы не использовать устаревшие ответы из кэша
+PROMPT_VERSION = 1
+CHUNK_PLACEHOLDER = "\x00CHUNK\x00"  # Метка места фрагмента в шаблоне промта
 
 class AIProcessor:  # Класс для обработки текста с помощью ИИ
     def __init__(self):  # Конструктор класса
         load_dotenv()  # Загружаем переменные окружения из .env файла
         self.client = OpenAI(  # Инициализируем клиент OpenAI
             base_url=os.getenv('OPENAI_BASE_URL'),  # Получаем базовый URL из переменных окружения
-            api_key=os.getenv('OPENAI_API_KEY')  # Получаем API ключ из переменных окружения
+            api_key=os.getenv('OPENAI_API_KEY'),  # Получаем API ключ из переменных окружения
+            max_retries=0  # Повторы выполняет _request_chunk: иначе клиент скрыл бы 429/5xx и Retry-After от ограничителя
         )
         self.available_models = {  # Словарь доступных моделей
             '1': 'gpt-4o',  # Модель GPT-4o
@@ -29,11 +50,57 @@ class AIProcessor:  # Класс для обработки текста с по
         self.processing = False  # Флаг, указывающий на процесс обработки
         self.timeout = 180  # Уменьшаем таймаут для запросов к API в секундах (3 минуты)
         self.max_retries = 5  # Увеличиваем количество попыток при ошибках
-        self.retry_delay = 5  # Задержка между повторными попытками в секундах
-        self.current_progress = 0  # Текущий прогресс обработки (для прогресс-бара)
-        self.current_chunk = 0  # Номер текущего обрабатываемого фрагмента
+        self.retry_delay = 5  # Начальная задержка между повторными попытками в секундах
+        self.split_after_failures = 2  # После скольких таймаутов/ошибок шлюза подряд фрагмент делится на части
+        self.min_split_tokens = 500  # Фрагменты меньше этого размера (в токенах) при таймаутах не делятся
+        # Лимиты API для каждой модели: запросов в минуту и токенов в минуту
+        self.rate_limits = {
+            'gpt-4o': {'rpm': 500, 'tpm': 450000},
+            'deepseek-chat': {'rpm': 300, 'tpm': 1000000}
+        }
+        self.rate_limiters = {}  # Ограничители запросов для каждой модели (создаются при первом запросе)
+        self.batch_dir = 'batches'  # Папка для файлов пакетных запросов
+        self.max_output_tokens = 4000  # Максимальный размер ответа ИИ в токенах
+        self.planned_chunk_tokens = None  # Размер фрагмента, рассчитанный для текущего запуска
+        self.prompt_parts = {}  # Готовые части промта для каждой области {область: (системное сообщение, текст до фрагмента, текст после)}
+        self.token_planner = TokenBudgetPlanner(self.count_tokens, endpoint=os.getenv('OPENAI_BASE_URL'))  # Планировщик размера фрагментов по бюджету токенов
+        self.delta_mode = os.getenv('AI_DELTA_MODE', '').lower() in ('1', 'true', 'yes')  # Режим извлечения только новых терминов
+        self.delta_max_terms = 150  # Максимальное количество известных терминов, передаваемых в промт
+        self.delta_terms_tokens = 1500  # Токены, резервируемые при планировании фрагмента под список известных терминов
+        self.term_manager = None  # База известных терминов (создается при первом использовании режима)
+        self.known_terms = {}  # Известные термины, переданные в промт {название в нижнем регистре: запись базы}
+        self.lemmatizer = get_lemmatizer()  # Нормальные формы названий: формы одного термина из разных фрагментов объединяются
+        self.known_terms_by_chunk = {}  # Найденные известные термины для каждого фрагмента текущего запуска
+        self.output_format = os.getenv('AI_OUTPUT_FORMAT', 'text').lower()  # Формат ответа ИИ: 'text' или 'json'
+        self.json_schema_models = ('gpt-4o',)  # Модели, поддерживающие ответ по JSON-схеме (остальные получают json_object)
+        self.batch_poll_interval = 30  # Интервал опроса статуса пакета в секундах
         self.total_chunks = 0  # Общее количество фрагментов для обработки
-        self.chunk_completed = False  # Флаг завершения обработки текущего фрагмента
+        # Максимальное количество одновременных запросов к API для каждой модели
+        self.max_concurrent_requests = {
+            'gpt-4o': 4,  # GPT-4o стабильно выдерживает несколько параллельных запросов
+            'deepseek-chat': 2  # DeepSeek Chat нестабилен под нагрузкой, ограничиваемся двумя
+        }
+        self.chunk_pause = 0.5  # Пауза между фрагментами в последовательном режиме (в секундах)
+        self.progress_lock = threading.Lock()  # Блокировка для согласованного обновления состояния из разных потоков
+        self.progress = ProgressTracker()  # Прогресс обработки по событиям фрагментов
+        self.checkpoints = CheckpointStore()  # Контрольные точки фрагментов (отключаются переменной окружения AI_CHECKPOINTS_DISABLED=1)
+        self.checkpoint_job = None  # Идентификатор задания текущего запуска
+        # Дублирование запросов, ответ на которые задерживается дольше 95-го перцентиля (не более 10% дополнительных запросов)
+        self.hedge_policy = HedgePolicy(
+            percentile=95,
+            budget=float(os.getenv('AI_HEDGE_BUDGET', '0.1')),
+            enabled=os.getenv('AI_HEDGING', '').lower() in ('1', 'true', 'yes')
+        )
+        if ConsoleProgress.is_supported():  # Прогресс-бары выводятся только в терминал
+            self.progress.add_listener(ConsoleProgress())
+        self.response_cache = ResponseCache()  # Кэш ответов ИИ (отключается переменной окружения AI_CACHE_DISABLED=1)
+        self.run_reports = True  # Статистика кэша ответов и токенов сбрасывается и выводится в каждом запуске run_chunks
+        self.streaming = os.getenv('AI_STREAMING', '').lower() in ('1', 'true', 'yes')  # Потоковое получение ответа ИИ
+        self.on_term = None  # Функция, которая получает каждый готовый блок термина в потоковом режиме
+        self.emitted_terms = set()  # Термины, уже переданные в on_term за текущий запуск
+        self.first_term_time = None  # Время получения первого термина с начала обработки (в секундах)
+        self.processing_started = None  # Момент начала обработки текста
+        self.term_lock = threading.Lock()  # Блокировка для передачи терминов из разных потоков
 
     def select_model(self):  # Метод для выбора модели ИИ
         """Выбор модели ИИ"""
@@ -71,315 +138,485 @@ class AIProcessor:  # Класс для обработки текста с по
             print("Пожалуйста, введите название предметной области")
             return self.select_domain()  # Рекурсивно вызываем метод снова при пустом вводе
 
-    def show_chunk_progress(self, chunk_num, total_chunks):
-        """Показывает прогресс-бар для текущего фрагмента"""
-        with tqdm(total=100, desc=f"Обработка части {chunk_num}/{total_chunks}", 
-                  bar_format="{desc}: {percentage:3.0f}%|{bar}| Ожидание ответа от ИИ...") as pbar:
-            self.current_progress = 0
-            while self.processing and self.current_chunk == chunk_num and not self.chunk_completed:
-                # Имитируем прогресс, увеличивая его постепенно
-                # Начинаем медленно, затем ускоряемся, но не доходим до 100%
-                if self.current_progress < 95:
-                    step = max(1, min(5, self.current_progress // 10))  # Шаг увеличивается с прогрессом
-                    self.current_progress = min(95, self.current_progress + step)
-                    pbar.n = self.current_progress
-                    pbar.refresh()
-                time.sleep(0.2)
-            
-            # Завершаем прогресс-бар при окончании обработки
-            pbar.n = 100
-            pbar.refresh()
-
-    def show_total_progress(self):
-        """Показывает общий прогресс обработки всех фрагментов"""
-        with tqdm(total=100, desc="Обработка текста", 
-                  bar_format="Обработка текста: {percentage:3.0f}%|{bar}| Ожидание ответа от ИИ...") as pbar:
-            last_progress = 0
-            while self.processing:
-                # Обновляем общий прогресс на основе текущего фрагмента и его прогресса
-                if self.total_chunks > 0:
-                    # Базовый прогресс на основе завершенных фрагментов
-                    completed_chunks_progress = (self.current_chunk - 1) * 100 / self.total_chunks
-                    # Прогресс текущего фрагмента
-                    current_chunk_progress = self.current_progress / self.total_chunks
-                    # Общий прогресс
-                    total_progress = int(completed_chunks_progress + current_chunk_progress)
-                    # Ограничиваем прогресс до 99% до полного завершения
-                    total_progress = min(99, total_progress)
-                else:
-                    total_progress = min(99, self.current_progress)
-                
-                # Обновляем прогресс-бар только если значение изменилось
-                if total_progress != last_progress:
-                    pbar.n = total_progress
-                    pbar.refresh()
-                    last_progress = total_progress
-                
-                time.sleep(0.2)
-            
-            # Завершаем прогресс-бар при окончании обработки
-            pbar.n = 100
-            pbar.refresh()
+    def get_max_workers(self, total_chunks=None):
+        """Определение количества одновременных запросов к API для выбранной модели"""
+        env_limit = os.getenv('AI_MAX_CONCURRENCY')  # Глобальное ограничение из переменных окружения
+        if env_limit and env_limit.isdigit():
+            max_workers = int(env_limit)
+        else:
+            max_workers = self.max_concurrent_requests.get(self.model_name, 1)
+        if total_chunks is not None:
+            max_workers = min(max_workers, total_chunks)  # Не запускаем больше потоков, чем фрагментов
+        return max(1, max_workers)
 
     def count_tokens(self, text, model_name="gpt-4o"):
         """Подсчет количества токенов в тексте"""
         try:
-            # Получаем кодировщик для модели
-            if "gpt-4" in model_name:
-                encoding = tiktoken.encoding_for_model("gpt-4")
-            elif "deepseek" in model_name:
-                encoding = tiktoken.get_encoding("cl100k_base")  # Используем базовую кодировку для DeepSeek
-            else:
-                encoding = tiktoken.get_encoding("cl100k_base")  # Используем базовую кодировку по умолчанию
+            # Получаем кодировщик для модели (кодировщик создается один раз и кэшируется)
+            encoding = get_encoding(model_name)
+            if encoding is None:
+                # Возвращаем примерную оценку (1 токен ~ 4 символа)
+                return len(text) // 4
                 
             # Подсчитываем токены
-            tokens = encoding.encode(text)
+            tokens = encoding.encode(text, disallowed_special=())
             return len(tokens)
         except Exception as e:
             print(f"Ошибка при подсчете токенов: {e}")
             # Возвращаем примерную оценку (1 токен ~ 4 символа)
             return len(text) // 4
 
+    def get_splitter(self):
+        """Разбиение текста по токенам для выбранной модели"""
+        return TokenSplitter(self.model_name)
+
+    def get_max_chunk_tokens(self, domain=""):
+        """Максимальный размер фрагмента (в токенах) с учетом шаблона промта и ожидаемого размера ответа"""
+        return self.token_planner.plan_chunk_tokens(
+            self.model_name,
+            domain,
+            self.build_messages("", domain),
+            self.model_context_limits.get(self.model_name, 4000),
+            self.max_output_tokens,
+            reserved_tokens=self.get_delta_reserve_tokens()  # Шаблон измеряется без фрагмента, т.е. без списка известных терминов
+        )
+
+    def get_delta_reserve_tokens(self):
+        """Токены, которые в режиме известных терминов добавляются к каждому фрагменту (инструкция и список терминов)"""
+        if not self.delta_mode:
+            return 0
+        return self.count_tokens(self.known_terms_instruction(""), self.model_name) + self.delta_terms_tokens
+
+    def known_terms_instruction(self, names):
+        """Инструкция со списком известных терминов, которые модель выводит кратко"""
+        if self.output_format == 'json':
+            short_form = "заполни только поле term, остальные поля оставь пустыми, а relevance равным 0"
+        else:
+            short_form = f"выведи только одну строку:\n{KNOWN_TERM_MARKER} [термин]"
+        return (
+            "\n\nСледующие термины уже есть в глоссарии. Если они встречаются в тексте, НЕ пиши для них "
+            f"определение, перевод и релевантность, а {short_form}\n\n"
+            "Известные термины: " + names
+        )
+
     def split_text(self, text, max_tokens=4000):
-        """Разделение текста на части с учетом ограничения токенов"""
-        if not text:
-            return []
-            
-        # Подсчитываем токены в тексте
-        total_tokens = self.count_tokens(text, self.model_name)
-        
-        # Если текст помещается в лимит, возвращаем его целиком
-        if total_tokens <= max_tokens:
-            return [text]
-            
-        # Разделяем текст на абзацы
-        paragraphs = text.split('\n\n')
-        
-        chunks = []
-        current_chunk = ""
-        current_tokens = 0
-        
-        for paragraph in paragraphs:
-            paragraph_tokens = self.count_tokens(paragraph, self.model_name)
-            
-            # Если абзац слишком большой, разделяем его на предложения
-            if paragraph_tokens > max_tokens:
-                sentences = paragraph.replace('. ', '.\n').split('\n')
-                for sentence in sentences:
-                    sentence_tokens = self.count_tokens(sentence, self.model_name)
-                    
-                    # Если предложение все еще слишком большое, разделяем его на части
-                    if sentence_tokens > max_tokens:
-                        words = sentence.split(' ')
-                        temp_sentence = ""
-                        temp_tokens = 0
-                        
-                        for word in words:
-                            word_tokens = self.count_tokens(word + ' ', self.model_name)
-                            if temp_tokens + word_tokens > max_tokens:
-                                if temp_sentence:
-                                    if current_tokens + temp_tokens > max_tokens and current_chunk:
-                                        chunks.append(current_chunk)
-                                        current_chunk = temp_sentence
-                                        current_tokens = temp_tokens
-                                    else:
-                                        current_chunk += " " + temp_sentence if current_chunk else temp_sentence
-                                        current_tokens += temp_tokens
-                                temp_sentence = word
-                                temp_tokens = word_tokens
-                            else:
-                                temp_sentence += " " + word if temp_sentence else word
-                                temp_tokens += word_tokens
-                        
-                        if temp_sentence:
-                            if current_tokens + temp_tokens > max_tokens and current_chunk:
-                                chunks.append(current_chunk)
-                                current_chunk = temp_sentence
-                                current_tokens = temp_tokens
-                            else:
-                                current_chunk += " " + temp_sentence if current_chunk else temp_sentence
-                                current_tokens += temp_tokens
-                    else:
-                        # Если текущий чанк + предложение превышает лимит, начинаем новый чанк
-                        if current_tokens + sentence_tokens > max_tokens and current_chunk:
-                            chunks.append(current_chunk)
-                            current_chunk = sentence
-                            current_tokens = sentence_tokens
-                        else:
-                            current_chunk += " " + sentence if current_chunk else sentence
-                            current_tokens += sentence_tokens
-            else:
-                # Если текущий чанк + абзац превышает лимит, начинаем новый чанк
-                if current_tokens + paragraph_tokens > max_tokens and current_chunk:
-                    chunks.append(current_chunk)
-                    current_chunk = paragraph
-                    current_tokens = paragraph_tokens
-                else:
-                    current_chunk += "\n\n" + paragraph if current_chunk else paragraph
-                    current_tokens += paragraph_tokens
+        """Разделение текста на части с учетом ограничения токенов (текст кодируется один раз)"""
+        return self.get_splitter().split(text, max_tokens)
+
+    def build_messages(self, chunk, domain):
+        """Формирование сообщений промта для фрагмента текста из заранее подготовленных частей шаблона"""
+        parts = self.prompt_parts.get(domain)
+        if parts is None:  # Шаблон для области формируется один раз
+            messages = self._render_messages(CHUNK_PLACEHOLDER, domain)
+            prefix, suffix = messages[1]["content"].split(CHUNK_PLACEHOLDER)
+            parts = (messages[0]["content"], prefix, suffix)
+            self.prompt_parts[domain] = parts
+        system_content, prefix, suffix = parts
+        user_content = prefix + chunk + suffix
         
-        # Добавляем последний чанк, если он не пустой
-        if current_chunk:
-            chunks.append(current_chunk)
-            
-        return chunks
+        known_terms = self.find_known_terms(chunk) if self.delta_mode and chunk else []
+        if known_terms:  # Известные термины модель выводит кратко, полные данные берутся из базы
+            user_content += self.known_terms_instruction("; ".join(term['term'] for term in known_terms))
+        if self.output_format == 'json':
+            user_content += "\n\n" + JSON_FORMAT_INSTRUCTION
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": user_content}
+        ]
 
-    def process_text_chunk(self, chunk, domain, retry_count=0):
-        """Обработка одного фрагмента текста"""
-        try:
-            # Проверяем размер чанка и уменьшаем его, если он слишком большой
-            chunk_tokens = self.count_tokens(chunk, self.model_name)
-            max_allowed = self.model_context_limits.get(self.model_name, 4000) // 4
-            
-            if chunk_tokens > max_allowed:
-                print(f"Предупреждение: размер фрагмента ({chunk_tokens} токенов) превышает рекомендуемый максимум.")
-                # Обрезаем текст до допустимого размера
-                words = chunk.split()
-                reduced_chunk = ""
-                current_tokens = 0
+    def get_term_manager(self):
+        """База известных терминов (создается при первом обращении)"""
+        with self.term_lock:
+            if self.term_manager is None:
+                self.term_manager = create_term_manager()
+            return self.term_manager
+
+    def find_known_terms(self, chunk):
+        """Известные термины базы, встречающиеся во фрагменте (результат запоминается на время запуска)"""
+        with self.term_lock:
+            if chunk in self.known_terms_by_chunk:
+                return self.known_terms_by_chunk[chunk]
+        found = self.get_term_manager().find_terms_in_text(chunk, limit=self.delta_max_terms)
+        budget = self.delta_terms_tokens  # Список не выходит за резерв, учтенный при планировании размера фрагмента
+        for count, term in enumerate(found):
+            budget -= self.count_tokens(f"; {term['term']}", self.model_name)
+            if budget < 0:
+                found = found[:count]
+                break
+        with self.term_lock:
+            self.known_terms_by_chunk[chunk] = found
+            for term in found:
+                self.known_terms[term['term'].lower()] = term
+        return found
+
+    def get_prompt_version(self, chunk):
+        """Версия промта для ключа кэша с учетом формата ответа и списка известных терминов"""
+        version = f"{PROMPT_VERSION}-json" if self.output_format == 'json' else str(PROMPT_VERSION)
+        if not self.delta_mode:
+            return version
+        names = "; ".join(term['term'] for term in self.find_known_terms(chunk))
+        return f"{version}-delta-{hashlib.sha256(names.encode('utf-8')).hexdigest()[:16]}"
+
+    def lookup_known_term(self, term_name):
+        """Запись известного термина: из найденных во фрагментах запуска или из базы (фрагменты из контрольной точки не ищутся)"""
+        term = self.known_terms.get(term_name.lower())
+        if term is None:
+            term = self.get_term_manager().get_term(term_name)
+            if term is not None:
+                with self.term_lock:
+                    self.known_terms[term_name.lower()] = term
+        return term
+
+    def rehydrate_known_terms(self, text):
+        """Замена кратких ссылок на известные термины полными блоками из базы"""
+        if KNOWN_TERM_MARKER not in text:
+            return text
+        lines = []
+        for line in text.split("\n"):
+            stripped = line.strip().replace('**', '').lstrip('-#* ')
+            if not stripped.startswith(KNOWN_TERM_MARKER):
+                lines.append(line)
+                continue
+            term_name = stripped[len(KNOWN_TERM_MARKER):].strip()
+            term = self.lookup_known_term(term_name)
+            if term is None:  # Термина нет в базе - оставляем только название
+                lines.extend(["", f"Термин: {term_name}", ""])
+                continue
+            relevance = term.get('relevance', 0)
+            lines.extend([
+                "",
+                f"Термин: {term.get('term', term_name)}",
+                f"Определение: {term.get('definition', '')}",
+                f"Перевод: {term.get('translation', '')}",
+                f"Релевантность: {relevance:g}%" if isinstance(relevance, (int, float)) else f"Релевантность: {relevance}%",
+                ""
+            ])
+        return "\n".join(lines)
+
+    def _render_messages(self, chunk, domain):
+        """Шаблон промта для фрагмента текста"""
+        return [
+            {
+                "role": "system",
+                "content": f"""Ты - высококвалифицированный терминолог и эксперт в области "{domain}". 
                 
-                for word in words:
-                    word_tokens = self.count_tokens(word + ' ', self.model_name)
-                    if current_tokens + word_tokens <= max_allowed:
-                        reduced_chunk += word + " "
-                        current_tokens += word_tokens
-                    else:
-                        break
+                Твоя задача - тщательно проанализировать текст и извлечь из него ВСЕ специализированные термины, 
+                относящиеся к области "{domain}", даже если они встречаются в тексте лишь один раз.
                 
-                chunk = reduced_chunk.strip()
-                print(f"Фрагмент сокращен до {self.count_tokens(chunk, self.model_name)} токенов.")
-            
-            # Выполняем запрос к ИИ с оптимизированным промтом
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"""Ты - высококвалифицированный терминолог и эксперт в области "{domain}". 
-                        
-                        Твоя задача - тщательно проанализировать текст и извлечь из него ВСЕ специализированные термины, 
-                        относящиеся к области "{domain}", даже если они встречаются в тексте лишь один раз.
-                        
-                        При анализе обращай особое внимание на:
-                        1. Специальную терминологию и профессиональный жаргон
-                        2. Технические термины и названия оборудования
-                        3. Названия процессов, методов и технологий
-                        4. Аббревиатуры и сокращения
-                        5. Единицы измерения и специфические параметры
-                        6. Названия материалов, веществ и компонентов
-                        7. Специализированные понятия и концепции
-                        
-                        Для каждого термина ты должен определить его значение на основе контекста, 
-                        предоставить перевод (если термин на иностранном языке) и оценить его релевантность 
-                        к области "{domain}" в процентах."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Проанализируй предоставленный текст и составь глоссарий всех терминов, 
-                        относящихся к области "{domain}".
-
-                        ИНСТРУКЦИИ:
-                        
-                        1. Извлеки ВСЕ термины, связанные с областью "{domain}", включая:
-                           - Узкоспециализированные термины
-                           - Общеотраслевые термины
-                           - Технические термины
-                           - Аббревиатуры и сокращения
-                           
-                        2. Для КАЖДОГО термина укажи:
-                           - Точное написание термина из текста
-                           - Краткое и точное определение на основе контекста
-                           - Перевод (с русского на английский или с английского на русский)
-                           - Оценку релевантности к области "{domain}" (от 0% до 100%)
-                        
-                        3. Формат вывода для КАЖДОГО термина СТРОГО следующий:
-                        
-                        Термин: [термин как он встречается в тексте]
-                        Определение: [четкое определение на основе контекста]
-                        Перевод: [перевод термина]
-                        Релевантность: [число]%
-                        
-                        ---
-                        
-                        Текст для анализа:
-                        {chunk}
-                        
-                        ---
-                        
-                        Не пропускай ни одного термина, относящегося к указанной области. Твоя задача - создать максимально полный глоссарий."""
-                    }
-                ],
-                timeout=self.timeout,  # Устанавливаем таймаут для запроса
-                max_tokens=4000  # Ограничиваем размер ответа
-            )
-            
-            return completion.choices[0].message.content
-            
-        except requests.exceptions.Timeout:
-            # Специальная обработка таймаутов
-            print(f"\nТаймаут при обработке фрагмента. Повторная попытка через {self.retry_delay} секунд...")
-            time.sleep(self.retry_delay)
-            # Увеличиваем задержку для следующей попытки
-            self.retry_delay = min(self.retry_delay * 2, 60)  # Не более 60 секунд
-            
-            # Уменьшаем размер фрагмента при повторной попытке
-            if len(chunk) > 1000:
-                reduced_size = int(len(chunk) * 0.8)  # Уменьшаем на 20%
-                chunk = chunk[:reduced_size]
-                print(f"Размер фрагмента уменьшен до {len(chunk)} символов.")
-            
-            if retry_count < self.max_retries:
-                return self.process_text_chunk(chunk, domain, retry_count + 1)
-            else:
-                return f"Не удалось обработать фрагмент из-за таймаута после {self.max_retries} попыток."
+                При анализе обращай особое внимание на:
+                1. Специальную терминологию и профессиональный жаргон
+                2. Технические термины и названия оборудования
+                3. Названия процессов, методов и технологий
+                4. Аббревиатуры и сокращения
+                5. Единицы измерения и специфические параметры
+                6. Названия материалов, веществ и компонентов
+                7. Специализированные понятия и концепции
                 
-        except Exception as e:
-            error_str = str(e)
-            
-            # Проверяем на наличие HTML-ответа с ошибкой 504
-            if "504 Gateway Time-out" in error_str or "Gateway Time-out" in error_str:
-                print(f"\nОшибка шлюза (504) при обработке фрагмента. Повторная попытка через {self.retry_delay} секунд...")
-                time.sleep(self.retry_delay)
-                self.retry_delay = min(self.retry_delay * 2, 60)
+                Для каждого термина ты должен определить его значение на основе контекста, 
+                предоставить перевод (если термин на иностранном языке) и оценить его релевантность 
+                к области "{domain}" в процентах."""
+            },
+            {
+                "role": "user",
+                "content": f"""Проанализируй предоставленный текст и составь глоссарий всех терминов, 
+                относящихся к области "{domain}".
+
+                ИНСТРУКЦИИ:
                 
-                # Уменьшаем размер фрагмента при повторной попытке
-                if len(chunk) > 1000:
-                    reduced_size = int(len(chunk) * 0.7)  # Уменьшаем на 30%
-                    chunk = chunk[:reduced_size]
-                    print(f"Размер фрагмента уменьшен до {len(chunk)} символов.")
+                1. Извлеки ВСЕ термины, связанные с областью "{domain}", включая:
+                   - Узкоспециализированные термины
+                   - Общеотраслевые термины
+                   - Технические термины
+                   - Аббревиатуры и сокращения
+                   
+                2. Для КАЖДОГО термина укажи:
+                   - Точное написание термина из текста
+                   - Краткое и точное определение на основе контекста
+                   - Перевод (с русского на английский или с английского на русский)
+                   - Оценку релевантности к области "{domain}" (от 0% до 100%)
                 
-                if retry_count < self.max_retries:
-                    return self.process_text_chunk(chunk, domain, retry_count + 1)
-                else:
-                    return f"Не удалось обработать фрагмент из-за ошибки шлюза после {self.max_retries} попыток."
-            
-            # Проверяем на ошибку EOF
-            elif "EOF" in error_str:
-                print(f"\nОшибка EOF при обработке фрагмента. Повторная попытка через {self.retry_delay} секунд...")
-                time.sleep(self.retry_delay)
-                self.retry_delay = min(self.retry_delay * 2, 60)
+                3. Формат вывода для КАЖДОГО термина СТРОГО следующий:
                 
-                # Значительно уменьшаем размер фрагмента при ошибке EOF
-                if len(chunk) > 500:
-                    reduced_size = int(len(chunk) * 0.5)  # Уменьшаем на 50%
-                    chunk = chunk[:reduced_size]
-                    print(f"Размер фрагмента уменьшен до {len(chunk)} символов из-за ошибки EOF.")
+                Термин: [термин как он встречается в тексте]
+                Определение: [четкое определение на основе контекста]
+                Перевод: [перевод термина]
+                Релевантность: [число]%
                 
-                if retry_count < self.max_retries:
-                    return self.process_text_chunk(chunk, domain, retry_count + 1)
-                else:
-                    return f"Не удалось обработать фрагмент из-за ошибки EOF после {self.max_retries} попыток."
-            
-            # Общая обработка других ошибок
-            else:
-                print(f"\nОшибка при обработке фрагмента: {e}. Повторная попытка {retry_count + 1}/{self.max_retries}...")
-                time.sleep(self.retry_delay)
+                ---
+                
+                Текст для анализа:
+                {chunk}
+                
+                ---
                 
-                if retry_count < self.max_retries:
-                    return self.process_text_chunk(chunk, domain, retry_count + 1)
+                Не пропускай ни одного термина, относящегося к указанной области. Твоя задача - создать максимально полный глоссарий."""
+            }
+        ]
+
+    def get_completion_options(self):
+        """Параметры запроса к API, общие для обычного, потокового и пакетного режимов"""
+        options = {'max_tokens': self.max_output_tokens}  # Ограничиваем размер ответа
+        if self.output_format == 'json':
+            if self.model_name in self.json_schema_models:
+                options['response_format'] = {
+                    'type': 'json_schema',
+                    'json_schema': {'name': 'glossary', 'strict': True, 'schema': TERMS_SCHEMA}
+                }
+            else:
+                options['response_format'] = {'type': 'json_object'}
+        return options
+
+    @staticmethod
+    def is_error_result(result):
+        """Проверка, является ли результат обработки сообщением об ошибке (список записей JSON-формата ошибкой не бывает)"""
+        return isinstance(result, str) and (result.startswith("Ошибка") or result.startswith("Не удалось"))
+
+    def process_text_chunk(self, chunk, domain):
+        """Обработка одного фрагмента текста с использованием кэша ответов"""
+        cache_key = ResponseCache.make_key(self.model_name, domain, self.get_prompt_version(chunk), chunk)
+        cached_result = self.response_cache.get(cache_key)
+        if cached_result is not None:  # Фрагмент уже обрабатывался с теми же параметрами
+            if self.streaming and self.on_term:  # Термины из кэша передаются так же, как из потокового ответа
+                self.emit_terms_from(cached_result)
+            return cached_result
+        
+        result = self._request_chunk(chunk, domain)
+        if not self.is_error_result(result):  # Ошибки не кэшируем, чтобы повторить запрос при следующем запуске
+            self.response_cache.put(cache_key, result, meta={'model': self.model_name, 'domain': domain})
+        return result
+
+    def get_rate_limiter(self):
+        """Ограничитель запросов для выбранной модели (создается один раз на модель)"""
+        with self.progress_lock:
+            limiter = self.rate_limiters.get(self.model_name)
+            if limiter is None:
+                limits = self.rate_limits.get(self.model_name, {'rpm': 60, 'tpm': 60000})
+                limiter = AdaptiveRateLimiter(limits['rpm'], limits['tpm'], self.get_max_workers())
+                self.rate_limiters[self.model_name] = limiter
+            return limiter
+
+    @staticmethod
+    def classify_error(error):
+        """Определение типа ошибки API и рекомендованной паузы из заголовка Retry-After"""
+        error_str = str(error)
+        status = getattr(error, 'status_code', None)
+        retry_after = None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            headers = getattr(response, 'headers', None) or {}
+            try:
+                if headers.get('retry-after-ms'):
+                    retry_after = float(headers.get('retry-after-ms')) / 1000
+                elif headers.get('retry-after'):
+                    retry_after = float(headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None  # Retry-After в формате даты не поддерживаем, используем собственную задержку
+        
+        if status == 429 or isinstance(error, openai.RateLimitError):
+            return 'rate_limit', retry_after
+        if "context_length_exceeded" in error_str or "maximum context length" in error_str or status == 413:
+            return 'too_large', None
+        if (status and status >= 500) or "Gateway Time-out" in error_str:
+            return 'server', retry_after
+        if isinstance(error, openai.APITimeoutError) or isinstance(error, requests.exceptions.Timeout) or "timed out" in error_str.lower():
+            return 'timeout', None
+        if "EOF" in error_str or isinstance(error, openai.APIConnectionError):
+            return 'connection', None
+        if status and 400 <= status < 500 and status not in (408, 409):
+            return 'fatal', None  # Ошибки запроса (ключ, модель, формат) повторять бессмысленно
+        return 'error', None
+
+    def _request_chunk(self, chunk, domain):
+        """Запрос к ИИ для одного фрагмента текста с повторными попытками"""
+        # Проверяем размер чанка: слишком большой фрагмент делится на части, текст не отбрасывается
+        chunk_tokens = self.count_tokens(chunk, self.model_name)
+        planned_tokens = self.planned_chunk_tokens or self.get_max_chunk_tokens(domain)
+        max_allowed = int(planned_tokens * 1.1)  # Небольшой допуск на расхождение подсчета токенов
+        if chunk_tokens > max_allowed:
+            print(f"Предупреждение: размер фрагмента ({chunk_tokens} токенов) превышает рекомендуемый максимум, фрагмент будет разделен.")
+            return self._request_split_chunk(chunk, domain, max_allowed)
+        
+        limiter = self.get_rate_limiter()
+        delay = self.retry_delay  # Задержка повторной попытки для этого фрагмента
+        overload_failures = 0  # Количество таймаутов и ошибок шлюза подряд
+        messages = {
+            'rate_limit': "Превышен лимит запросов (429)",
+            'server': "Ошибка сервера (5xx)",
+            'timeout': "Таймаут",
+            'connection': "Ошибка соединения (EOF)",
+            'error': "Ошибка"
+        }
+        
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire(chunk_tokens + self.max_output_tokens)  # Учитываем входные токены и максимальный размер ответа
+            try:
+                # В потоковом режиме термины передаются по мере получения ответа
+                if self.streaming:
+                    result = self._stream_chunk(chunk, domain)
+                    output_tokens = self.count_tokens(result, self.model_name)
                 else:
-                    print(f"\nНе удалось обработать фрагмент после {self.max_retries} попыток: {e}")
+                    # Выполняем запрос к ИИ с оптимизированным промтом
+                    messages_for_chunk = self.build_messages(chunk, domain)
+                    # Если ответ задерживается дольше обычного, политика дублирования отправляет повторный запрос
+                    completion = self.hedge_policy.call(
+                        lambda: self.client.chat.completions.create(
+                            model=self.model_name,
+                            messages=messages_for_chunk,
+                            timeout=self.timeout,  # Устанавливаем таймаут для запроса
+                            **self.get_completion_options()  # Размер и формат ответа
+                        ),
+                        acquire=lambda: limiter.try_acquire(chunk_tokens + self.max_output_tokens),  # Дубликат учитывается ограничителем
+                        release=lambda error: self._release_limiter(limiter, error)
+                    )
+                    result = completion.choices[0].message.content
+                    usage = getattr(completion, 'usage', None)
+                    output_tokens = usage.completion_tokens if usage else self.count_tokens(result, self.model_name)
+            except Exception as e:
+                kind, retry_after = self.classify_error(e)
+                limiter.release(throttled=kind in ('rate_limit', 'server', 'timeout'), retry_after=retry_after)
+                
+                if kind in ('server', 'timeout', 'connection'):
+                    overload_failures += 1
+                # Слишком большой запрос или повторяющиеся таймауты: делим фрагмент вместо обрезки текста
+                if kind == 'too_large' or (overload_failures >= self.split_after_failures and chunk_tokens > self.min_split_tokens):
+                    print(f"\n{messages.get(kind, 'Фрагмент слишком велик')} при обработке фрагмента ({chunk_tokens} токенов). Фрагмент будет разделен на части.")
+                    return self._request_split_chunk(chunk, domain, max(chunk_tokens // 2, 1))
+                
+                if kind == 'fatal' or attempt >= self.max_retries:
+                    print(f"\nНе удалось обработать фрагмент после {attempt + 1} попыток: {e}")
                     return f"Ошибка обработки фрагмента: {e}"
+                
+                wait = retry_after if retry_after else delay * random.uniform(0.5, 1.5)  # Разброс, чтобы потоки не повторяли запросы одновременно
+                print(f"\n{messages[kind]} при обработке фрагмента. Повторная попытка {attempt + 1}/{self.max_retries} через {wait:.0f} секунд...")
+                self.progress.chunk_retried(attempt + 1, kind)
+                time.sleep(wait)
+                delay = min(delay * 2, 60)  # Не более 60 секунд
+                continue
+            
+            limiter.release()
+            self.token_planner.record(self.model_name, domain, chunk_tokens, output_tokens)  # Учитываем размер ответа для планирования
+            return result
+
+    def _release_limiter(self, limiter, error):
+        """Освобождение места в ограничителе после запроса (ошибки перегрузки уменьшают параллелизм)"""
+        if error is None:
+            limiter.release()
+            return
+        kind, retry_after = self.classify_error(error)
+        limiter.release(throttled=kind in ('rate_limit', 'server', 'timeout'), retry_after=retry_after)
+
+    def _request_split_chunk(self, chunk, domain, max_tokens):
+        """Обработка фрагмента по частям не длиннее max_tokens токенов"""
+        parts = self.get_splitter().split(chunk, max_tokens)
+        if len(parts) <= 1:  # Не удалось разделить по токенам - делим пополам по границе слова
+            middle = chunk.rfind(' ', 0, len(chunk) // 2)
+            middle = middle if middle > 0 else len(chunk) // 2
+            parts = [part for part in (chunk[:middle].strip(), chunk[middle:].strip()) if part]
+            if len(parts) <= 1:
+                return "Ошибка обработки фрагмента: фрагмент не удалось разделить"
+        
+        results = [self._request_chunk(part, domain) for part in parts]
+        successful = [result for result in results if not self.is_error_result(result)]
+        if not successful:
+            return results[0]
+        if self.output_format == 'json':  # Структурированные ответы частей объединяются в один JSON-объект
+            try:
+                items = [item for result in successful for item in json.loads(result)['terms']]
+                return json.dumps({'terms': items}, ensure_ascii=False)
+            except (json.JSONDecodeError, KeyError, TypeError):
+                pass  # Часть ответов не в формате JSON - их разберет текстовый разбор
+        return "\n\n".join(successful)
+
+    def _stream_chunk(self, chunk, domain):
+        """Потоковый запрос к ИИ с разбором терминов по мере поступления ответа"""
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=self.build_messages(chunk, domain),
+            timeout=self.timeout,  # Устанавливаем таймаут для запроса
+            stream=True,  # Получаем ответ частями
+            **self.get_completion_options()  # Размер и формат ответа
+        )
+        # JSON-ответ разбирается целиком после получения, текстовый - по мере поступления
+        parser = TermStreamParser(self.emit_term) if self.output_format != 'json' else None
+        parts = []
+        for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                self.progress.chunk_streamed(len(delta.encode('utf-8')))
+                if parser:
+                    parser.feed(delta)
+        content = "".join(parts)
+        if parser:
+            parser.close()
+        else:
+            self.emit_terms_from(content)
+        return content
+
+    def emit_terms_from(self, content):
+        """Передача в on_term всех терминов готового ответа"""
+        records = parse_json_terms(content)
+        if records is not None:
+            for record in records:
+                self.emit_term(format_term_block(self.fill_known_term(record)))
+            return
+        parser = TermStreamParser(self.emit_term)
+        parser.feed(content)
+        parser.close()
+
+    def emit_term(self, term_block):
+        """Передача готового блока термина в on_term (каждый термин передается один раз за запуск)"""
+        if not self.on_term:
+            return
+        term_block = self.rehydrate_known_terms(term_block).strip()
+        term_name = term_block.split('\n', 1)[0].split('Термин:', 1)[-1].strip(' *#')
+        with self.term_lock:
+            if term_name in self.emitted_terms:  # Термин уже получен из другого фрагмента или предыдущей попытки
+                return
+            self.emitted_terms.add(term_name)
+            if self.first_term_time is None and self.processing_started is not None:
+                self.first_term_time = time.time() - self.processing_started
+            self.on_term(term_block)
+
+    def merge_chunk_results(self, results):
+        """Объединение результатов фрагментов в выбранном формате ответа"""
+        if self.output_format == 'json':
+            return self.merge_records(results)
+        return self.merge_results(results)
+
+    def fill_known_term(self, record):
+        """Дополнение краткой записи известного термина данными из базы"""
+        if record.get('определение') or not self.delta_mode:  # Краткие записи бывают только в режиме известных терминов
+            return record
+        known_term = self.lookup_known_term(record['термин'])
+        if known_term:
+            record['определение'] = known_term.get('definition', '')
+            record['перевод'] = known_term.get('translation', '')
+            record['релевантность'] = float(known_term.get('relevance', 0))
+        return record
+
+    def merge_records(self, results):
+        """Объединение структурированных ответов фрагментов в список записей терминов"""
+        records = {}
+        for result in results:
+            # Пропускаем результаты с ошибками
+            if not result or self.is_error_result(result):
+                continue
+            # Ответ не в формате JSON разбирается текстовым разбором
+            for record in parse_terms(result, self.lookup_known_term):
+                if not record.get('термин'):
+                    continue
+                record = self.fill_known_term(record)
+                term_key = self.lemmatizer.lemmatize(record['термин'])  # Формы одного термина объединяются
+                # Сохраняем запись с наиболее полным определением
+                if term_key not in records or len(record.get('определение', '')) > len(records[term_key].get('определение', '')):
+                    records[term_key] = record
+        
+        if not records:
+            return "Не удалось извлечь термины из текста. Возможно, в тексте нет специализированных терминов по указанной области."
+        return list(records.values())
 
     def merge_results(self, results):
         """Объединение результатов обработки нескольких фрагментов текста"""
@@ -392,8 +629,11 @@ class AIProcessor:  # Класс для обработки текста с по
         # Обрабатываем каждый результат
         for result in results:
             # Пропускаем результаты с ошибками
-            if result.startswith("Ошибка") or result.startswith("Не удалось"):
+            if self.is_error_result(result):
                 continue
+            
+            # Краткие ссылки на известные термины заменяем полными данными из базы
+            result = self.rehydrate_known_terms(result)
                 
             # Разделяем результат на отдельные термины
             # Используем более надежный способ разделения
@@ -420,10 +660,11 @@ class AIProcessor:  # Класс для обработки текста с по
                     if len(lines) >= 1 and lines[0].startswith("Термин:"):
                         # Извлекаем название термина
                         term_name = lines[0].replace("Термин:", "").strip()
+                        term_key = self.lemmatizer.lemmatize(term_name)  # Формы одного термина объединяются
                         
                         # Если термин еще не добавлен в словарь или текущее определение более полное
-                        if term_name not in terms_dict or len(term_block) > len(terms_dict[term_name]):
-                            terms_dict[term_name] = term_block
+                        if term_key not in terms_dict or len(term_block) > len(terms_dict[term_key]):
+                            terms_dict[term_key] = term_block
                 except Exception as e:
                     print(f"Ошибка при обработке блока термина: {e}")
                     continue
@@ -437,7 +678,7 @@ class AIProcessor:  # Класс для обработки текста с по
         
         return merged_result
 
-    def process_text(self, cleaned_text):  # Метод для обработки текста
+    def process_text(self, cleaned_text, source_name=None, domain=None):  # Метод для обработки текста
         if not cleaned_text:  # Если текст пустой
             print("Получен пустой текст для обработки")  # Выводим сообщение об ошибке
             return None  # Возвращаем None
@@ -449,23 +690,24 @@ class AIProcessor:  # Класс для обработки текста с по
             elif not model_result:  # Если выбор модели не удался
                 return None  # Возвращаем None
         
-        # Всегда запрашиваем предметную область при каждом вызове process_text
-        domain_result = self.select_domain()  # Предлагаем ввести предметную область
-        if domain_result == "return_to_main":  # Если выбран возврат в главное меню
-            return "return_to_main"  # Передаем флаг возврата дальше
-        
-        # Используем полученную область для текущего запроса
-        domain = domain_result
+        # Предметная область запрашивается при каждом вызове, если она не передана (пакетный режим без диалога)
+        if not domain:
+            domain_result = self.select_domain()  # Предлагаем ввести предметную область
+            if domain_result == "return_to_main":  # Если выбран возврат в главное меню
+                return "return_to_main"  # Передаем флаг возврата дальше
+            
+            # Используем полученную область для текущего запроса
+            domain = domain_result
 
-        # Определяем максимальный размер чанка (в токенах)
-        # Оставляем место для промта и ответа
-        model_limit = self.model_context_limits.get(self.model_name, 4000)
-        
-        # Для DeepSeek Chat используем более консервативный подход
-        if self.model_name == 'deepseek-chat':
-            max_chunk_tokens = min(2000, model_limit // 8)  # Используем 1/8 от лимита модели или 2000, что меньше
-        else:
-            max_chunk_tokens = min(4000, model_limit // 4)  # Используем 1/4 от лимита модели или 4000, что меньше
+        # Размер фрагмента рассчитывается так, чтобы заполнить контекст модели минимальным числом запросов
+        checkpoint_settings = self.get_checkpoint_settings(domain)
+        pending_chunk_tokens = self.checkpoints.pending_chunk_tokens(cleaned_text, checkpoint_settings)
+        # Незавершенное задание документа делится так же, как в прошлый раз, иначе его готовые фрагменты не подошли бы
+        max_chunk_tokens = pending_chunk_tokens or self.get_max_chunk_tokens(domain)
+        self.planned_chunk_tokens = max_chunk_tokens  # Размер фиксируется на время запуска, пока планировщик накапливает статистику
+        overhead_tokens = self.token_planner.prompt_overhead(self.model_name, domain, self.build_messages("", domain))
+        reserve_text = f", резерв под известные термины: {self.get_delta_reserve_tokens()}" if self.delta_mode else ""
+        print(f"Размер фрагмента: до {max_chunk_tokens} токенов (шаблон промта: {overhead_tokens} токенов{reserve_text})")
         
         # Разделяем текст на части, если он слишком большой
         text_chunks = self.split_text(cleaned_text, max_chunk_tokens)
@@ -474,60 +716,238 @@ class AIProcessor:  # Класс для обработки текста с по
         if self.total_chunks > 1:
             print(f"Текст разделен на {self.total_chunks} частей для обработки")
         
-        print(f"Начало обработки текста через ИИ (модель: {self.model_name}, область: {domain})...")
+        # Результаты фрагментов сохраняются в папку задания, чтобы прерванный запуск можно было продолжить
+        job_id, done_results = self.checkpoints.open_job(cleaned_text, checkpoint_settings, text_chunks, source_name, max_chunk_tokens)
+        self.checkpoint_job = job_id
+        if job_id:
+            print(f"Контрольные точки: {self.checkpoints.base_dir}/{job_id} (продолжить: python main.py resume {job_id})")
+        if done_results:
+            print(f"Найдены результаты предыдущего запуска: {len(done_results)} из {self.total_chunks} фрагментов")
         
+        print(f"Начало обработки текста через ИИ (модель: {self.model_name}, область: {domain})...")
+        return self.run_chunks(text_chunks, domain, job_id, done_results)
+
+    def get_checkpoint_settings(self, domain):
+        """Параметры запуска, от которых зависят результаты фрагментов (входят в ключ задания; размер фрагмента хранится в манифесте)"""
+        return {
+            'model': self.model_name,
+            'domain': domain,
+            'prompt_version': PROMPT_VERSION,
+            'output_format': self.output_format,
+            'delta_mode': self.delta_mode
+        }
+
+    def run_chunks(self, text_chunks, domain, job_id=None, done_results=None):
+        """Обработка фрагментов текста (кроме уже готовых) и объединение результатов; фрагменты могут поступать из генератора"""
+        done_results = done_results or {}
+        known_total = len(text_chunks) if isinstance(text_chunks, (list, tuple)) else None  # У генератора размер заранее неизвестен
+        self.total_chunks = known_total or 0
         try:
             self.processing = True  # Устанавливаем флаг обработки
+            if self.run_reports:  # Общие кэш и планировщик нескольких обработчиков не сбрасываются посреди чужого запуска
+                self.response_cache.reset_stats()  # Статистика кэша выводится для каждого запуска отдельно
+                self.token_planner.reset_run()  # Статистика токенов выводится для каждого запуска отдельно
+            self.hedge_policy.reset_stats()  # Статистика дублирующих запросов выводится для каждого запуска отдельно
+            if self.streaming and self.hedge_policy.enabled:  # Дубликат потока передал бы термины повторно
+                print("Предупреждение: дублирование запросов (AI_HEDGING) не используется в потоковом режиме (AI_STREAMING)")
+            self.known_terms_by_chunk = {}  # База терминов могла измениться с прошлого запуска
+            self.emitted_terms = set()  # Очищаем список переданных терминов
+            self.first_term_time = None
+            self.processing_started = time.time()
             
-            # Запускаем общий прогресс-бар в отдельном потоке
-            total_progress_thread = threading.Thread(target=self.show_total_progress)
-            total_progress_thread.start()
+            # Прогресс обновляется событиями фрагментов: постановка в очередь, начало, повторы, завершение
+            self.progress.run_started(self.total_chunks)
             
+            # Результаты хранятся по индексу фрагмента, чтобы сохранить порядок документа
             results = []
+            pending_count = known_total - len(done_results) if known_total is not None else None
+            max_workers = self.get_max_workers(pending_count) if pending_count is not None else self.get_max_workers()
             
-            # Обрабатываем каждый фрагмент текста
-            for i, chunk in enumerate(text_chunks):
-                self.current_chunk = i + 1
-                self.current_progress = 0
-                self.chunk_completed = False
-                
-                # Запускаем прогресс-бар для текущего фрагмента в отдельном потоке
-                chunk_progress_thread = threading.Thread(
-                    target=self.show_chunk_progress, 
-                    args=(self.current_chunk, self.total_chunks)
-                )
-                chunk_progress_thread.start()
-                
-                # Сбрасываем задержку перед каждой новой частью
-                self.retry_delay = 5
-                
-                # Обрабатываем текущий фрагмент
-                chunk_result = self.process_text_chunk(chunk, domain)
-                results.append(chunk_result)
-                
-                # Сигнализируем о завершении обработки фрагмента и ждем завершения потока прогресс-бара
-                self.chunk_completed = True
-                self.current_progress = 100
-                chunk_progress_thread.join(timeout=1)  # Ждем завершения потока с таймаутом
-                
-                # Добавляем небольшую паузу между обработкой частей
-                if i < self.total_chunks - 1:
-                    time.sleep(0.5)
+            if max_workers > 1:
+                print(f"Параллельная обработка: до {max_workers} запросов одновременно")
+                # Фрагменты берутся из источника, только когда есть свободное место в очереди: генератор не опережает обработку
+                slots = threading.BoundedSemaphore(max_workers * 2)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = []
+                    for i, chunk in enumerate(text_chunks):
+                        results.append(done_results.get(i))
+                        if results[i] is not None:  # Готовый фрагмент из контрольной точки
+                            self._restore_chunk_result(results[i])
+                            continue
+                        slots.acquire()
+                        self.progress.chunk_queued(i + 1)
+                        future = executor.submit(self._process_chunk_task, i + 1, chunk, domain)
+                        future.add_done_callback(lambda future, i=i: self._finish_chunk(future, i, results, job_id, slots))
+                        futures.append(future)
+                for future in futures:  # Ошибки рабочих потоков передаются дальше
+                    future.result()
+            else:
+                # Обрабатываем каждый фрагмент текста последовательно
+                processed = 0
+                for i, chunk in enumerate(text_chunks):
+                    results.append(done_results.get(i))
+                    if results[i] is not None:  # Готовый фрагмент из контрольной точки
+                        self._restore_chunk_result(results[i])
+                        continue
+                    # Добавляем небольшую паузу между обработкой частей
+                    if processed:
+                        time.sleep(self.chunk_pause)
+                    self.progress.chunk_queued(i + 1)
+                    results[i] = self._process_chunk_task(i + 1, chunk, domain)
+                    self.save_checkpoint(job_id, i, results[i])
+                    processed += 1
+            self.total_chunks = len(results)
             
             # Объединяем результаты обработки всех фрагментов
-            final_result = self.merge_results(results)
+            final_result = self.merge_chunk_results(results)
+            if job_id and not any(self.is_error_result(result) for result in results):
+                self.checkpoints.set_status(job_id, 'processed')  # Все фрагменты готовы, осталось сохранить результат
             
-            # Останавливаем общий прогресс-бар
+            # Завершаем общий прогресс-бар
             self.processing = False
-            total_progress_thread.join(timeout=1)  # Ждем завершения потока с таймаутом
+            self.progress.run_finished()
             
             print("\nОбработка текста через ИИ завершена")
+            if self.streaming and self.first_term_time is not None:
+                print(f"Первый термин получен через {self.first_term_time:.1f} с")
+            if self.run_reports:
+                self.response_cache.report()  # Выводим статистику кэша ответов
+                self.token_planner.report()  # Выводим распределение токенов между шаблоном и текстом
+            self.token_planner.save()  # Сохраняем наблюдаемые размеры ответов для следующих запусков
+            self.hedge_policy.report()  # Выводим статистику дублирующих запросов
             return final_result
             
         except Exception as e:
             self.processing = False
-            self.chunk_completed = True
-            if 'total_progress_thread' in locals() and total_progress_thread.is_alive():
-                total_progress_thread.join(timeout=1)
+            self.progress.run_finished()
             print(f"\nОшибка при обработке текста ИИ: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _restore_chunk_result(self, result):
+        """Учет готового результата фрагмента из контрольной точки"""
+        self.progress.chunk_done(None)  # Готовые фрагменты засчитываются в прогресс сразу
+        if self.streaming and self.on_term:
+            self.emit_terms_from(result)
+
+    def _finish_chunk(self, future, index, results, job_id, slots):
+        """Сохранение результата фрагмента сразу после его обработки в рабочем потоке"""
+        try:
+            if future.exception() is None:
+                results[index] = future.result()
+                self.save_checkpoint(job_id, index, results[index])
+        finally:
+            slots.release()  # Освобождаем место в очереди для следующего фрагмента
+
+    def save_checkpoint(self, job_id, index, result):
+        """Сохранение результата фрагмента в папку задания (ошибки не сохраняются, чтобы повторить их при возобновлении)"""
+        if job_id and result and not self.is_error_result(result):
+            self.checkpoints.save_result(job_id, index, result)
+
+    def resume_job(self, job_id, data_saver=None):
+        """Продолжение прерванного задания: обрабатываются только недостающие фрагменты, затем результат сохраняется"""
+        manifest = self.checkpoints.load_manifest(job_id)
+        if manifest is None:
+            print(f"Задание {job_id} не найдено в папке {self.checkpoints.base_dir}")
+            return None
+        settings = manifest['settings']
+        self.model_name = settings['model']
+        self.output_format = settings['output_format']
+        self.delta_mode = settings['delta_mode']
+        self.planned_chunk_tokens = manifest.get('chunk_tokens') or settings.get('chunk_tokens')  # В старых заданиях размер был в настройках
+        text_chunks = self.checkpoints.load_chunks(job_id)
+        done_results = self.checkpoints.load_results(job_id)
+        self.checkpoint_job = job_id
+        print(f"Задание {job_id}: {manifest.get('source_name') or 'документ'}, готово {len(done_results)} из {len(text_chunks)} фрагментов "
+              f"(модель: {self.model_name}, область: {settings['domain']})")
+        
+        result = self.run_chunks(text_chunks, settings['domain'], job_id, done_results)
+        if not result or (isinstance(result, str) and self.is_error_result(result)):
+            return result
+        if data_saver is not None and data_saver.save_terms(result, manifest.get('source_name') or f"{job_id}.txt"):
+            self.checkpoints.set_status(job_id, 'saved')
+        return result
+
+    def _process_chunk_task(self, chunk_num, chunk, domain):
+        """Обработка одного фрагмента с передачей событий прогресса (может выполняться в рабочем потоке)"""
+        self.progress.chunk_started(chunk_num)
+        result = None
+        try:
+            result = self.process_text_chunk(chunk, domain)
+            return result
+        finally:
+            self.progress.chunk_done(chunk_num, ok=result is not None and not self.is_error_result(result))
+
+    def process_documents_batch(self, documents, domain, backend=None, data_saver=None):
+        """Пакетная обработка документов через Batch API: {имя файла: очищенный текст} -> {имя файла: результат}"""
+        backend = backend or OpenAIBatchBackend(self.client)
+        max_chunk_tokens = self.get_max_chunk_tokens(domain)
+        self.planned_chunk_tokens = max_chunk_tokens
+        os.makedirs(self.batch_dir, exist_ok=True)
+        requests_path = os.path.join(self.batch_dir, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        
+        # Результаты каждого документа хранятся по индексу фрагмента, чтобы сохранить порядок документа
+        results = {}
+        pending = {}  # Фрагменты, отправленные в пакет {custom_id: (имя файла, индекс, ключ кэша)}
+        with open(requests_path, 'w', encoding='utf-8') as file:
+            for doc_index, (filename, text) in enumerate(documents.items()):
+                chunks = self.split_text(text, max_chunk_tokens)
+                results[filename] = [None] * len(chunks)
+                for chunk_index, chunk in enumerate(chunks):
+                    cache_key = ResponseCache.make_key(self.model_name, domain, self.get_prompt_version(chunk), chunk)
+                    cached_result = self.response_cache.get(cache_key)
+                    if cached_result is not None:  # Фрагмент уже обрабатывался - в пакет не отправляем
+                        results[filename][chunk_index] = cached_result
+                        continue
+                    custom_id = f"doc{doc_index}-chunk{chunk_index}"
+                    pending[custom_id] = (filename, chunk_index, cache_key)
+                    file.write(json.dumps({
+                        'custom_id': custom_id,
+                        'method': 'POST',
+                        'url': '/v1/chat/completions',
+                        'body': {
+                            'model': self.model_name,
+                            'messages': self.build_messages(chunk, domain),
+                            **self.get_completion_options()
+                        }
+                    }, ensure_ascii=False) + "\n")
+        
+        print(f"Подготовлено запросов для пакета: {len(pending)} (документов: {len(documents)}, из кэша: "
+              f"{sum(len(chunks) for chunks in results.values()) - len(pending)})")
+        
+        if pending:
+            batch_id = backend.submit(requests_path)
+            print(f"Пакет отправлен: {batch_id}")
+            status = backend.status(batch_id)
+            while status not in FINAL_STATUSES:
+                print(f"Статус пакета: {status}. Следующая проверка через {self.batch_poll_interval} секунд...")
+                time.sleep(self.batch_poll_interval)
+                status = backend.status(batch_id)
+            print(f"Пакет {batch_id} завершен со статусом: {status}")
+            
+            for line in backend.download(batch_id).splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    filename, chunk_index, cache_key = pending[record['custom_id']]
+                except (json.JSONDecodeError, KeyError) as e:
+                    print(f"Ошибка при разборе ответа пакета: {e}")
+                    continue
+                response = record.get('response') or {}
+                if record.get('error') or response.get('status_code') != 200:
+                    error = record.get('error') or response.get('body')
+                    results[filename][chunk_index] = f"Ошибка обработки фрагмента: {error}"
+                    continue
+                content = response['body']['choices'][0]['message']['content']
+                results[filename][chunk_index] = content
+                self.response_cache.put(cache_key, content, meta={'model': self.model_name, 'domain': domain})
+        
+        # Объединяем результаты каждого документа и сохраняем их
+        merged = {}
+        for filename, chunk_results in results.items():
+            chunk_results = [result if result is not None else "Не удалось обработать фрагмент: ответ отсутствует в пакете"
+                             for result in chunk_results]
+            merged[filename] = self.merge_chunk_results(chunk_results)
+            if data_saver is not None and not self.is_error_result(merged[filename]):
+                data_saver.save_terms(merged[filename], filename)
+        return merged
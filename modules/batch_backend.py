@@ -0,0 +1,122 @@
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import re  # Модуль регулярных выражений
+import shutil  # Модуль для копирования файлов
+import uuid  # Модуль для генерации идентификаторов пакетов
+
+FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')  # Статусы пакета, после которых опрос прекращается
+
+class OpenAIBatchBackend:  # Класс для отправки пакетных запросов через Batch API OpenAI
+    def __init__(self, client, completion_window='24h'):  # Конструктор класса, принимает клиент OpenAI
+        self.client = client  # Клиент OpenAI
+        self.completion_window = completion_window  # Срок выполнения пакета
+        self.batches = {}  # Последнее известное состояние пакетов {идентификатор: объект пакета}
+
+    def submit(self, requests_path):
+        """Загрузка файла запросов и создание пакета; возвращает идентификатор пакета"""
+        with open(requests_path, 'rb') as file:
+            input_file = self.client.files.create(file=file, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window=self.completion_window
+        )
+        self.batches[batch.id] = batch
+        return batch.id
+
+    def status(self, batch_id):
+        """Текущий статус пакета"""
+        batch = self.client.batches.retrieve(batch_id)
+        self.batches[batch_id] = batch
+        return batch.status
+
+    def download(self, batch_id):
+        """Содержимое файла ответов пакета (JSONL)"""
+        batch = self.batches.get(batch_id) or self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return ""
+        return self.client.files.content(batch.output_file_id).text
+
+def local_glossary_terms(messages, limit=20):
+    """Детерминированный список терминов для локальной проверки без обращения к API"""
+    content = messages[-1]['content'] if messages else ""
+    match = re.search(r'Текст для анализа:\s*(.*?)\s*---', content, re.S)
+    text = match.group(1) if match else content
+    # Аббревиатуры и длинные слова текста считаем "терминами"
+    candidates = re.findall(r'\b[A-ZА-ЯЁ]{2,}\b', text) + re.findall(r'\b[а-яёa-z]{10,}\b', text.lower())
+    return [
+        {'term': term, 'definition': 'Термин из исходного текста', 'translation': term, 'relevance': 80 + len(term) % 20}
+        for term in list(dict.fromkeys(candidates))[:limit]
+    ]
+
+def local_glossary_answer(messages):
+    """Детерминированный ответ в формате глоссария для локальной проверки без обращения к API"""
+    return "\n\n".join(
+        f"Термин: {term['term']}\nОпределение: {term['definition']}\nПеревод: {term['translation']}\nРелевантность: {term['relevance']}%"
+        for term in local_glossary_terms(messages)
+    )
+
+class LocalBatchBackend:  # Класс локальной замены Batch API: пакеты обрабатываются из файлов без обращения к сети
+    def __init__(self, batch_dir='batches/local', responder=local_glossary_answer):  # Конструктор класса
+        self.batch_dir = batch_dir  # Папка для файлов пакетов
+        self.responder = responder  # Функция, формирующая ответ по списку сообщений
+        if not os.path.exists(self.batch_dir):  # Если папка не существует
+            os.makedirs(self.batch_dir)  # Создаем папку
+
+    def _batch_path(self, batch_id, name):
+        """Путь к файлу пакета"""
+        return os.path.join(self.batch_dir, batch_id, name)
+
+    def submit(self, requests_path):
+        """Копирование файла запросов в папку пакета; возвращает идентификатор пакета"""
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.batch_dir, batch_id))
+        shutil.copy(requests_path, self._batch_path(batch_id, 'input.jsonl'))
+        with open(self._batch_path(batch_id, 'status'), 'w', encoding='utf-8') as file:
+            file.write('validating')
+        return batch_id
+
+    def status(self, batch_id):
+        """Текущий статус пакета; при первом опросе пакет обрабатывается"""
+        with open(self._batch_path(batch_id, 'status'), 'r', encoding='utf-8') as file:
+            status = file.read().strip()
+        if status not in FINAL_STATUSES:
+            status = self._run(batch_id)
+        return status
+
+    def _run(self, batch_id):
+        """Формирование файла ответов в формате Batch API"""
+        try:
+            with open(self._batch_path(batch_id, 'input.jsonl'), 'r', encoding='utf-8') as source, \
+                 open(self._batch_path(batch_id, 'output.jsonl'), 'w', encoding='utf-8') as output:
+                for line in source:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    content = self.responder(request['body']['messages'])
+                    if request['body'].get('response_format') and self.responder is local_glossary_answer:
+                        content = json.dumps({'terms': local_glossary_terms(request['body']['messages'])}, ensure_ascii=False)  # Структурированный ответ
+                    output.write(json.dumps({
+                        'id': f"response_{uuid.uuid4().hex[:12]}",
+                        'custom_id': request['custom_id'],
+                        'response': {
+                            'status_code': 200,
+                            'body': {'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}}]}
+                        },
+                        'error': None
+                    }, ensure_ascii=False) + "\n")
+            status = 'completed'
+        except Exception as e:
+            print(f"Ошибка при локальной обработке пакета: {str(e)}")
+            status = 'failed'
+        with open(self._batch_path(batch_id, 'status'), 'w', encoding='utf-8') as file:
+            file.write(status)
+        return status
+
+    def download(self, batch_id):
+        """Содержимое файла ответов пакета (JSONL)"""
+        path = self._batch_path(batch_id, 'output.jsonl')
+        if not os.path.exists(path):
+            return ""
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
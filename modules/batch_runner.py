@@ -0,0 +1,214 @@
+import csv  # Модуль для записи отчета в CSV
+import os  # Модуль для работы с файловой системой
+import threading  # Модуль для синхронизации потоков
+import time  # Модуль для работы со временем
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Пул потоков для параллельной обработки файлов
+from datetime import datetime  # Класс для работы с датой и временем
+from tqdm import tqdm  # Библиотека для отображения прогресс-бара
+from .text_cleaner import TextCleaner  # Класс для очистки текста
+from .text_extractor import TextExtractor  # Класс для извлечения текста из файлов
+from .ai_processor import AIProcessor  # Класс для обработки текста через ИИ
+from .data_saver import DataSaver  # Класс для сохранения данных
+from .metrics import load_reference_terms, evaluate_terms  # Функции для расчета метрик качества
+from .lemmatizer import get_lemmatizer  # Общий лемматизатор (статистика и сохранение кэша)
+from .pipeline import DocumentPipeline  # Потоковая обработка документа без построения полного текста
+
+REPORT_FIELDS = [
+    'файл', 'статус', 'символов', 'символов после очистки', 'сэкономлено токенов', 'фрагментов', 'терминов',
+    'извлечение, с', 'очистка, с', 'первый фрагмент, с', 'ИИ, с', 'сохранение, с', 'всего, с',
+    'Precision', 'Recall', 'F1-score', 'ошибка'
+]
+
+class BatchRunner:  # Класс для обработки всех документов папки без диалога с пользователем
+    def __init__(self, model_name, domain, workers=2, use_batch_api=False, report_dir='results/reports', streaming_pipeline=False):  # Конструктор класса
+        self.model_name = model_name  # Модель ИИ
+        self.domain = domain  # Предметная область
+        self.workers = max(1, workers)  # Количество документов, обрабатываемых одновременно
+        self.use_batch_api = use_batch_api  # Отправлять фрагменты всех документов одним пакетом через Batch API
+        self.streaming_pipeline = streaming_pipeline  # Отправлять фрагменты по мере извлечения страниц, не дожидаясь всего текста
+        self.report_dir = report_dir  # Папка для отчетов
+        self.supported_formats = ('.pdf', '.doc', '.docx')  # Поддерживаемые форматы файлов
+        self.cleaner = TextCleaner()  # Очиститель текста
+        self.extractor = TextExtractor(self.cleaner)  # Извлекатель текста
+        self.data_saver = DataSaver()  # Сохранитель данных
+        self.save_lock = threading.Lock()  # Запись в базу терминов выполняется по одному документу
+        self.shared = AIProcessor()  # Обработчик ИИ, общие компоненты которого используют все потоки
+        self.shared.model_name = model_name
+        self.shared.get_rate_limiter()  # Ограничитель создается заранее, чтобы потоки не создали его одновременно
+        self.local = threading.local()  # Отдельный обработчик ИИ для каждого рабочего потока
+
+    def get_processor(self):
+        """Обработчик ИИ текущего потока с общими ограничителем запросов, кэшем и планировщиком"""
+        processor = getattr(self.local, 'processor', None)
+        if processor is None:
+            processor = AIProcessor()
+            processor.model_name = self.model_name
+            processor.rate_limiters = self.shared.rate_limiters  # Лимиты API общие для всех документов
+            processor.response_cache = self.shared.response_cache
+            processor.token_planner = self.shared.token_planner
+            processor.checkpoints = self.shared.checkpoints
+            processor.run_reports = False  # Кэш и планировщик общие для потоков - их статистика выводится один раз за пакет
+            processor.progress.listeners.clear()  # Вместо прогресс-баров фрагментов выводится прогресс по файлам
+            self.local.processor = processor
+        return processor
+
+    def find_files(self, directory):
+        """Поддерживаемые файлы папки"""
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.lower().endswith(self.supported_formats)]
+
+    def prepare_file(self, file_path):
+        """Извлечение и очистка текста файла; возвращает (очищенный текст, строку отчета)"""
+        row = {'файл': os.path.basename(file_path), 'статус': 'ошибка'}
+        started = time.time()
+        original_text = self.extractor.extract_raw_text(file_path)
+        row['извлечение, с'] = round(time.time() - started, 2)
+        if not original_text:
+            row['ошибка'] = "Не удалось извлечь текст"
+            return None, row
+        row['символов'] = len(original_text)
+
+        started = time.time()
+        cleaned_text = self.extractor.extract_clean_text(file_path, original_text)  # Повторно обрабатываемый файл не очищается заново
+        row['очистка, с'] = round(time.time() - started, 2)
+        if not cleaned_text:
+            row['ошибка'] = "Не удалось очистить текст"
+            return None, row
+        row['символов после очистки'] = len(cleaned_text)
+        filter_report = self.extractor.get_filter_report(file_path)  # Колонтитулы, оглавление и таблицы, не отправленные в ИИ
+        if filter_report:
+            row['сэкономлено токенов'] = filter_report['saved_tokens']
+        return cleaned_text, row
+
+    def finish_file(self, row, result):
+        """Расчет метрик и сохранение результата документа"""
+        if not result or (isinstance(result, str) and AIProcessor.is_error_result(result)):
+            row['ошибка'] = result if isinstance(result, str) else "Не удалось обработать текст через ИИ"
+            return row
+        parsed_terms = [term['термин'] for term in self.data_saver.parse_ai_terms(result) if 'термин' in term]
+        row['терминов'] = len(parsed_terms)
+
+        metrics = None
+        reference_terms = load_reference_terms(row['файл'])
+        if reference_terms:
+            precision, recall, f1 = evaluate_terms(parsed_terms, reference_terms)
+            metrics = {"Precision": f"{precision:.2f}", "Recall": f"{recall:.2f}", "F1-score": f"{f1:.2f}"}
+            row.update(metrics)
+
+        started = time.time()
+        with self.save_lock:
+            saved = self.data_saver.save_terms(result, row['файл'], metrics=metrics)
+        row['сохранение, с'] = round(time.time() - started, 2)
+        row['статус'] = 'готово' if saved else 'не сохранено'
+        return row
+
+    def process_file(self, file_path):
+        """Полная обработка одного файла в рабочем потоке"""
+        started = time.time()
+        if self.streaming_pipeline:
+            return self.process_file_streaming(file_path)
+        try:
+            cleaned_text, row = self.prepare_file(file_path)
+            if cleaned_text is not None:
+                processor = self.get_processor()
+                ai_started = time.time()
+                result = processor.process_text(cleaned_text, source_name=row['файл'], domain=self.domain)
+                row['ИИ, с'] = round(time.time() - ai_started, 2)
+                row['фрагментов'] = processor.total_chunks
+                row = self.finish_file(row, result)
+                if row['статус'] == 'готово':
+                    processor.checkpoints.set_status(processor.checkpoint_job, 'saved')
+        except Exception as e:
+            row = {'файл': os.path.basename(file_path), 'статус': 'ошибка', 'ошибка': str(e)}
+        row['всего, с'] = round(time.time() - started, 2)
+        return row
+
+    def process_file_streaming(self, file_path):
+        """Обработка файла потоковым конвейером: извлечение, очистка, разбиение и запросы к ИИ идут одновременно"""
+        started = time.time()
+        row = {'файл': os.path.basename(file_path), 'статус': 'ошибка'}
+        try:
+            processor = self.get_processor()
+            pipeline = DocumentPipeline(self.extractor, self.cleaner, processor)
+            result = pipeline.process_file(file_path, self.domain, source_name=row['файл'])
+            row['ИИ, с'] = round(time.time() - started, 2)
+            row['символов'] = pipeline.stats['characters']
+            row['символов после очистки'] = pipeline.stats['cleaned_characters']
+            if pipeline.stats['filter_report']:
+                row['сэкономлено токенов'] = pipeline.stats['filter_report']['saved_tokens']
+            row['первый фрагмент, с'] = pipeline.stats['first_chunk_seconds']
+            row['фрагментов'] = processor.total_chunks
+            if pipeline.stats['error']:  # Файл прочитан не полностью - часть текста не обработана
+                row['ошибка'] = pipeline.stats['error']
+            elif not pipeline.stats['characters']:
+                row['ошибка'] = "Не удалось извлечь текст"
+            else:
+                row = self.finish_file(row, result)
+        except Exception as e:
+            row['ошибка'] = str(e)
+        row['всего, с'] = round(time.time() - started, 2)
+        return row
+
+    def run(self, directory):
+        """Обработка всех поддерживаемых файлов папки; возвращает строки отчета"""
+        files = self.find_files(directory)
+        if not files:
+            print(f"В папке {directory} нет файлов поддерживаемых форматов")
+            return []
+        print(f"Пакетная обработка: {len(files)} файлов, модель {self.model_name}, область «{self.domain}», потоков: {self.workers}")
+        started = time.time()
+        self.shared.response_cache.reset_stats()  # Статистика общих кэша и планировщика собирается за весь пакет
+        self.shared.token_planner.reset_run()
+        if self.use_batch_api:
+            rows = self.run_batch_api(files)
+        else:
+            rows = []
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(self.process_file, file_path) for file_path in files]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Файлы", colour="#F9633B"):
+                    rows.append(future.result())
+            rows.sort(key=lambda row: row['файл'])
+        self.write_report(rows, time.time() - started)
+        self.extractor.text_cache.report()
+        self.shared.response_cache.report()
+        self.shared.token_planner.report()
+        get_lemmatizer().report()
+        get_lemmatizer().save()  # Кэш лемм сохраняется сразу, не дожидаясь завершения программы
+        return rows
+
+    def run_batch_api(self, files):
+        """Извлечение и очистка в пуле потоков, затем отправка фрагментов всех документов одним пакетом"""
+        documents = {}
+        rows = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for cleaned_text, row in executor.map(self.prepare_file, files):
+                rows[row['файл']] = row
+                if cleaned_text is not None:
+                    documents[row['файл']] = cleaned_text
+        if documents:
+            ai_started = time.time()
+            results = self.shared.process_documents_batch(documents, self.domain)
+            ai_seconds = round(time.time() - ai_started, 2)
+            for filename, result in results.items():
+                rows[filename]['ИИ, с'] = ai_seconds  # Пакет обрабатывается целиком, время общее для всех документов
+                self.finish_file(rows[filename], result)
+        for row in rows.values():
+            row['всего, с'] = round(sum(row.get(key) or 0 for key in ('извлечение, с', 'очистка, с', 'ИИ, с', 'сохранение, с')), 2)
+        return [rows[name] for name in sorted(rows)]
+
+    def write_report(self, rows, total_seconds):
+        """Сохранение отчета в CSV и вывод сводки"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        report_path = os.path.join(self.report_dir, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        with open(report_path, 'w', newline='', encoding='utf-8-sig') as file:
+            writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS, delimiter=';', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+
+        done = sum(1 for row in rows if row['статус'] == 'готово')
+        print(f"\nСводка пакетной обработки ({total_seconds:.1f} с):")
+        for row in rows:
+            metrics = f", F1 {row['F1-score']}" if row.get('F1-score') else ""
+            error = f" - {row['ошибка']}" if row.get('ошибка') else ""
+            print(f"  {row['файл']}: {row['статус']}, терминов {row.get('терминов', 0)}, {row.get('всего, с', 0)} с{metrics}{error}")
+        print(f"Обработано успешно: {done} из {len(rows)}. Отчет сохранен: {report_path}")
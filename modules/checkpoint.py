@@ -0,0 +1,138 @@
+import hashlib  # Модуль для вычисления хешей документа и настроек
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import shutil  # Модуль для удаления папок заданий
+import threading  # Модуль для синхронизации записи из нескольких потоков
+from datetime import datetime  # Класс для работы с датой и временем
+
+class CheckpointStore:  # Класс для сохранения результатов фрагментов по мере их обработки и возобновления прерванных запусков
+    def __init__(self, base_dir='checkpoints', enabled=True):  # Конструктор класса
+        self.base_dir = base_dir  # Папка с заданиями: checkpoints/<хеш документа>_<хеш настроек>/
+        self.enabled = enabled and os.getenv('AI_CHECKPOINTS_DISABLED', '').lower() not in ('1', 'true', 'yes')  # Переключатель контрольных точек
+        self.lock = threading.Lock()  # Блокировка для обновления манифеста из разных потоков
+
+    @staticmethod
+    def make_job_id(text, settings):
+        """Идентификатор задания по тексту документа и параметрам запуска"""
+        doc_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+        return f"{doc_hash}_{settings_hash}"
+
+    def _job_dir(self, job_id):
+        """Папка задания"""
+        return os.path.join(self.base_dir, job_id)
+
+    def _chunk_path(self, job_id, index):
+        """Файл результата фрагмента"""
+        return os.path.join(self._job_dir(job_id), f"chunk_{index:05d}.txt")
+
+    @staticmethod
+    def _write_atomic(path, content):
+        """Запись во временный файл с заменой, чтобы прерывание не оставило битый файл"""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    def pending_chunk_tokens(self, text, settings):
+        """Размер фрагмента незавершенного задания того же документа с теми же настройками или None"""
+        if not self.enabled:
+            return None
+        manifest = self.load_manifest(self.make_job_id(text, settings))
+        if manifest is None or manifest.get('status') == 'saved':
+            return None
+        return manifest.get('chunk_tokens')
+
+    def open_job(self, text, settings, chunks, source_name=None, chunk_tokens=None):
+        """Создание задания или открытие существующего; возвращает (идентификатор, {индекс: готовый результат})"""
+        if not self.enabled:
+            return None, {}
+        job_id = self.make_job_id(text, settings)
+        job_dir = self._job_dir(job_id)
+        try:
+            if os.path.exists(os.path.join(job_dir, 'manifest.json')):
+                manifest = self.load_manifest(job_id)
+                if manifest and manifest.get('total_chunks') == len(chunks) and manifest.get('chunk_tokens') == chunk_tokens:
+                    return job_id, self.load_results(job_id)
+                shutil.rmtree(job_dir, ignore_errors=True)  # Документ разделен иначе - прежние результаты фрагментов не подходят
+            os.makedirs(job_dir, exist_ok=True)
+            self._write_atomic(os.path.join(job_dir, 'chunks.json'), json.dumps(chunks, ensure_ascii=False))
+            self._write_manifest(job_id, {
+                'job_id': job_id,
+                'source_name': source_name,
+                'settings': settings,
+                'chunk_tokens': chunk_tokens,  # Размер фрагмента не входит в ключ: он меняется вместе со статистикой ответов
+                'total_chunks': len(chunks),
+                'status': 'processing',  # processing -> processed (все фрагменты готовы) -> saved
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'updated': datetime.now().isoformat(timespec='seconds')
+            })
+        except Exception as e:
+            print(f"Ошибка при создании контрольной точки: {str(e)}")
+            return None, {}
+        return job_id, {}
+
+    def load_manifest(self, job_id):
+        """Чтение манифеста задания или None"""
+        try:
+            with open(os.path.join(self._job_dir(job_id), 'manifest.json'), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_manifest(self, job_id, manifest):
+        """Сохранение манифеста задания"""
+        self._write_atomic(os.path.join(self._job_dir(job_id), 'manifest.json'), json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    def load_chunks(self, job_id):
+        """Фрагменты текста задания в исходном порядке"""
+        with open(os.path.join(self._job_dir(job_id), 'chunks.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def save_result(self, job_id, index, result):
+        """Сохранение результата фрагмента сразу после его получения"""
+        if not job_id or not result:
+            return
+        try:
+            self._write_atomic(self._chunk_path(job_id, index), result)
+        except Exception as e:
+            print(f"Ошибка при сохранении контрольной точки фрагмента {index + 1}: {str(e)}")
+
+    def load_results(self, job_id):
+        """Готовые результаты фрагментов задания {индекс: результат}"""
+        results = {}
+        job_dir = self._job_dir(job_id)
+        for name in os.listdir(job_dir):
+            if name.startswith('chunk_') and name.endswith('.txt'):
+                with open(os.path.join(job_dir, name), 'r', encoding='utf-8') as file:
+                    results[int(name[6:11])] = file.read()
+        return results
+
+    def set_status(self, job_id, status):
+        """Обновление статуса задания"""
+        if not job_id:
+            return
+        with self.lock:
+            manifest = self.load_manifest(job_id)
+            if manifest is None:
+                return
+            manifest['status'] = status
+            manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+            self._write_manifest(job_id, manifest)
+
+    def list_jobs(self, include_saved=False):
+        """Список заданий с количеством готовых фрагментов"""
+        jobs = []
+        if not os.path.exists(self.base_dir):
+            return jobs
+        for job_id in sorted(os.listdir(self.base_dir)):
+            manifest = self.load_manifest(job_id)
+            if manifest is None or (manifest.get('status') == 'saved' and not include_saved):
+                continue
+            manifest['done_chunks'] = len(self.load_results(job_id))
+            jobs.append(manifest)
+        return jobs
+
+    def remove_job(self, job_id):
+        """Удаление задания"""
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
@@ -0,0 +1,192 @@
+import os  # Модуль для чтения переменных окружения
+import re  # Модуль регулярных выражений
+from .token_splitter import TokenSplitter  # Подсчет токенов для отчета о сэкономленных токенах
+
+TOC_ENTRY = re.compile(r'^(?=.*[^\W\d_]).{2,}?(?:\.{3,}|…+|\t|\s{2,})\s*(\d{1,4})$')  # Строка оглавления: текст, отточие или табуляция, номер страницы
+TOC_HEADING = re.compile(r'(?i)^(содержание|оглавление|contents|table of contents)\W*\d*$')  # Заголовок оглавления
+WORD = re.compile(r'[^\W\d_]{2,}')  # Слово: не менее двух букв
+LETTER = re.compile(r'[^\W\d_]')  # Любая буква
+DIGITS = re.compile(r'\d+')  # Числа (номера страниц в колонтитулах)
+SPACES = re.compile(r'\s+')  # Пробельные серии
+
+class ContentFilter:  # Класс для удаления частей документа, не содержащих терминов (до отправки в ИИ)
+    def __init__(self, edge_lines=3, min_repeat_pages=3, repeat_share=0.5, min_run=3, min_word_share=0.35,
+                 model_name="gpt-4o", enabled=True):  # Конструктор класса
+        self.edge_lines = edge_lines  # Сколько строк в начале и конце страницы проверяется на колонтитулы
+        self.min_repeat_pages = min_repeat_pages  # Минимальное количество страниц с одинаковой строкой
+        self.repeat_share = repeat_share  # Минимальная доля страниц с одинаковой строкой
+        self.min_run = min_run  # Минимальная длина серии строк оглавления или таблицы с числами
+        self.min_word_share = min_word_share  # Доля слов, ниже которой строка считается таблицей с числами
+        self.model_name = model_name  # Модель, для которой считаются сэкономленные токены
+        self.enabled = enabled and os.getenv('AI_CONTENT_FILTER_DISABLED', '').lower() not in ('1', 'true', 'yes')  # Переключатель фильтра
+        self.revision = 1  # Версия правил: увеличивается при их изменении (сбрасывает кэш очищенного текста)
+        self.splitter = None  # Счетчик токенов (создается при первом отчете)
+
+    def get_version(self):
+        """Версия фильтра для кэша очищенного текста: правила и параметры"""
+        if not self.enabled:
+            return "off"
+        return f"{self.revision}-{self.edge_lines}-{self.min_repeat_pages}-{self.repeat_share}-{self.min_run}-{self.min_word_share}"
+
+    def count_tokens(self, text):
+        """Количество токенов текста"""
+        if self.splitter is None:
+            self.splitter = TokenSplitter(self.model_name)
+        return self.splitter.count_tokens(text)
+
+    @staticmethod
+    def normalize(line):
+        """Строка для сравнения колонтитулов: номера заменены, регистр и пробелы не учитываются"""
+        return SPACES.sub(' ', DIGITS.sub('#', line)).strip().lower()
+
+    def edge_indexes(self, lines):
+        """Номера первых и последних непустых строк страницы"""
+        filled = [index for index, line in enumerate(lines) if line.strip()]
+        return set(filled[:self.edge_lines] + filled[-self.edge_lines:])
+
+    def find_running_lines(self, pages):
+        """Колонтитулы: строки у края страницы, повторяющиеся на многих страницах"""
+        counts = {}
+        for lines in pages:
+            for line in {self.normalize(lines[index]) for index in self.edge_indexes(lines)}:
+                counts[line] = counts.get(line, 0) + 1
+        threshold = max(self.min_repeat_pages, self.repeat_share * len(pages))
+        return {line for line, count in counts.items() if count >= threshold}
+
+    def is_low_density(self, line):
+        """Строка с числами и символами, где слова составляют малую долю"""
+        tokens = line.split()
+        return len(tokens) >= 3 and len(WORD.findall(line)) / len(tokens) < self.min_word_share
+
+    def mark_runs(self, lines, reasons, check, reason, ordered=False):
+        """Пометка серий из min_run и более строк, удовлетворяющих check (пустые строки серию не прерывают)"""
+        run = []  # Номера строк текущей серии
+        last_page = -1  # Номер страницы в последней строке оглавления
+        for index, line in enumerate(lines + ['\x00']):  # Служебная строка завершает последнюю серию
+            if index < len(lines) and (reasons[index] or not line.strip()):
+                continue
+            value = check(line) if index < len(lines) else None
+            page = int(value.group(1)) if ordered and value else None
+            if value and (not ordered or page >= last_page):  # Номера страниц в оглавлении не убывают
+                run.append(index)
+                last_page = page if ordered else last_page
+                continue
+            if len(run) >= self.min_run:
+                for run_index in run:
+                    reasons[run_index] = reason
+                if ordered and run[0] > 0:  # Заголовок оглавления над серией
+                    previous = [i for i in range(run[0]) if lines[i].strip()]
+                    if previous and TOC_HEADING.match(lines[previous[-1]].strip()):
+                        reasons[previous[-1]] = reason
+            run = []
+            last_page = -1
+            if value:  # Строка с меньшим номером страницы начинает новую серию
+                run = [index]
+                last_page = page
+
+    def filter_pages(self, pages_text, running=None):
+        """Фильтрация текста, разбитого на страницы; running - известные колонтитулы (None - найти по страницам).
+
+        Возвращает (страницы, удаленные строки по причинам)."""
+        pages = [page.split('\n') for page in pages_text]
+        if running is None:
+            running = self.find_running_lines(pages) if len(pages) >= self.min_repeat_pages else set()
+        lines = [line for page in pages for line in page]  # Правила серий действуют через границы страниц
+        reasons = [None] * len(lines)
+        position = 0
+        for page in pages:
+            for index in self.edge_indexes(page) if running else ():
+                if self.normalize(page[index]) in running:
+                    reasons[position + index] = 'repeated'
+            position += len(page)
+        for index, line in enumerate(lines):
+            if not reasons[index] and line.strip() and not LETTER.search(line):  # Номера страниц, строки из чисел и символов
+                reasons[index] = 'low_density'
+        self.mark_runs(lines, reasons, lambda line: TOC_ENTRY.match(line.strip()), 'toc', ordered=True)
+        self.mark_runs(lines, reasons, self.is_low_density, 'low_density')
+
+        removed = {'repeated': [], 'toc': [], 'low_density': []}
+        result = []
+        position = 0
+        for page in pages:
+            kept = []
+            for index, line in enumerate(page):
+                reason = reasons[position + index]
+                if reason:
+                    removed[reason].append(line)
+                else:
+                    kept.append(line)
+            text = '\n'.join(kept)
+            if text and reasons[position + len(page) - 1] and not text.endswith('\n'):
+                text += '\n'  # Удалена последняя строка страницы - текст следующей страницы не должен слиться с предыдущей строкой
+            position += len(page)
+            result.append(text)
+        return result, removed
+
+    def filter(self, text, page_offsets=None):
+        """Удаление колонтитулов, оглавления и таблиц с числами; возвращает (текст, отчет)"""
+        if not self.enabled or not text:
+            return text, None
+        offsets = list(page_offsets or [0]) + [len(text)]
+        pages, removed = self.filter_pages([text[start:end] for start, end in zip(offsets, offsets[1:])])
+        return ''.join(pages), self.make_report(removed, text)
+
+    def iter_filter(self, blocks, paged=False, removed=None, batch_chars=20000):
+        """Потоковая фильтрация: страницы PDF (paged=True) или абзацы, собранные в пакеты по batch_chars символов.
+
+        Колонтитулы распознаются по уже прочитанным страницам: строка удаляется, начиная со страницы,
+        на которой она встретилась у края в min_repeat_pages-й раз. Удаленные строки добавляются в removed.
+        """
+        if removed is None:
+            removed = {}
+        if not self.enabled:
+            yield from blocks
+            return
+        counts = {}  # Количество страниц, у края которых встречалась строка
+        buffer = []  # Абзацы текущего пакета
+        buffered = 0  # Символов в пакете
+        for block in blocks:
+            if paged:
+                lines = block.split('\n')
+                for line in {self.normalize(lines[index]) for index in self.edge_indexes(lines)}:
+                    counts[line] = counts.get(line, 0) + 1
+                running = {line for line, count in counts.items() if count >= self.min_repeat_pages}
+                yield from self._filter_batch(block, running, removed)
+                continue
+            buffer.append(block)
+            buffered += len(block)
+            if buffered >= batch_chars and block.endswith('\n'):  # Пакет заканчивается на границе абзаца
+                yield from self._filter_batch(''.join(buffer), set(), removed)
+                buffer, buffered = [], 0
+        if buffer:
+            yield from self._filter_batch(''.join(buffer), set(), removed)
+
+    def _filter_batch(self, text, running, removed):
+        """Фильтрация одной страницы или пакета абзацев потоковой обработки"""
+        pages, batch_removed = self.filter_pages([text], running)
+        for reason, lines in batch_removed.items():
+            removed.setdefault(reason, []).extend(lines)
+        if pages[0]:
+            yield pages[0]
+
+    def make_report(self, removed, text=None):
+        """Отчет о фильтрации: удаленные строки и сэкономленные токены по причинам (text - исходный текст для доли)"""
+        report = {'tokens': self.count_tokens(text) if text else None, 'saved_tokens': 0, 'lines': {}, 'saved': {}}
+        for reason, lines in removed.items():
+            tokens = self.count_tokens('\n'.join(lines)) if lines else 0
+            report['lines'][reason] = len(lines)
+            report['saved'][reason] = tokens
+            report['saved_tokens'] += tokens
+        return report
+
+    @staticmethod
+    def print_report(report, source_name=None):
+        """Вывод отчета о фильтрации"""
+        if not report:
+            return
+        names = {'repeated': 'колонтитулы', 'toc': 'оглавление', 'low_density': 'таблицы с числами'}
+        details = ", ".join(f"{names[reason]}: {report['lines'][reason]} строк ({report['saved'][reason]} ток.)"
+                            for reason in names if report['lines'].get(reason))
+        total = f" из {report['tokens']} ({report['saved_tokens'] / report['tokens']:.0%})" if report['tokens'] else ""
+        print(f"Фильтр содержимого{' ' + source_name if source_name else ''}: сэкономлено {report['saved_tokens']} "
+              f"токенов{total}{'; ' + details if details else ''}")
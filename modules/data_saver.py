@@ -1,8 +1,10 @@
 import os
-import re
+import csv
+import threading
 import pandas as pd
 from datetime import datetime
-from .json_manager import JsonTermManager
+from .term_store import create_term_manager
+from .term_records import parse_terms
 
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
@@ -14,7 +16,9 @@ class DataSaver:
             'excel': 'results/excel'
         }
         self._create_directories()
-        self.json_manager = JsonTermManager()
+        self.term_manager = create_term_manager()
+        self.stream_path = None
+        self.stream_lock = threading.Lock()
 
     def _create_directories(self):
         for directory in self.directories.values():
@@ -22,54 +26,31 @@ class DataSaver:
                 os.makedirs(directory)
 
     def parse_ai_terms(self, ai_response):
-        terms_data = []
-        current_term = {}
-        lines = [line.strip() for line in ai_response.split('\n') if line.strip()]
-        number_pattern = r'^\d+\.'
+        if isinstance(ai_response, list):
+            return ai_response
+        return parse_terms(ai_response, self.term_manager.get_term)
 
-        for line in lines:
-            line = line.strip()
-            is_numbered_term = bool(re.match(number_pattern, line) and ('Термин:' in line or '**Термин:**' in line))
-            is_simple_term = line.startswith(('Термин:', '**Термин:**', '### Термин:'))
-
-            if is_numbered_term or is_simple_term:
-                if current_term:
-                    terms_data.append(current_term)
-                current_term = {}
-                if '**Термин:**' in line:
-                    term = line.split('**Термин:**')[1].strip()
-                elif 'Термин:' in line:
-                    term = line.split('Термин:')[1].strip()
-                if is_numbered_term:
-                    term = re.sub(number_pattern, '', term).strip()
-                term = term.replace('#', '').strip()
-                current_term['термин'] = term
-
-            elif any(marker in line for marker in ['**Определение:**', 'Определение:', '- **Определение:**']):
-                definition = line
-                for marker in ['**Определение:**', 'Определение:', '- **Определение:**', '-']:
-                    definition = definition.replace(marker, '')
-                current_term['определение'] = definition.strip()
-
-            elif any(marker in line for marker in ['**Перевод:**', 'Перевод:', '- **Перевод:**']):
-                translation = line
-                for marker in ['**Перевод:**', 'Перевод:', '- **Перевод:**', '-']:
-                    translation = translation.replace(marker, '')
-                current_term['перевод'] = translation.strip()
-
-            elif any(marker in line for marker in ['**Релевантность:**', 'Релевантность:', '- **Релевантность:**']):
-                relevance = line
-                for marker in ['**Релевантность:**', 'Релевантность:', '- **Релевантность:**', '-']:
-                    relevance = relevance.replace(marker, '')
-                relevance = relevance.replace('%', '').strip()
-                try:
-                    current_term['релевантность'] = float(relevance)
-                except ValueError:
-                    current_term['релевантность'] = 0.0
+    def start_stream(self, filename):
+        base_filename = os.path.splitext(filename)[0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.stream_path = os.path.join(self.directories['csv'], f"stream_{timestamp}_{base_filename}.csv")
+        return self.stream_path
 
-        if current_term:
-            terms_data.append(current_term)
-        return terms_data
+    def save_streamed_term(self, term_block):
+        if not self.stream_path:
+            return False
+        terms_data = self.parse_ai_terms(term_block)
+        if not terms_data:
+            return False
+        fieldnames = ['термин', 'определение', 'перевод', 'релевантность']
+        with self.stream_lock:
+            write_header = not os.path.exists(self.stream_path)
+            with open(self.stream_path, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(terms_data)
+        return True
 
     def save_to_csv(self, terms_data, base_filename, metrics=None):
         if not terms_data:
@@ -136,10 +117,10 @@ class DataSaver:
         added_count = 0
         updated_count = 0
         if json_terms:
-            db_saved = self.json_manager.add_terms(json_terms)
+            db_saved = self.term_manager.add_terms(json_terms)
             if db_saved:
                 for term_data in json_terms.values():
-                    if self.json_manager.term_exists(term_data['term']):
+                    if self.term_manager.term_exists(term_data['term']):
                         updated_count += 1
                     else:
                         added_count += 1
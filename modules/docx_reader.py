@@ -0,0 +1,124 @@
+import zipfile  # Модуль для чтения архива .docx без распаковки на диск
+from lxml import etree  # Потоковый разбор XML (iterparse с отбором элементов на стороне C; устанавливается вместе с python-docx)
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'  # Пространство имен WordprocessingML
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'  # Пространство имен альтернативного содержимого
+
+# Элементы внутри фрагмента текста и их текстовые эквиваленты (как в python-docx)
+RUN_TEXT = {W + 'tab': '\t', W + 'ptab': '\t', W + 'cr': '\n', W + 'noBreakHyphen': '-'}
+# Содержимое, которое не входит в видимый текст: удаленные и перемещенные правки, запасная копия надписей
+SKIPPED = {W + 'del', W + 'moveFrom', MC + 'Fallback'}
+# Элементы, о которых сообщает разборщик; события остальных (форматирование, закладки) в Python не передаются
+TAGS = [W + 'body', W + 'p', W + 'r', W + 't', W + 'br', W + 'tc', W + 'tr', W + 'tbl', W + 'sdt',
+        W + 'footnoteReference', W + 'endnoteReference', *RUN_TEXT, *SKIPPED]
+
+def is_docx(file_path):
+    """Является ли файл документом OOXML (zip-архивом с word/document.xml)"""
+    if not zipfile.is_zipfile(file_path):
+        return False
+    with zipfile.ZipFile(file_path) as archive:
+        return 'word/document.xml' in archive.namelist()
+
+def read_notes(archive, part, tag):
+    """Тексты сносок (footnotes.xml или endnotes.xml): {id: текст}; служебные разделители пропускаются"""
+    if part not in archive.namelist():
+        return {}
+    notes = {}
+    with archive.open(part) as file:
+        root = etree.parse(file).getroot()
+    for note in root.iter(W + tag):
+        if note.get(W + 'type') in ('separator', 'continuationSeparator', 'continuationNotice'):
+            continue
+        paragraphs = [''.join(paragraph_parts(paragraph)) for paragraph in note.iter(W + 'p')]
+        notes[note.get(W + 'id')] = ' '.join(text for text in paragraphs if text)
+    return notes
+
+def paragraph_parts(paragraph):
+    """Текст разобранного целиком абзаца (используется для сносок, они небольшие)"""
+    for element in paragraph.iter(W + 't', W + 'br', *RUN_TEXT):
+        if element.getparent().tag != W + 'r':  # Позиции табуляции в свойствах абзаца текста не дают
+            continue
+        if element.tag == W + 't':
+            yield element.text or ''
+        elif element.tag in RUN_TEXT:
+            yield RUN_TEXT[element.tag]
+        elif element.tag == W + 'br':
+            yield '\n' if element.get(W + 'type', 'textWrapping') == 'textWrapping' else ''
+
+def iter_docx_text(file_path):
+    """Потоковое чтение word/document.xml: абзацы, строки таблиц и сноски в порядке документа.
+
+    Каждый абзац выдается с переносом строки; строка таблицы - ячейками через табуляцию; текст сноски -
+    отдельной строкой после абзаца (или строки таблицы) со ссылкой на нее. Разобранные элементы сразу
+    удаляются из дерева, поэтому память не растет с размером документа.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        notes = {('footnote', key): text for key, text in read_notes(archive, 'word/footnotes.xml', 'footnote').items()}
+        notes.update({('endnote', key): text for key, text in read_notes(archive, 'word/endnotes.xml', 'endnote').items()})
+        paragraphs = []  # Стек частей текста открытых абзацев (абзац может быть вложен в надпись)
+        cells = []  # Стек открытых ячеек таблиц: список абзацев ячейки
+        rows = []  # Стек открытых строк таблиц: список текстов ячеек
+        pending_notes = []  # Сноски, на которые сослались в текущем абзаце или строке таблицы
+        in_run = 0  # Глубина вложенности фрагментов текста (w:r): w:tab вне фрагмента - позиция табуляции
+        skipped = 0  # Глубина вложенности пропускаемого содержимого
+        body = None  # Тело документа: разобранные элементы удаляются из него
+        with archive.open('word/document.xml') as file:
+            for event, element in etree.iterparse(file, events=('start', 'end'), tag=TAGS, huge_tree=True):
+                tag = element.tag
+                if event == 'start':
+                    if tag in SKIPPED:
+                        skipped += 1
+                    elif tag == W + 'r':
+                        in_run += 1
+                    elif tag == W + 'p':
+                        paragraphs.append([])
+                    elif tag == W + 'tc':
+                        cells.append([])
+                    elif tag == W + 'tr':
+                        rows.append([])
+                    elif tag == W + 'body':
+                        body = element
+                    continue
+
+                if tag in SKIPPED:
+                    skipped -= 1
+                elif tag == W + 'r':
+                    in_run -= 1
+                elif skipped or not paragraphs:
+                    pass
+                elif in_run and tag == W + 't':
+                    paragraphs[-1].append(element.text or '')
+                elif in_run and tag in RUN_TEXT:
+                    paragraphs[-1].append(RUN_TEXT[tag])
+                elif in_run and tag == W + 'br':
+                    if element.get(W + 'type', 'textWrapping') == 'textWrapping':  # Разрывы страниц и колонок текста не дают
+                        paragraphs[-1].append('\n')
+                elif tag in (W + 'footnoteReference', W + 'endnoteReference'):
+                    key = ('footnote' if tag == W + 'footnoteReference' else 'endnote', element.get(W + 'id'))
+                    if notes.get(key):
+                        pending_notes.append(notes[key])
+
+                if tag == W + 'p':
+                    text = ''.join(paragraphs.pop())
+                    if paragraphs:  # Абзац надписи внутри другого абзаца - отдельной строкой внутри внешнего абзаца
+                        paragraphs[-1].append(text + '\n')
+                    elif cells:  # Абзац ячейки таблицы
+                        cells[-1].append(text)
+                    else:
+                        yield text + '\n'
+                elif tag == W + 'tc':
+                    cell = ' '.join(text for text in cells.pop() if text)
+                    if rows:
+                        rows[-1].append(cell)
+                elif tag == W + 'tr':
+                    row = '\t'.join(rows.pop())
+                    if cells:  # Вложенная таблица становится текстом ячейки внешней таблицы
+                        cells[-1].append(row)
+                    elif row.strip():
+                        yield row + '\n'
+                if pending_notes and not paragraphs and not cells and tag in (W + 'p', W + 'tr'):
+                    for note in pending_notes:
+                        yield note + '\n'
+                    pending_notes = []
+                if body is not None and not paragraphs and not cells and tag in (W + 'p', W + 'tbl', W + 'sdt'):
+                    body.clear()  # Элемент верхнего уровня разобран - освобождаем память
@@ -0,0 +1,128 @@
+import threading  # Модуль для синхронизации потоков
+import time  # Модуль для работы со временем
+from collections import deque  # Очередь последних измерений задержки
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED  # Пул потоков для дублирующих запросов
+
+class HedgePolicy:  # Класс для отправки дублирующего запроса, если ответ задерживается дольше обычного
+    def __init__(self, percentile=95, budget=0.1, min_samples=10, min_threshold=2.0, window=200, enabled=True):  # Конструктор класса
+        self.percentile = percentile  # Перцентиль задержки, после которого отправляется дублирующий запрос
+        self.budget = budget  # Допустимая доля дополнительных запросов от общего числа запросов
+        self.min_samples = min_samples  # Сколько измерений нужно, прежде чем дублировать запросы
+        self.min_threshold = min_threshold  # Минимальный порог в секундах (быстрые ответы не дублируются)
+        self.latencies = deque(maxlen=window)  # Задержки последних успешных запросов в секундах
+        self.enabled = enabled  # Переключатель дублирования
+        self.executor = None  # Пул потоков для дублирующих запросов (создается при первом дублировании)
+        self.lock = threading.Lock()  # Блокировка для обновления статистики из разных потоков
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Сброс статистики текущего запуска"""
+        with self.lock:
+            self.requests = 0  # Запросов через политику
+            self.fired = 0  # Отправлено дублирующих запросов
+            self.won = 0  # Дублирующий запрос ответил раньше исходного
+            self.limited = 0  # Дублирующих запросов не отправлено: ограничитель запросов не дал места
+
+    def record(self, latency):
+        """Учет задержки успешного запроса"""
+        with self.lock:
+            self.latencies.append(latency)
+
+    def threshold(self):
+        """Порог ожидания перед дублированием (перцентиль последних задержек) или None, пока измерений мало"""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_threshold, ordered[index])
+
+    def _take_budget(self):
+        """Разрешение на дублирующий запрос в пределах бюджета"""
+        with self.lock:
+            if self.fired + 1 > self.budget * self.requests:
+                return False
+            self.fired += 1
+            return True
+
+    def _timed(self, request):
+        """Выполнение запроса с измерением задержки"""
+        started = time.time()
+        result = request()
+        self.record(time.time() - started)
+        return result
+
+    def _start(self, request):
+        """Запуск запроса в отдельном потоке; результат передается через Future"""
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run():
+            try:
+                future.set_result(self._timed(request))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name='hedge-primary', daemon=True).start()
+        return future
+
+    def _run_hedge(self, request, release):
+        """Выполнение дублирующего запроса; место в ограничителе освобождается после ответа или ошибки"""
+        try:
+            result = self._timed(request)
+        except Exception as e:
+            if release:
+                release(e)
+            raise
+        if release:
+            release(None)
+        return result
+
+    def call(self, request, acquire=None, release=None):
+        """Выполнение запроса; если ответ задерживается дольше порога, отправляется дубликат и берется первый ответ.
+
+        acquire() без ожидания занимает место для дубликата в ограничителе запросов (False - дубликат не отправляется),
+        release(error) освобождает его после ответа (error - исключение или None).
+        """
+        with self.lock:
+            self.requests += 1
+        threshold = self.threshold() if self.enabled else None
+        if threshold is None:  # Порог еще не известен - запрос выполняется в текущем потоке
+            return self._timed(request)
+
+        primary = self._start(request)  # Отдельный поток без очереди: время ожидания отсчитывается от начала запроса
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._take_budget():
+            return primary.result()
+        if acquire is not None and not acquire():  # Дубликат расходует тот же бюджет запросов и токенов, что и исходный
+            with self.lock:
+                self.fired -= 1
+                self.limited += 1
+            return primary.result()
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='hedge')
+        hedge = self.executor.submit(self._run_hedge, request, release)  # Исходный запрос продолжает выполняться
+        futures = [primary, hedge]
+        error = None
+        while futures:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self.lock:
+                            self.won += 1
+                    return future.result()
+                error = future.exception()
+            futures = list(pending)
+        raise error
+
+    def report(self):
+        """Вывод статистики дублирующих запросов за запуск"""
+        if not self.enabled or not self.requests:
+            return
+        threshold = self.threshold()
+        threshold_text = f"{threshold:.1f} с" if threshold is not None else "не определен"
+        print(f"Дублирующие запросы: отправлено {self.fired} ({self.fired / self.requests:.0%} запросов), "
+              f"ответили раньше исходного {self.won}, не отправлено из-за ограничителя {self.limited}, порог {threshold_text}")
@@ -1,12 +1,14 @@
 import json  # Импортируем модуль для работы с JSON
 import os  # Импортируем модуль для работы с операционной системой
 from datetime import datetime  # Импортируем класс для работы с датой и временем
+from .lemmatizer import get_lemmatizer  # Импортируем общий лемматизатор для поиска других форм термина
 
 class JsonTermManager:  # Класс для управления терминами в JSON формате
     def __init__(self):  # Конструктор класса
         self.db_folder = 'db'  # Папка для хранения базы данных
         self.db_file = 'db_terms.json'  # Имя файла базы данных
         self.db_path = os.path.join(self.db_folder, self.db_file)  # Полный путь к файлу базы данных
+        self.lemmatizer = get_lemmatizer()  # Нормальные формы названий терминов
         self._ensure_db_exists()  # Вызываем метод для проверки существования базы данных
 
     def _ensure_db_exists(self):  # Приватный метод для проверки существования базы данных
@@ -38,6 +40,18 @@ class JsonTermManager:  # Класс для управления термина
             print(f"Ошибка при сохранении базы терминов: {str(e)}")  # Выводим сообщение об ошибке
             return False  # Возвращаем False в случае ошибки
 
+    def find_key(self, term_name, terms=None):  # Метод для поиска термина с учетом словоформ
+        """Название термина в базе: точное совпадение или термин с той же нормальной формой; None, если его нет"""
+        terms = self._load_terms() if terms is None else terms  # Загружаем термины, если они не переданы
+        if term_name in terms:  # Точное совпадение
+            return term_name
+        lemma = self.lemmatizer.lemmatize(term_name)  # Нормальная форма искомого термина
+        names = list(terms)
+        for name, name_lemma in zip(names, self.lemmatizer.lemmatize_many(names)):  # Формы слов берутся из кэша лемм
+            if name_lemma == lemma:
+                return name
+        return None
+
     def add_terms(self, new_terms, relevance_threshold=80):  # Метод для добавления новых терминов
         """
         Добавление новых терминов в базу
@@ -54,8 +68,18 @@ class JsonTermManager:  # Класс для управления термина
                 print("Ошибка: new_terms должен быть словарем")  # Выводим сообщение об ошибке
                 return False  # Возвращаем False в случае ошибки
 
-            # Обновляем существующие термины новыми
-            existing_terms.update(new_terms)  # Обновляем словарь существующих терминов новыми
+            # Обновляем существующие термины новыми (другая форма существующего термина обновляет его запись)
+            names = list(existing_terms)  # Названия терминов базы
+            by_lemma = {}  # Нормальная форма -> название термина в базе
+            for name, lemma in zip(names, self.lemmatizer.lemmatize_many(names)):
+                by_lemma.setdefault(lemma, name)
+            for name, lemma in zip(new_terms, self.lemmatizer.lemmatize_many(list(new_terms))):
+                key = name if name in existing_terms else by_lemma.get(lemma, name)  # Название, под которым хранится термин
+                data = new_terms[name]
+                if key != name and isinstance(data, dict):  # Запись хранится под прежним названием
+                    data = dict(data, term=key)
+                existing_terms[key] = data
+                by_lemma.setdefault(lemma, key)
 
             # Сохраняем обновленную базу
             return self._save_terms(existing_terms)  # Сохраняем обновленные термины и возвращаем результат
@@ -71,15 +95,23 @@ class JsonTermManager:  # Класс для управления термина
     def get_term(self, term_name):  # Метод для получения конкретного термина
         """Получение конкретного термина по названию"""
         terms = self._load_terms()  # Загружаем все термины
-        return terms.get(term_name)  # Возвращаем термин по ключу или None, если термин не найден
+        key = self.find_key(term_name, terms)  # Название термина или другой его формы в базе
+        return terms.get(key) if key else None  # Возвращаем термин по ключу или None, если термин не найден
     
     def term_exists(self, term_name):  # Метод для проверки существования термина
         """Проверяет существование термина в базе данных"""
         try:  # Начало блока обработки исключений
             with open(self.db_path, 'r', encoding='utf-8') as file:  # Открываем файл для чтения
                 data = json.load(file)  # Загружаем JSON из файла
-                return term_name in data  # Проверяем наличие термина в словаре и возвращаем результат
+                return self.find_key(term_name, data) is not None  # Проверяем наличие термина (в любой форме) и возвращаем результат
         except FileNotFoundError:  # Если файл не найден
             return False  # Возвращаем False
         except json.JSONDecodeError:  # Если произошла ошибка декодирования JSON
             return False  # Возвращаем False
+
+    def find_terms_in_text(self, text, limit=None):  # Метод для поиска известных терминов в тексте
+        """Поиск терминов базы, которые встречаются в тексте (самые релевантные первыми)"""
+        text_lower = text.lower()  # Сравниваем без учета регистра
+        found = [data for name, data in self._load_terms().items() if name.lower() in text_lower]  # Термины, найденные в тексте
+        found.sort(key=lambda data: data.get('relevance', 0), reverse=True)  # Сортируем по убыванию релевантности
+        return found[:limit] if limit else found  # Возвращаем не больше limit терминов
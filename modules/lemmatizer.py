@@ -0,0 +1,145 @@
+import atexit  # Модуль для сохранения кэша при завершении программы
+import importlib.metadata  # Модуль для версии pymorphy2 без загрузки словарей
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import threading  # Модуль для синхронизации доступа из нескольких потоков
+from collections import OrderedDict  # Упорядоченный словарь для вытеснения давно не использованных слов
+
+class Lemmatizer:  # Класс для приведения терминов к нормальной форме с ленивой загрузкой словарей
+    def __init__(self, cache_path='cache/lemmas.json', max_size=200000, enabled=True):  # Конструктор класса
+        self.cache_path = cache_path  # Файл, в котором кэш сохраняется между запусками
+        self.max_size = max_size  # Максимальное количество слов в кэше
+        self.persistent = enabled and os.getenv('AI_LEMMA_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')  # Сохранять ли кэш на диск
+        self.cache = OrderedDict()  # Слово -> нормальная форма (последние использованные в конце)
+        self.morph = None  # Морфологический анализатор pymorphy2 (загружается при первом неизвестном слове)
+        self.analyzer = None  # Название анализатора: 'pymorphy2 <версия>' или 'lower' (без лемматизации)
+        self.loaded = False  # Загружен ли кэш с диска
+        self.changed = False  # Есть ли несохраненные слова
+        self.hits = 0  # Слов найдено в кэше
+        self.misses = 0  # Слов разобрано анализатором
+        self.lock = threading.Lock()  # Блокировка для кэша и статистики
+        self.morph_lock = threading.Lock()  # Блокировка загрузки анализатора
+
+    def _get_morph(self):
+        """Загрузка анализатора при первом обращении; без pymorphy2 слова только приводятся к нижнему регистру"""
+        with self.morph_lock:
+            if self.analyzer is None:
+                try:
+                    import pymorphy2  # Словари загружаются несколько секунд, поэтому только когда они нужны
+                    self.morph = pymorphy2.MorphAnalyzer()
+                    self.analyzer = f"pymorphy2 {pymorphy2.__version__}"
+                except Exception as e:  # Библиотека не установлена или несовместима с версией Python
+                    print(f"[!] Лемматизация недоступна ({type(e).__name__}: {e}), термины сравниваются без нормализации")
+                    self.analyzer = 'lower'
+        return self.morph
+
+    def get_analyzer(self):
+        """Название анализатора, которым разбираются слова (анализатор загружается при первом обращении)"""
+        self._get_morph()
+        return self.analyzer
+
+    def analyzer_name(self):
+        """Название анализатора без загрузки словарей: фактическое, если он уже загружен, иначе по установленной версии pymorphy2"""
+        if self.analyzer is not None:
+            return self.analyzer
+        try:
+            return f"pymorphy2 {importlib.metadata.version('pymorphy2')}"
+        except importlib.metadata.PackageNotFoundError:
+            return 'lower'
+
+    def _load(self):
+        """Загрузка кэша, сохраненного прошлым запуском (вызывается под блокировкой)"""
+        self.loaded = True
+        if not self.persistent:
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        analyzer = self.analyzer_name()  # Словари загружаются, только когда встретится слово не из кэша
+        if data.get('analyzer') != analyzer:  # Иначе в одном запуске смешались бы леммы разных анализаторов
+            print(f"[!] Кэш лемм создан анализатором {data.get('analyzer')}, сейчас используется {analyzer}: кэш не загружается")
+            return
+        for word, lemma in data.get('lemmas', {}).items():
+            self.cache.setdefault(word, lemma)
+
+    def save(self):
+        """Сохранение кэша на диск (слова, разобранные без pymorphy2, не сохраняются)"""
+        with self.lock:
+            if not self.persistent or not self.changed or self.analyzer == 'lower':
+                return False
+            data = {'analyzer': self.analyzer, 'lemmas': dict(self.cache)}
+            self.changed = False
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.{threading.get_ident()}.tmp"  # Пишем во временный файл, чтобы не оставить битый кэш
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Ошибка при сохранении кэша лемм: {str(e)}")
+            return False
+        return True
+
+    def lemmatize_words(self, words):
+        """Нормальные формы слов (в нижнем регистре); каждое неизвестное слово разбирается один раз"""
+        if self.analyzer == 'lower':  # Без pymorphy2 нормальная форма слова - само слово
+            return {word: word for word in words}
+        lemmas = {}
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            for word in words:
+                if word in lemmas:
+                    continue
+                lemma = self.cache.get(word)
+                if lemma is None:
+                    lemmas[word] = None
+                    continue
+                self.cache.move_to_end(word)
+                lemmas[word] = lemma
+                self.hits += 1
+        unknown = [word for word, lemma in lemmas.items() if lemma is None]
+        if unknown:
+            morph = self._get_morph()
+            if morph is None:  # pymorphy2 не загрузился: леммы из кэша, созданного им, не смешиваются со словами без разбора
+                return {word: word for word in lemmas}
+            parsed = {word: morph.parse(word)[0].normal_form for word in unknown}  # Разбор вне блокировки
+            with self.lock:
+                for word, lemma in parsed.items():
+                    self.cache[word] = lemma
+                    self.cache.move_to_end(word)
+                lemmas.update(parsed)
+                self.misses += len(parsed)
+                self.changed = True
+                while len(self.cache) > self.max_size:  # Вытесняются давно не использованные слова
+                    self.cache.popitem(last=False)
+        return lemmas
+
+    def lemmatize(self, term):
+        """Нормальная форма термина: слова в нижнем регистре и нормальной форме через пробел"""
+        return self.lemmatize_many([term])[0]
+
+    def lemmatize_many(self, terms):
+        """Нормальные формы списка терминов в том же порядке (одно обращение к кэшу на весь список)"""
+        split_terms = [term.lower().split() for term in terms]
+        lemmas = self.lemmatize_words(word for words in split_terms for word in words)
+        return [' '.join(lemmas[word] for word in words) for words in split_terms]
+
+    def report(self):
+        """Вывод статистики кэша лемм"""
+        if self.hits or self.misses:
+            print(f"Кэш лемм: попаданий {self.hits}, разобрано слов {self.misses}")
+
+_shared = None  # Общий экземпляр для метрик, объединения результатов и базы терминов
+_shared_lock = threading.Lock()
+
+def get_lemmatizer():
+    """Общий лемматизатор процесса; кэш сохраняется при завершении программы"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Lemmatizer()
+            atexit.register(_shared.save)
+    return _shared
@@ -1,39 +1,37 @@
 import os
-from pymorphy2 import MorphAnalyzer
-from fuzzywuzzy import fuzz
-
-morph = MorphAnalyzer()
+from .lemmatizer import get_lemmatizer
+from .reference_terms import ReferenceTerms, load_compiled_reference_terms
+from .term_matcher import TermMatcher
 
 def lemmatize_term(term):
-    return ' '.join([morph.parse(word)[0].normal_form for word in term.lower().split()])
+    return get_lemmatizer().lemmatize(term)
 
-def load_reference_terms(filename):
+def load_reference_terms(filename, lemmatize=True):
     base = os.path.splitext(os.path.basename(filename))[0]
     ref_file = os.path.join('reference_terms', f'{base}.txt')
     if not os.path.exists(ref_file):
         print(f"[!] Эталонный файл не найден: {ref_file}")
         return set()
-    with open(ref_file, 'r', encoding='utf-8') as f:
-        terms = set(lemmatize_term(line.strip()) for line in f if line.strip())
-    return terms
+    if not lemmatize:  # только нижний регистр, для сравнения со словоформами как есть
+        with open(ref_file, 'r', encoding='utf-8') as f:
+            return set(line.strip().lower() for line in f if line.strip())
+    return load_compiled_reference_terms(ref_file)  # уже лемматизированы, с готовым индексом
 
 def normalize_term(term):
     return lemmatize_term(term.strip())
 
-def evaluate_terms(predicted_terms, reference_terms, fuzzy_threshold=90):
-    predicted_set = set(map(normalize_term, predicted_terms))
-    reference_set = set(reference_terms)  # уже лемматизированы
+def evaluate_terms(predicted_terms, reference_terms, fuzzy_threshold=90, lemmatize=True):
+    if lemmatize:
+        predicted_set = set(get_lemmatizer().lemmatize_many([term.strip() for term in predicted_terms]))
+    else:
+        predicted_set = set(term.strip().lower() for term in predicted_terms)
+    reference_set = set(reference_terms)  # нормализованы так же, как предсказанные
 
-    true_positives = 0
-    matched_pred = set()
-    matched_ref = set()
-    for pred in predicted_set:
-        for ref in reference_set:
-            if fuzz.ratio(pred, ref) >= fuzzy_threshold:
-                true_positives += 1
-                matched_pred.add(pred)
-                matched_ref.add(ref)
-                break
+    if isinstance(reference_terms, ReferenceTerms):
+        matcher = reference_terms.matcher
+    else:
+        matcher = TermMatcher(reference_set)
+    true_positives = len(matcher.match_many(predicted_set, fuzzy_threshold))
 
     precision = true_positives / len(predicted_set) if predicted_set else 0
     recall = true_positives / len(reference_set) if reference_set else 0
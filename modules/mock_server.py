@@ -0,0 +1,220 @@
+"""Локальный OpenAI-совместимый сервер для нагрузочной проверки AIProcessor без обращения к платному API
+
+Запуск: python -m modules.mock_server --port 8000 --latency lognormal --latency-mean 2 --rate-429 0.05
+Затем: OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=mock python main.py
+"""
+import argparse  # Модуль для разбора аргументов командной строки
+import json  # Модуль для работы с JSON
+import math  # Модуль математических функций
+import random  # Модуль для генерации случайных задержек и сбоев
+import sys  # Модуль для доступа к информации об исключениях
+import threading  # Модуль для синхронизации потоков
+import time  # Модуль для работы со временем
+import uuid  # Модуль для генерации идентификаторов ответов
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Многопоточный HTTP-сервер из стандартной библиотеки
+from .batch_backend import local_glossary_terms, local_glossary_answer  # Детерминированные ответы в формате глоссария
+
+GATEWAY_TIMEOUT_PAGE = b"<html><head><title>504 Gateway Time-out</title></head><body><center><h1>504 Gateway Time-out</h1></center></body></html>"
+
+class MockSettings:  # Класс настроек поведения сервера: задержки, скорость генерации и сбои
+    def __init__(self, latency='constant', latency_mean=0.5, latency_spread=0.5, tokens_per_second=0,
+                 rate_429=0.0, rate_504=0.0, rate_eof=0.0, retry_after=1, seed=None):  # Конструктор класса
+        self.latency = latency  # Распределение задержки до первого токена: constant, uniform или lognormal
+        self.latency_mean = latency_mean  # Средняя задержка в секундах
+        self.latency_spread = latency_spread  # Разброс: полуширина для uniform, сигма для lognormal
+        self.tokens_per_second = tokens_per_second  # Скорость генерации ответа (0 - без ограничения)
+        self.rate_429 = rate_429  # Доля запросов, получающих ответ 429 Too Many Requests
+        self.rate_504 = rate_504  # Доля запросов, получающих HTML-ответ 504 Gateway Time-out
+        self.rate_eof = rate_eof  # Доля запросов, на которые сервер закрывает соединение без ответа
+        self.retry_after = retry_after  # Значение заголовка Retry-After для ответов 429
+        self.random = random.Random(seed)  # Генератор случайных чисел (с seed результаты воспроизводимы)
+        self.lock = threading.Lock()  # Блокировка генератора и счетчиков
+        self.stats = {'requests': 0, 'ok': 0, '429': 0, '504': 0, 'eof': 0}  # Счетчики ответов
+
+    def sample_latency(self):
+        """Задержка перед ответом в секундах"""
+        with self.lock:
+            if self.latency == 'uniform':
+                return max(0.0, self.random.uniform(self.latency_mean - self.latency_spread, self.latency_mean + self.latency_spread))
+            if self.latency == 'lognormal':
+                # Параметры подобраны так, чтобы среднее значение было равно latency_mean
+                sigma = self.latency_spread
+                mu = math.log(max(self.latency_mean, 1e-6)) - sigma ** 2 / 2
+                return self.random.lognormvariate(mu, sigma)
+            return self.latency_mean
+
+    def sample_fault(self):
+        """Тип сбоя для очередного запроса или None"""
+        with self.lock:
+            self.stats['requests'] += 1
+            value = self.random.random()
+            for fault, rate in (('429', self.rate_429), ('504', self.rate_504), ('eof', self.rate_eof)):
+                if value < rate:
+                    self.stats[fault] += 1
+                    return fault
+                value -= rate
+            self.stats['ok'] += 1
+            return None
+
+def count_tokens(text):
+    """Примерная оценка количества токенов (1 токен ~ 4 символа)"""
+    return max(1, len(text) // 4)
+
+def build_answer(body):
+    """Ответ в формате глоссария; при запросе структурированного ответа - JSON"""
+    messages = body.get('messages', [])
+    if body.get('response_format'):
+        return json.dumps({'terms': local_glossary_terms(messages)}, ensure_ascii=False)
+    return local_glossary_answer(messages)
+
+class MockRequestHandler(BaseHTTPRequestHandler):  # Обработчик запросов OpenAI-совместимого API
+    protocol_version = 'HTTP/1.1'  # Поддерживаем keep-alive, как настоящий API
+    settings = MockSettings()  # Настройки заменяются при запуске сервера
+
+    def log_message(self, format, *args):
+        """Журнал запросов не выводится, чтобы не мешать прогресс-барам клиента"""
+
+    def _send_json(self, status, payload, headers=None):
+        """Отправка JSON-ответа"""
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        """Список моделей и статистика сервера"""
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'owned_by': 'mock'} for model in ('gpt-4o', 'deepseek-chat')
+            ]})
+        elif self.path.rstrip('/').endswith('/stats'):
+            with self.settings.lock:
+                self._send_json(200, dict(self.settings.stats))
+        else:
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+    def do_POST(self):
+        """Обработка запроса chat/completions"""
+        length = int(self.headers.get('Content-Length', 0))
+        raw_body = self.rfile.read(length) if length else b'{}'
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+        try:
+            body = json.loads(raw_body)
+        except json.JSONDecodeError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON', 'type': 'invalid_request_error'}})
+            return
+
+        time.sleep(self.settings.sample_latency())
+        fault = self.settings.sample_fault()
+        if fault == '429':
+            self._send_json(429, {'error': {'message': 'Rate limit reached (mock)', 'type': 'rate_limit_error', 'code': 'rate_limit_exceeded'}},
+                            headers={'Retry-After': str(self.settings.retry_after)})
+            return
+        if fault == '504':
+            self.send_response(504)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(GATEWAY_TIMEOUT_PAGE)))
+            self.end_headers()
+            self.wfile.write(GATEWAY_TIMEOUT_PAGE)
+            return
+        if fault == 'eof':
+            self.close_connection = True  # Соединение закрывается без ответа - клиент получает ошибку EOF
+            return
+
+        answer = build_answer(body)
+        prompt_tokens = sum(count_tokens(message.get('content') or '') for message in body.get('messages', []))
+        completion_tokens = count_tokens(answer)
+        model = body.get('model', 'gpt-4o')
+        if body.get('stream'):
+            self._stream_answer(model, answer)
+            return
+        if self.settings.tokens_per_second:  # Без потоковой передачи клиент ждет генерацию всего ответа
+            time.sleep(completion_tokens / self.settings.tokens_per_second)
+        self._send_json(200, {
+            'id': f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        })
+
+    def _write_chunk(self, data):
+        """Отправка части ответа при передаче Transfer-Encoding: chunked"""
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_answer(self, model, answer):
+        """Потоковая передача ответа в формате server-sent events"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        step = 16  # Символов в одной части (примерно 4 токена)
+        delay = (step / 4) / self.settings.tokens_per_second if self.settings.tokens_per_second else 0
+        pieces = [{'role': 'assistant', 'content': ''}] + [{'content': answer[i:i + step]} for i in range(0, len(answer), step)]
+        for index, delta in enumerate(pieces):
+            event = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': 'stop' if index == len(pieces) - 1 else None}]
+            }
+            self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+            if delay:
+                time.sleep(delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")  # Завершающая часть нулевой длины
+
+class MockServer(ThreadingHTTPServer):  # Многопоточный сервер, не выводящий ошибки разорванных клиентом соединений
+    daemon_threads = True  # Потоки обработчиков не мешают завершению процесса
+
+    def handle_error(self, request, client_address):
+        """Разрыв соединения клиентом (в том числе после внедренного EOF) - ожидаемая ситуация"""
+        error = sys.exc_info()[1]
+        if isinstance(error, (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def create_server(host='127.0.0.1', port=8000, settings=None):
+    """Создание сервера (для запуска в отдельном потоке из бенчмарков)"""
+    handler = type('ConfiguredMockRequestHandler', (MockRequestHandler,), {'settings': settings or MockSettings()})
+    return MockServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный OpenAI-совместимый сервер с задержками и сбоями")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес сервера")
+    parser.add_argument('--port', type=int, default=8000, help="Порт сервера")
+    parser.add_argument('--latency', choices=('constant', 'uniform', 'lognormal'), default='constant', help="Распределение задержки")
+    parser.add_argument('--latency-mean', type=float, default=0.5, help="Средняя задержка в секундах")
+    parser.add_argument('--latency-spread', type=float, default=0.5, help="Разброс задержки (uniform: полуширина, lognormal: сигма)")
+    parser.add_argument('--tokens-per-second', type=float, default=0, help="Скорость генерации ответа (0 - без ограничения)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument('--rate-504', type=float, default=0.0, help="Доля ответов 504")
+    parser.add_argument('--rate-eof', type=float, default=0.0, help="Доля обрывов соединения")
+    parser.add_argument('--retry-after', type=int, default=1, help="Заголовок Retry-After для ответов 429 (в секундах)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed для воспроизводимых задержек и сбоев")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.latency_mean, args.latency_spread, args.tokens_per_second,
+                            args.rate_429, args.rate_504, args.rate_eof, args.retry_after, args.seed)
+    server = create_server(args.host, args.port, settings)
+    print(f"Тестовый сервер запущен: OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nСервер остановлен. Статистика: {settings.stats}")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os  # Модуль для работы с путями файлов
+import time  # Модуль для работы со временем
+
+class DocumentPipeline:  # Класс для потоковой обработки документа: извлечение -> очистка -> фрагменты -> ИИ
+    def __init__(self, extractor, cleaner, ai_processor):  # Конструктор класса
+        self.extractor = extractor  # Извлекатель текста (выдает страницы или абзацы)
+        self.cleaner = cleaner  # Очиститель текста (выдает очищенные блоки)
+        self.ai_processor = ai_processor  # Обработчик ИИ (принимает фрагменты по мере готовности)
+        self.stats = {}  # Статистика последнего документа
+
+    def _count(self, blocks, key):
+        """Подсчет символов проходящих через этап частей без их накопления"""
+        for block in blocks:
+            self.stats[key] += len(block)
+            yield block
+
+    def _watch_errors(self, blocks):
+        """Запоминание ошибки чтения файла: обработка прерывается, и документ не считается обработанным"""
+        try:
+            yield from blocks
+        except Exception as e:
+            self.stats['error'] = f"Ошибка при извлечении текста: {str(e)}"
+            raise
+
+    def _watch_chunks(self, chunks):
+        """Учет времени готовности первого фрагмента"""
+        for chunk in chunks:
+            if self.stats['first_chunk_seconds'] is None:
+                self.stats['first_chunk_seconds'] = round(time.time() - self.stats['started'], 2)
+            yield chunk
+
+    def process_file(self, file_path, domain, source_name=None):
+        """Обработка файла без построения полного текста: первый фрагмент отправляется, пока читаются следующие страницы"""
+        self.stats = {'characters': 0, 'filtered_characters': 0, 'cleaned_characters': 0, 'first_chunk_seconds': None,
+                      'started': time.time(), 'filter_report': None, 'error': None}
+        max_chunk_tokens = self.ai_processor.get_max_chunk_tokens(domain)
+        self.ai_processor.planned_chunk_tokens = max_chunk_tokens  # Размер фиксируется на время запуска
+        blocks = self._count(self._watch_errors(self.extractor.iter_raw_text(file_path)), 'characters')
+        content_filter = self.extractor.content_filter  # Колонтитулы, оглавление и таблицы с числами удаляются до очистки
+        paged = os.path.splitext(file_path)[1].lower() == '.pdf'  # Части PDF - страницы, у них есть колонтитулы
+        removed = {}  # Строки, удаленные фильтром содержимого
+        blocks = self._count(content_filter.iter_filter(blocks, paged=paged, removed=removed), 'filtered_characters')
+        cleaned = self._count(self.cleaner.iter_clean(blocks), 'cleaned_characters')
+        chunks = self._watch_chunks(self.ai_processor.get_splitter().iter_split(cleaned, max_chunk_tokens))
+        print(f"Потоковая обработка {source_name or file_path}: фрагменты до {max_chunk_tokens} токенов отправляются по мере готовности")
+        result = self.ai_processor.run_chunks(chunks, domain)
+        if content_filter.enabled:  # Отчет по строкам, удаленным фильтром содержимого
+            self.stats['filter_report'] = content_filter.make_report(removed)
+            content_filter.print_report(self.stats['filter_report'], source_name)
+        if self.stats['first_chunk_seconds'] is not None:
+            print(f"Первый фрагмент готов через {self.stats['first_chunk_seconds']:.2f} с, "
+                  f"символов: {self.stats['characters']}, после очистки: {self.stats['cleaned_characters']}")
+        return result
@@ -0,0 +1,154 @@
+import sys  # Модуль для проверки, выводится ли результат в терминал
+import threading  # Модуль для синхронизации потоков
+import time  # Модуль для работы со временем
+from contextlib import contextmanager  # Декоратор для создания контекстных менеджеров
+from tqdm import tqdm  # Библиотека для отображения прогресс-баров
+
+class ProgressTracker:  # Класс для учета хода обработки по событиям фрагментов (без опроса в отдельных потоках)
+    def __init__(self):  # Конструктор класса
+        self.listeners = []  # Подписчики на события: функции listener(событие, данные)
+        self.lock = threading.Lock()  # Блокировка для обновления состояния из разных потоков
+        self.local = threading.local()  # Номер фрагмента, обрабатываемого текущим потоком
+        self.reset(0)
+
+    def add_listener(self, listener):
+        """Подписка на события прогресса (консоль, графический интерфейс, журнал)"""
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        """Отписка от событий прогресса"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def reset(self, total_chunks):
+        """Начало нового запуска обработки"""
+        with self.lock:
+            self.state = {
+                'total': total_chunks,  # Всего фрагментов
+                'queued': 0,  # Фрагментов в очереди
+                'active': 0,  # Фрагментов в обработке
+                'done': 0,  # Обработанных фрагментов
+                'failed': 0,  # Фрагментов, обработанных с ошибкой
+                'retries': 0,  # Повторных попыток запросов
+                'streamed_bytes': 0,  # Получено байт потокового ответа
+                'started_at': time.time()
+            }
+
+    def snapshot(self):
+        """Копия текущего состояния для подписчиков"""
+        with self.lock:
+            return dict(self.state)
+
+    def _emit(self, event, **data):
+        """Передача события подписчикам; без подписчиков обновляется только состояние"""
+        if not self.listeners:
+            return
+        data['state'] = self.snapshot()
+        for listener in list(self.listeners):
+            try:
+                listener(event, data)
+            except Exception as e:  # Ошибка отображения не должна прерывать обработку
+                print(f"Ошибка при отображении прогресса: {str(e)}")
+
+    def _current_chunk(self, chunk_num):
+        """Номер фрагмента: переданный явно или обрабатываемый текущим потоком"""
+        return chunk_num if chunk_num is not None else getattr(self.local, 'chunk_num', None)
+
+    def run_started(self, total_chunks):
+        """Начало обработки текста из total_chunks фрагментов"""
+        self.reset(total_chunks)
+        self._emit('run_started', total=total_chunks)
+
+    def chunk_queued(self, chunk_num):
+        """Фрагмент поставлен в очередь"""
+        with self.lock:
+            self.state['queued'] += 1
+            self.state['total'] = max(self.state['total'], chunk_num)  # Фрагменты из генератора увеличивают общее количество
+        self._emit('chunk_queued', chunk=chunk_num)
+
+    def chunk_started(self, chunk_num):
+        """Начата обработка фрагмента (в текущем потоке)"""
+        self.local.chunk_num = chunk_num
+        with self.lock:
+            self.state['queued'] = max(0, self.state['queued'] - 1)
+            self.state['active'] += 1
+        self._emit('chunk_started', chunk=chunk_num)
+
+    def chunk_streamed(self, size, chunk_num=None):
+        """Получена очередная часть потокового ответа размером size байт"""
+        with self.lock:
+            self.state['streamed_bytes'] += size
+        self._emit('chunk_streamed', chunk=self._current_chunk(chunk_num), size=size)
+
+    def chunk_retried(self, attempt, reason, chunk_num=None):
+        """Повторная попытка запроса фрагмента"""
+        with self.lock:
+            self.state['retries'] += 1
+        self._emit('chunk_retried', chunk=self._current_chunk(chunk_num), attempt=attempt, reason=reason)
+
+    def chunk_done(self, chunk_num, ok=True):
+        """Обработка фрагмента завершена (ok=False - с ошибкой)"""
+        self.local.chunk_num = None
+        with self.lock:
+            self.state['active'] = max(0, self.state['active'] - 1)
+            self.state['done'] += 1
+            if not ok:
+                self.state['failed'] += 1
+        self._emit('chunk_done', chunk=chunk_num, ok=ok)
+
+    def run_finished(self):
+        """Обработка текста завершена"""
+        self._emit('run_finished')
+
+    @contextmanager
+    def stage(self, name):
+        """Этап обработки файла (чтение, очистка, сохранение) с реальным временем выполнения"""
+        self._emit('stage_started', name=name)
+        started = time.time()
+        try:
+            yield
+        finally:
+            self._emit('stage_done', name=name, seconds=time.time() - started)
+
+class ConsoleProgress:  # Класс для отображения событий прогресса в консоли
+    def __init__(self, colour="#F9633B"):  # Конструктор класса
+        self.colour = colour  # Цвет прогресс-бара
+        self.pbar = None  # Общий прогресс-бар текущего запуска
+
+    @staticmethod
+    def is_supported():
+        """Прогресс-бары выводятся только в терминал; при перенаправлении вывода подписчик не нужен"""
+        return sys.stderr.isatty()
+
+    def __call__(self, event, data):
+        """Обработка события прогресса"""
+        state = data['state']
+        if event == 'run_started':
+            self.close()
+            self.pbar = tqdm(total=data['total'], desc="Обработка текста", unit="фрагм.", colour=self.colour,
+                             bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}] {postfix}")
+        elif event == 'stage_started':
+            tqdm.write(f"{data['name']}...")
+        elif event == 'stage_done':
+            tqdm.write(f"{data['name']}: готово за {data['seconds']:.2f} с")
+        elif event == 'run_finished':
+            self.close()
+        elif self.pbar is not None:
+            self.pbar.total = state['total']
+            self.pbar.n = state['done']
+            postfix = f"в работе: {state['active']}"
+            if state['streamed_bytes']:
+                postfix += f", получено: {state['streamed_bytes'] / 1024:.1f} КБ"
+            if state['retries']:
+                postfix += f", повторов: {state['retries']}"
+            if state['failed']:
+                postfix += f", ошибок: {state['failed']}"
+            self.pbar.set_postfix_str(postfix, refresh=False)
+            self.pbar.refresh()
+
+    def close(self):
+        """Завершение общего прогресс-бара"""
+        if self.pbar is not None:
+            self.pbar.close()
+            self.pbar = None
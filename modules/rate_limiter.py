@@ -0,0 +1,97 @@
+import threading  # Модуль для синхронизации потоков
+import time  # Модуль для работы со временем
+
+class TokenBucket:  # Класс "ведро токенов": ограничивает расход ресурса в минуту
+    def __init__(self, per_minute):  # Конструктор класса, принимает допустимый расход в минуту
+        self.capacity = float(per_minute)  # Максимальный запас (расход за минуту)
+        self.tokens = float(per_minute)  # Текущий запас
+        self.rate = per_minute / 60.0  # Скорость пополнения в секунду
+        self.updated = time.monotonic()  # Время последнего пополнения
+
+    def _refill(self):
+        """Пополнение запаса за прошедшее время"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Сколько секунд нужно подождать, чтобы в запасе было amount единиц"""
+        self._refill()
+        amount = min(amount, self.capacity)  # Слишком большой запрос ждет полного запаса, а не бесконечно
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        """Списание amount единиц из запаса"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class AdaptiveRateLimiter:  # Класс для ограничения запросов к API: лимиты в минуту и AIMD-регулирование параллелизма
+    def __init__(self, requests_per_minute, tokens_per_minute, max_concurrency, min_concurrency=1):  # Конструктор класса
+        self.request_bucket = TokenBucket(requests_per_minute)  # Лимит запросов в минуту
+        self.token_bucket = TokenBucket(tokens_per_minute)  # Лимит токенов в минуту
+        self.max_concurrency = max(1, max_concurrency)  # Верхняя граница одновременных запросов
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))  # Нижняя граница одновременных запросов
+        self.concurrency = float(max(self.min_concurrency, self.max_concurrency // 2))  # Текущий допустимый параллелизм
+        self.in_flight = 0  # Количество выполняющихся запросов
+        self.paused_until = 0.0  # Момент, до которого запросы приостановлены (по заголовку Retry-After)
+        self.throttled = 0  # Количество ответов 429/5xx за время работы
+        self.condition = threading.Condition()  # Условие для ожидания свободного места
+
+    def acquire(self, tokens):
+        """Ожидание разрешения на запрос с оценкой расхода tokens токенов"""
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:  # Сервер попросил подождать
+                    self.condition.wait(self.paused_until - now)
+                    continue
+                if self.in_flight >= int(self.concurrency):  # Все разрешенные места заняты
+                    self.condition.wait()
+                    continue
+                wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+                if wait > 0:  # Исчерпан лимит запросов или токенов в минуту
+                    self.condition.wait(wait)
+                    continue
+                self.request_bucket.consume(1)
+                self.token_bucket.consume(tokens)
+                self.in_flight += 1
+                return
+
+    def try_acquire(self, tokens):
+        """Разрешение на запрос без ожидания (для дублирующих запросов); False, если места или лимита сейчас нет"""
+        with self.condition:
+            if time.monotonic() < self.paused_until or self.in_flight >= int(self.concurrency):
+                return False
+            if self.request_bucket.wait_time(1) > 0 or self.token_bucket.wait_time(tokens) > 0:
+                return False
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False, retry_after=None):
+        """Освобождение места после запроса и корректировка параллелизма"""
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                # Мультипликативное уменьшение при перегрузке сервера
+                self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                self.throttled += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            else:
+                # Аддитивное увеличение: примерно +1 место после каждой "волны" успешных запросов
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.condition.notify_all()
+
+    def stats(self):
+        """Текущее состояние ограничителя"""
+        with self.condition:
+            return {
+                'concurrency': int(self.concurrency),
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'throttled': self.throttled
+            }
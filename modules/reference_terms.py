@@ -0,0 +1,58 @@
+import hashlib  # Модуль для хеша содержимого файла эталона
+import os  # Модуль для работы с файловой системой
+import pickle  # Модуль для сохранения скомпилированного эталона
+import threading  # Модуль для уникального имени временного файла
+from .lemmatizer import get_lemmatizer  # Общий лемматизатор
+from .term_matcher import TermMatcher  # Индекс для нечеткого сопоставления
+
+COMPILED_VERSION = 1  # Версия формата: увеличивается при изменении лемматизации или индекса
+COMPILED_SUFFIX = '.compiled.pkl'  # Скомпилированный эталон лежит рядом с текстовым файлом
+
+class ReferenceTerms(set):  # Множество лемматизированных эталонных терминов с готовым индексом сопоставления
+    def __init__(self, terms=(), source_hash=None, matcher=None):  # Конструктор класса
+        super().__init__(terms)
+        self.source_hash = source_hash  # Хеш текстового файла, из которого получено множество
+        self.version = COMPILED_VERSION  # Версия формата
+        self.matcher = matcher or TermMatcher(self)  # Индекс не зависит от порога сходства
+
+    def __reduce__(self):
+        """Сохранение вместе с построенным индексом (иначе pickle пересобрал бы его при загрузке)"""
+        return self.__class__, (list(self), self.source_hash, self.matcher), {'version': self.version}
+
+def compiled_path(ref_file):
+    """Путь к скомпилированному эталону"""
+    return os.path.splitext(ref_file)[0] + COMPILED_SUFFIX
+
+def compile_reference_terms(ref_file, content=None):
+    """Лемматизация, удаление повторов и построение индекса для файла эталона (сохраняется рядом с ним)"""
+    if content is None:
+        with open(ref_file, 'rb') as file:
+            content = file.read()
+    lemmatizer = get_lemmatizer()
+    lines = [line.strip() for line in content.decode('utf-8').splitlines() if line.strip()]
+    terms = ReferenceTerms(lemmatizer.lemmatize_many(lines), hashlib.sha256(content).hexdigest())
+    if lemmatizer.analyzer == 'lower':  # Без pymorphy2 леммы неполные - не сохраняем, чтобы не подменить ими настоящие
+        return terms
+    path = compiled_path(ref_file)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Временный файл (эталоны компилируются и в пуле процессов)
+    try:
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(terms, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Ошибка при сохранении скомпилированного эталона: {str(e)}")
+    return terms
+
+def load_compiled_reference_terms(ref_file):
+    """Скомпилированный эталон; пересобирается, если текстовый файл изменился или формат устарел"""
+    with open(ref_file, 'rb') as file:
+        content = file.read()
+    try:
+        with open(compiled_path(ref_file), 'rb') as file:
+            terms = pickle.load(file)
+        if (isinstance(terms, ReferenceTerms) and terms.version == COMPILED_VERSION
+                and terms.source_hash == hashlib.sha256(content).hexdigest()):
+            return terms
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):  # Записи нет или она повреждена
+        pass
+    return compile_reference_terms(ref_file, content)
@@ -0,0 +1,144 @@
+import hashlib  # Модуль для вычисления хешей (ключи кэша)
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import threading  # Модуль для синхронизации доступа из нескольких потоков
+import time  # Модуль для работы со временем
+
+class ResponseCache:  # Класс для хранения ответов ИИ на диске с адресацией по содержимому
+    def __init__(self, cache_dir='cache/responses', max_size_mb=200, max_age_days=30, enabled=True):  # Конструктор класса
+        self.cache_dir = cache_dir  # Папка для хранения ответов
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)  # Максимальный суммарный размер кэша в байтах
+        self.max_age_seconds = max_age_days * 24 * 3600  # Максимальный возраст записи в секундах
+        self.enabled = enabled and os.getenv('AI_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')  # Переключатель обхода кэша
+        self.hits = 0  # Количество попаданий в кэш
+        self.misses = 0  # Количество промахов кэша
+        self.bytes_saved = 0  # Объем ответов (в байтах), полученных из кэша вместо API
+        self.evict_interval = 50  # Полная проверка размера кэша выполняется раз в указанное число записей
+        self.puts_since_evict = None  # Счетчик записей с последней очистки (None - очистка еще не выполнялась)
+        self.lock = threading.Lock()  # Блокировка для обновления статистики и очистки из разных потоков
+        if self.enabled and not os.path.exists(self.cache_dir):  # Если папка кэша не существует
+            os.makedirs(self.cache_dir)  # Создаем папку
+
+    @staticmethod
+    def make_key(model_name, domain, prompt_version, chunk):
+        """Вычисление ключа кэша по модели, области, версии промта и тексту фрагмента"""
+        payload = '\x00'.join([str(model_name), str(domain), str(prompt_version), chunk])  # Разделитель исключает коллизии склейки
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        """Путь к файлу записи (записи раскладываются по подпапкам по первым символам ключа)"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Получение ответа из кэша или None, если записи нет или она устарела"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:  # Запись устарела
+                self._remove(path)
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as file:
+                response = json.load(file)['response']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+        except Exception as e:
+            print(f"Ошибка при чтении кэша ответов: {str(e)}")
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += len(response.encode('utf-8'))
+        return response
+
+    def put(self, key, response, meta=None):
+        """Сохранение ответа в кэш"""
+        if not self.enabled or not response:
+            return False
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"  # Пишем во временный файл, чтобы не оставить битую запись
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'response': response, 'meta': meta or {}, 'created': time.time()}, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Ошибка при сохранении кэша ответов: {str(e)}")
+            return False
+        with self.lock:
+            need_evict = self.puts_since_evict is None or self.puts_since_evict + 1 >= self.evict_interval
+            self.puts_since_evict = 0 if need_evict else self.puts_since_evict + 1
+        if need_evict:
+            self.evict()
+        return True
+
+    def evict(self):
+        """Удаление устаревших записей и самых старых записей при превышении размера кэша"""
+        with self.lock:
+            entries = []
+            now = time.time()
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.json'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > self.max_age_seconds:  # Удаляем записи старше допустимого возраста
+                        self._remove(path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = sum(size for _, size, _ in entries)
+            entries.sort()  # Сначала самые старые записи
+            for _, size, path in entries:
+                if total_size <= self.max_size_bytes:
+                    break
+                self._remove(path)
+                total_size -= size
+
+    @staticmethod
+    def _remove(path):
+        """Удаление записи, которую мог уже удалить другой поток"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def reset_stats(self):
+        """Сброс статистики перед новым запуском"""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.bytes_saved = 0
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self.lock:
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    os.remove(os.path.join(root, name))
+
+    def stats(self):
+        """Статистика использования кэша"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'bytes_saved': self.bytes_saved
+            }
+
+    def report(self):
+        """Вывод статистики кэша"""
+        if not self.enabled:
+            print("Кэш ответов ИИ отключен")
+            return
+        stats = self.stats()
+        print(f"Кэш ответов ИИ: попаданий {stats['hits']}, промахов {stats['misses']}, "
+              f"доля попаданий {stats['hit_rate']:.0%}, сэкономлено {stats['bytes_saved'] / 1024:.1f} КБ")
@@ -0,0 +1,82 @@
+import numpy as np  # Векторные вычисления верхних оценок сходства
+from fuzzywuzzy import fuzz  # Точная оценка сходства строк (та же, что и в метриках)
+
+class TermMatcher:  # Класс для нечеткого поиска эталонных терминов без перебора всех пар
+    def __init__(self, reference_terms, threshold=90, scorer=fuzz.ratio, batch_cells=2_000_000):  # Конструктор класса
+        self.threshold = threshold  # Порог сходства (0-100) по умолчанию, с которого термины считаются совпадающими
+        self.scorer = scorer  # Точная оценка сходства двух строк
+        self.batch_cells = batch_cells  # Размер блока матрицы оценок (терминов x эталонов x символов)
+        self.terms = sorted(set(reference_terms), key=len)  # Эталонные термины по возрастанию длины
+        self.term_set = set(self.terms)  # Для точных совпадений без вычисления сходства
+        self.lengths = np.array([len(term) for term in self.terms], dtype=np.int64)  # Длины эталонов (отсортированы)
+        self.alphabet = {}  # Символ -> столбец матрицы счетчиков
+        for term in self.terms:
+            for char in term:
+                self.alphabet.setdefault(char, len(self.alphabet))
+        self.counts = self.count_chars(self.terms)  # Сколько раз каждый символ встречается в каждом эталоне
+        self.scored_pairs = 0  # Сколько пар дошло до точной оценки (для бенчмарка)
+
+    def count_chars(self, terms):
+        """Матрица счетчиков символов алфавита эталонов; символы вне алфавита совпасть не могут и не учитываются"""
+        counts = np.zeros((len(terms), len(self.alphabet)), dtype=np.int32)
+        for row, term in enumerate(terms):
+            for char in term:
+                column = self.alphabet.get(char)
+                if column is not None:
+                    counts[row, column] += 1
+        return counts
+
+    def length_range(self, length, bound):
+        """Срез эталонов, длина которых допускает сходство не ниже bound.
+
+        Доля совпавших символов не больше 2*min(a, b)/(a + b), поэтому эталон слишком короче или длиннее
+        термина пропускается до сравнения.
+        """
+        if bound <= 0:
+            return 0, len(self.terms)
+        low = bound * length / (200 - bound)
+        high = length * (200 - bound) / bound
+        return int(np.searchsorted(self.lengths, low, 'left')), int(np.searchsorted(self.lengths, high, 'right'))
+
+    def match_many(self, terms, threshold=None):
+        """Совпадения для набора терминов: {термин: эталон с оценкой не ниже порога}; без совпадения термина нет в словаре.
+
+        Термины группируются по длине: для группы берется срез эталонов подходящей длины, и по матрице счетчиков
+        символов сразу для всех пар считается верхняя оценка 2*общих символов/(a + b). Она не меньше точной оценки
+        (и SequenceMatcher, и Левенштейна), поэтому пары ниже порога отбрасываются без потери совпадений, а точная
+        оценка вычисляется только для оставшихся, начиная с самых перспективных. Индекс от порога не зависит,
+        поэтому один экземпляр подходит для перебора порогов.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        bound = threshold - 1  # Порог для оценок сверху с запасом на округление в scorer
+        matches = {}
+        groups = {}  # Длина -> термины, которые не совпали с эталоном точно
+        for term in set(terms):
+            if term in self.term_set:  # Точное совпадение (оценка 100)
+                matches[term] = term
+            elif term:  # Пустая строка совпадает только с пустой
+                groups.setdefault(len(term), []).append(term)
+        for length, group in groups.items():
+            start, end = self.length_range(length, bound)
+            if start >= end:
+                continue
+            counts = self.counts[start:end]
+            totals = self.lengths[start:end] + length
+            step = max(1, self.batch_cells // max(1, counts.size))  # Терминов в одном блоке
+            for offset in range(0, len(group), step):
+                batch = group[offset:offset + step]
+                common = np.minimum(self.count_chars(batch)[:, None, :], counts[None, :, :]).sum(axis=2)
+                bounds = 200 * common / totals  # Оценки сверху: термины x эталоны
+                for term, row in zip(batch, bounds):
+                    candidates = np.flatnonzero(row >= bound)
+                    for index in candidates[np.argsort(-row[candidates], kind='stable')]:
+                        reference = self.terms[start + index]
+                        self.scored_pairs += 1
+                        if self.scorer(term, reference) >= threshold:
+                            matches[term] = reference
+                            break
+        return matches
+
+    def match(self, term, threshold=None):
+        """Эталон, совпадающий с термином, или None"""
+        return self.match_many([term], threshold).get(term)
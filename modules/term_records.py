@@ -0,0 +1,153 @@
+import json  # Модуль для работы с JSON
+import re  # Модуль регулярных выражений
+
+# JSON-схема ответа ИИ в структурированном режиме
+TERMS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'terms': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'term': {'type': 'string'},
+                    'definition': {'type': 'string'},
+                    'translation': {'type': 'string'},
+                    'relevance': {'type': 'number'}
+                },
+                'required': ['term', 'definition', 'translation', 'relevance'],
+                'additionalProperties': False
+            }
+        }
+    },
+    'required': ['terms'],
+    'additionalProperties': False
+}
+
+JSON_FORMAT_INSTRUCTION = (
+    "Верни результат НЕ в текстовом формате, а в виде JSON-объекта: "
+    '{"terms": [{"term": "термин", "definition": "определение", "translation": "перевод", "relevance": число от 0 до 100}]}'
+)
+
+NUMBER_PATTERN = re.compile(r'^\d+\.')  # Нумерованные термины вида "1. Термин: ..."
+KNOWN_TERM_MARKER = 'Известный термин:'  # Краткая ссылка на термин из базы в режиме извлечения только новых терминов
+
+def _to_float(value):
+    """Преобразование релевантности к числу ("85%", "85", 85 -> 85.0)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('%', '').replace(',', '.').strip())
+    except ValueError:
+        return 0.0
+
+def parse_json_terms(content):
+    """Разбор структурированного ответа ИИ в записи терминов за один проход; None, если ответ не является JSON"""
+    text = content.strip()
+    if text.startswith('```'):  # Ответ мог прийти в блоке кода markdown
+        text = text.strip('`')
+        text = text[text.find('{'):] if '{' in text else text
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    items = data.get('terms') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return None
+
+    records = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        term = str(item.get('term') or '').strip()
+        if not term:
+            continue
+        records.append({
+            'термин': term,
+            'определение': str(item.get('definition') or '').strip(),
+            'перевод': str(item.get('translation') or '').strip(),
+            'релевантность': _to_float(item.get('relevance', 0))
+        })
+    return records
+
+def parse_terms_text(ai_response, get_known_term=None):
+    """Разбор текстового ответа ИИ (формат "Термин:/Определение:/Перевод:/Релевантность:") в записи терминов"""
+    terms_data = []
+    current_term = {}
+    lines = [line.strip() for line in ai_response.split('\n') if line.strip()]
+
+    for line in lines:
+        line = line.strip()
+        if line.replace('**', '').lstrip('-#* ').startswith(KNOWN_TERM_MARKER):
+            if current_term:
+                terms_data.append(current_term)
+            term = line.replace('**', '').split(KNOWN_TERM_MARKER, 1)[1].strip()
+            current_term = {'термин': term}
+            known_term = get_known_term(term) if get_known_term else None
+            if known_term:
+                current_term['определение'] = known_term.get('definition', '')
+                current_term['перевод'] = known_term.get('translation', '')
+                current_term['релевантность'] = float(known_term.get('relevance', 0))
+            continue
+
+        is_numbered_term = bool(NUMBER_PATTERN.match(line) and ('Термин:' in line or '**Термин:**' in line))
+        is_simple_term = line.startswith(('Термин:', '**Термин:**', '### Термин:'))
+
+        if is_numbered_term or is_simple_term:
+            if current_term:
+                terms_data.append(current_term)
+            current_term = {}
+            if '**Термин:**' in line:
+                term = line.split('**Термин:**')[1].strip()
+            elif 'Термин:' in line:
+                term = line.split('Термин:')[1].strip()
+            if is_numbered_term:
+                term = NUMBER_PATTERN.sub('', term).strip()
+            term = term.replace('#', '').strip()
+            current_term['термин'] = term
+
+        elif any(marker in line for marker in ['**Определение:**', 'Определение:', '- **Определение:**']):
+            definition = line
+            for marker in ['**Определение:**', 'Определение:', '- **Определение:**', '-']:
+                definition = definition.replace(marker, '')
+            current_term['определение'] = definition.strip()
+
+        elif any(marker in line for marker in ['**Перевод:**', 'Перевод:', '- **Перевод:**']):
+            translation = line
+            for marker in ['**Перевод:**', 'Перевод:', '- **Перевод:**', '-']:
+                translation = translation.replace(marker, '')
+            current_term['перевод'] = translation.strip()
+
+        elif any(marker in line for marker in ['**Релевантность:**', 'Релевантность:', '- **Релевантность:**']):
+            relevance = line
+            for marker in ['**Релевантность:**', 'Релевантность:', '- **Релевантность:**', '-']:
+                relevance = relevance.replace(marker, '')
+            relevance = relevance.replace('%', '').strip()
+            try:
+                current_term['релевантность'] = float(relevance)
+            except ValueError:
+                current_term['релевантность'] = 0.0
+
+    if current_term:
+        terms_data.append(current_term)
+    return terms_data
+
+def parse_terms(content, get_known_term=None):
+    """Разбор ответа ИИ: сначала как JSON, при неудаче - текстовым разбором"""
+    records = parse_json_terms(content)
+    if records is None:
+        records = parse_terms_text(content, get_known_term)
+    return records
+
+def format_term_block(record):
+    """Текстовый блок термина в формате глоссария"""
+    relevance = record.get('релевантность', 0)
+    relevance_text = f"{relevance:g}" if isinstance(relevance, (int, float)) else str(relevance)
+    return (f"Термин: {record.get('термин', '')}\n"
+            f"Определение: {record.get('определение', '')}\n"
+            f"Перевод: {record.get('перевод', '')}\n"
+            f"Релевантность: {relevance_text}%")
+
+def format_terms(records):
+    """Текстовое представление списка терминов"""
+    return "\n\n".join(format_term_block(record) for record in records)
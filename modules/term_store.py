@@ -0,0 +1,213 @@
+import json  # Модуль для миграции из JSON и экспорта в JSON
+import os  # Модуль для работы с файловой системой
+import sqlite3  # Встроенная база данных SQLite
+import threading  # Модуль для отдельных соединений в каждом потоке
+from .json_manager import JsonTermManager  # Прежнее хранилище (переменная окружения AI_TERM_STORE=json)
+from .lemmatizer import get_lemmatizer  # Общий лемматизатор для поиска других форм термина
+
+FIELDS = ('term', 'definition', 'translation', 'relevance', 'timestamp')  # Поля записи термина (как в JSON базе)
+HEAD_LENGTH = 4  # Длина начала названия, по которому термины отбираются для поиска в тексте
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    name TEXT PRIMARY KEY,          -- Название термина (ключ JSON базы)
+    name_lower TEXT NOT NULL,       -- Название в нижнем регистре для поиска в тексте
+    head TEXT NOT NULL,             -- Первые HEAD_LENGTH символов name_lower
+    lemma TEXT NOT NULL,            -- Нормальная форма названия
+    term TEXT,
+    definition TEXT,
+    translation TEXT,
+    relevance REAL,
+    timestamp TEXT,
+    extra TEXT                      -- Остальные поля записи в JSON
+);
+CREATE INDEX IF NOT EXISTS idx_terms_lemma ON terms (lemma);
+CREATE INDEX IF NOT EXISTS idx_terms_head ON terms (head);
+CREATE INDEX IF NOT EXISTS idx_terms_relevance ON terms (relevance DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,           -- analyzer - анализатор, заполнивший lemma; migrated_from - перенесенный JSON
+    value TEXT
+);
+"""
+
+class SqliteTermManager:  # Класс для хранения терминов в SQLite с тем же интерфейсом, что и JsonTermManager
+    def __init__(self, db_path='db/db_terms.sqlite3', json_path='db/db_terms.json'):  # Конструктор класса
+        self.db_path = db_path  # Файл базы данных SQLite
+        self.json_path = json_path  # JSON база, из которой термины переносятся при первом запуске
+        self.lemmatizer = get_lemmatizer()  # Нормальные формы названий терминов
+        self.local = threading.local()  # Соединение с базой для каждого потока
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+        self._migrate_json()
+        self._refresh_lemmas()
+
+    def _connect(self):
+        """Соединение текущего потока (журнал WAL: чтение не блокируется записью из других потоков и процессов)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')  # В режиме WAL сохраняет целостность при меньшем числе fsync
+            self.local.connection = connection
+        return connection
+
+    def _migrate_json(self):
+        """Перенос терминов из JSON базы, если база SQLite еще пустая и перенос не выполнялся"""
+        connection = self._connect()
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone() or \
+                connection.execute('SELECT 1 FROM terms LIMIT 1').fetchone() or not os.path.exists(self.json_path):
+            return
+        try:
+            with open(self.json_path, 'r', encoding='utf-8') as file:
+                terms = json.load(file)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Ошибка при чтении JSON базы терминов для переноса: {str(e)}")
+            return
+        if not isinstance(terms, dict) or not terms:
+            return
+        names = list(terms)
+        with connection:
+            connection.executemany(self._upsert_sql(), [self._row(name, lemma, terms[name]) for name, lemma
+                                                        in zip(names, self.lemmatizer.lemmatize_many(names))])
+            self._set_meta(connection, 'analyzer', self.lemmatizer.analyzer_name())
+            self._set_meta(connection, 'migrated_from', self.json_path)  # JSON остается на месте для AI_TERM_STORE=json
+        print(f"База терминов перенесена из {self.json_path} в {self.db_path}: {len(names)} терминов "
+              f"(JSON файл больше не обновляется, выгрузка: python main.py export-terms)")
+
+    @staticmethod
+    def _set_meta(connection, key, value):
+        """Сохранение параметра базы"""
+        connection.execute('INSERT INTO meta (key, value) VALUES (?, ?) '
+                           'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def _refresh_lemmas(self):
+        """Пересчет нормальных форм, если база заполнялась другим анализатором (или до того, как он записывался)"""
+        connection = self._connect()
+        row = connection.execute("SELECT value FROM meta WHERE key = 'analyzer'").fetchone()
+        if row and row[0] == self.lemmatizer.analyzer_name():  # Сравнение без загрузки словарей pymorphy2
+            return
+        rows = connection.execute('SELECT name, lemma FROM terms ORDER BY rowid').fetchall()
+        lemmas = self.lemmatizer.lemmatize_many([name for name, _ in rows])
+        changed = [(lemma, name) for (name, old_lemma), lemma in zip(rows, lemmas) if lemma != old_lemma]
+        analyzer = self.lemmatizer.analyzer_name()  # После разбора - анализатор, который действительно использовался
+        with connection:  # Нормальные формы и название анализатора меняются вместе
+            connection.executemany('UPDATE terms SET lemma = ? WHERE name = ?', changed)
+            self._set_meta(connection, 'analyzer', analyzer)
+        if changed:
+            print(f"Нормальные формы терминов пересчитаны анализатором {analyzer} "
+                  f"(прежний: {row[0] if row else 'не записан'}): {len(changed)} терминов")
+
+    @staticmethod
+    def _upsert_sql():
+        """Запрос вставки или замены записи по названию (порядок добавления термина сохраняется)"""
+        columns = ', '.join(FIELDS)
+        updates = ', '.join(f"{field} = excluded.{field}" for field in FIELDS + ('extra',))
+        return (f"INSERT INTO terms (name, name_lower, head, lemma, {columns}, extra) "
+                f"VALUES (?, ?, ?, ?, {', '.join('?' * len(FIELDS))}, ?) "
+                f"ON CONFLICT(name) DO UPDATE SET {updates}")
+
+    @staticmethod
+    def _row(name, lemma, data):
+        """Параметры запроса вставки для записи термина"""
+        data = data if isinstance(data, dict) else {'term': data}
+        extra = {key: value for key, value in data.items() if key not in FIELDS}
+        return (name, name.lower(), name.lower()[:HEAD_LENGTH], lemma, *(data.get(field) for field in FIELDS),
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def _record(row):
+        """Запись термина из строки таблицы (поля в том же порядке, что и в JSON базе)"""
+        record = {field: value for field, value in zip(FIELDS, row[:len(FIELDS)]) if value is not None}
+        if row[len(FIELDS)]:
+            record.update(json.loads(row[len(FIELDS)]))
+        return record
+
+    def find_key(self, term_name, terms=None):  # Метод для поиска термина с учетом словоформ
+        """Название термина в базе: точное совпадение или термин с той же нормальной формой; None, если его нет"""
+        connection = self._connect()
+        row = connection.execute('SELECT name FROM terms WHERE name = ?', (term_name,)).fetchone()  # Поиск по первичному ключу
+        if row is None:
+            row = connection.execute('SELECT name FROM terms WHERE lemma = ? ORDER BY rowid LIMIT 1',
+                                     (self.lemmatizer.lemmatize(term_name),)).fetchone()  # Поиск по индексу нормальных форм
+        return row[0] if row else None
+
+    def add_terms(self, new_terms, relevance_threshold=80):  # Метод для добавления новых терминов
+        """
+        Добавление новых терминов в базу (одна транзакция; другая форма существующего термина обновляет его запись)
+
+        :param new_terms: словарь с терминами
+        :param relevance_threshold: порог релевантности (по умолчанию 80)
+        :return: True если успешно, False если произошла ошибка
+        """
+        if not isinstance(new_terms, dict):  # Проверяем, является ли new_terms словарем
+            print("Ошибка: new_terms должен быть словарем")  # Выводим сообщение об ошибке
+            return False  # Возвращаем False в случае ошибки
+        try:  # Начало блока обработки исключений
+            names = list(new_terms)
+            lemmas = self.lemmatizer.lemmatize_many(names)
+            connection = self._connect()
+            with connection:  # Транзакция: все термины сохраняются вместе или не сохраняется ни один
+                for name, lemma in zip(names, lemmas):
+                    row = connection.execute('SELECT name FROM terms WHERE name = ?', (name,)).fetchone() or \
+                        connection.execute('SELECT name FROM terms WHERE lemma = ? ORDER BY rowid LIMIT 1', (lemma,)).fetchone()
+                    key = row[0] if row else name  # Название, под которым хранится термин
+                    data = new_terms[name]
+                    if key != name and isinstance(data, dict):  # Запись хранится под прежним названием
+                        data = dict(data, term=key)
+                    connection.execute(self._upsert_sql(), self._row(key, lemma, data))
+            return True
+        except Exception as e:  # Если произошла ошибка
+            print(f"Ошибка при добавлении терминов: {str(e)}")  # Выводим сообщение об ошибке
+            return False  # Возвращаем False в случае ошибки
+
+    def get_all_terms(self):  # Метод для получения всех терминов
+        """Получение всех терминов из базы в порядке добавления"""
+        rows = self._connect().execute(f"SELECT {', '.join(FIELDS)}, extra, name FROM terms ORDER BY rowid")
+        return {row[-1]: self._record(row) for row in rows}
+
+    def get_term(self, term_name):  # Метод для получения конкретного термина
+        """Получение конкретного термина по названию или другой его форме"""
+        key = self.find_key(term_name)
+        if key is None:
+            return None
+        row = self._connect().execute(f"SELECT {', '.join(FIELDS)}, extra FROM terms WHERE name = ?", (key,)).fetchone()
+        return self._record(row) if row else None
+
+    def term_exists(self, term_name):  # Метод для проверки существования термина
+        """Проверяет существование термина (в любой форме) в базе данных"""
+        return self.find_key(term_name) is not None
+
+    def find_terms_in_text(self, text, limit=None):  # Метод для поиска известных терминов в тексте
+        """Поиск терминов базы, которые встречаются в тексте (самые релевантные первыми).
+
+        Термин, входящий в текст, начинается с одного из отрезков текста длиной до HEAD_LENGTH символов, поэтому
+        кандидаты выбираются по индексу начала названия, и только они проверяются поиском подстроки.
+        """
+        text_lower = text.lower()  # Сравниваем без учета регистра
+        heads = {text_lower[start:start + length] for length in range(1, HEAD_LENGTH + 1)
+                 for start in range(len(text_lower) - length + 1)}  # Все отрезки текста длиной до HEAD_LENGTH
+        rows = self._connect().execute(
+            f"SELECT {', '.join(FIELDS)}, extra, name_lower, rowid FROM terms "
+            f"WHERE head IN (SELECT value FROM json_each(?))", (json.dumps(list(heads), ensure_ascii=False),))
+        found = [row for row in rows if row[-2] in text_lower]  # Термины, найденные в тексте
+        found.sort(key=lambda row: (-(row[FIELDS.index('relevance')] or 0), row[-1]))  # По убыванию релевантности, как в JSON базе
+        found = [self._record(row) for row in found]
+        return found[:limit] if limit else found  # Возвращаем не больше limit терминов
+
+    def export_json(self, path=None):  # Метод для выгрузки базы в JSON
+        """Выгрузка всех терминов в JSON в формате прежней базы (по умолчанию в json_path, откуда ее читает AI_TERM_STORE=json)"""
+        path = path or self.json_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"  # Пишем во временный файл, чтобы не оставить битую выгрузку
+        terms = self.get_all_terms()
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(terms, file, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, path)
+        return len(terms)
+
+def create_term_manager():
+    """База терминов: SQLite, или прежний JSON файл при AI_TERM_STORE=json"""
+    if os.getenv('AI_TERM_STORE', '').lower() == 'json':
+        return JsonTermManager()
+    return SqliteTermManager()
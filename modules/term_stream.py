@@ -0,0 +1,50 @@
+from .term_records import KNOWN_TERM_MARKER, NUMBER_PATTERN  # Общие с однопроходным разбором маркеры, чтобы разборы не расходились
+
+TERM_MARKERS = ('Термин:', '**Термин:**', '### Термин:')  # Маркеры начала блока термина (как в DataSaver.parse_ai_terms)
+RELEVANCE_MARKER = 'Релевантность:'  # Последнее поле блока термина
+
+def is_term_start(line):
+    """Проверка, начинается ли со строки новый блок термина"""
+    return line.startswith(TERM_MARKERS) or bool(NUMBER_PATTERN.match(line) and 'Термин:' in line)
+
+class TermStreamParser:  # Класс для пошагового разбора ответа ИИ, поступающего частями
+    def __init__(self, on_term):  # Конструктор класса, принимает функцию для передачи готовых терминов
+        self.on_term = on_term  # Вызывается с текстом блока каждого полностью полученного термина
+        self.buffer = ""  # Незавершенная строка ответа
+        self.block = []  # Строки текущего блока термина
+
+    def feed(self, text):
+        """Добавление очередной части ответа"""
+        self.buffer += text
+        while '\n' in self.buffer:
+            line, self.buffer = self.buffer.split('\n', 1)
+            self._process_line(line)
+
+    def close(self):
+        """Завершение разбора: обработка остатка ответа и последнего блока"""
+        if self.buffer:
+            self._process_line(self.buffer)
+            self.buffer = ""
+        self._emit()
+
+    def _process_line(self, line):
+        """Обработка одной полной строки ответа"""
+        stripped = line.strip()
+        if stripped.replace('**', '').lstrip('-#* ').startswith(KNOWN_TERM_MARKER):  # Ссылка на известный термин - готовый блок из одной строки
+            self._emit()
+            self.block = [stripped]
+            self._emit()
+        elif is_term_start(stripped):  # Начался новый термин - предыдущий блок завершен
+            self._emit()
+            self.block = [stripped]
+        elif self.block and stripped:
+            self.block.append(stripped)
+            if RELEVANCE_MARKER in stripped:  # Релевантность - последнее поле, блок готов
+                self._emit()
+
+    def _emit(self):
+        """Передача готового блока термина"""
+        if self.block:
+            block = '\n'.join(self.block)
+            self.block = []
+            self.on_term(block)
@@ -0,0 +1,170 @@
+import gzip  # Модуль для сжатия записей кэша
+import hashlib  # Модуль для вычисления хешей (отпечатки файлов и ключи кэша)
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import threading  # Модуль для синхронизации доступа из нескольких потоков
+import time  # Модуль для работы со временем
+
+class TextCache:  # Класс для хранения извлеченного и очищенного текста документов между запусками
+    def __init__(self, cache_dir='cache/text', max_size_mb=100, max_age_days=90, enabled=True):  # Конструктор класса
+        self.cache_dir = cache_dir  # Папка для хранения текстов
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)  # Максимальный суммарный размер сжатых записей в байтах
+        self.max_age_seconds = max_age_days * 24 * 3600  # Запись, которую не использовали дольше, удаляется
+        self.enabled = enabled and os.getenv('AI_TEXT_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')  # Переключатель обхода кэша
+        self.index_path = os.path.join(cache_dir, 'index.json')  # Отпечатки файлов: {путь: {size, mtime_ns, sha256}}
+        self.hits = 0  # Количество попаданий в кэш
+        self.misses = 0  # Количество промахов кэша
+        self.lock = threading.Lock()  # Блокировка для обновления индекса и статистики из разных потоков
+        self.index = self._load_index() if self.enabled else {}  # Отпечатки файлов, посчитанные в прошлых запусках
+
+    def _load_index(self):
+        """Загрузка отпечатков файлов"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        """Сохранение отпечатков файлов (вызывается под блокировкой)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.{threading.get_ident()}.tmp"  # Пишем во временный файл, чтобы не оставить битый индекс
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def fingerprint(self, file_path):
+        """Хеш содержимого файла; пересчитывается, только если изменились размер или время изменения файла"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.index.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']  # Файл не менялся - читать его не нужно
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):  # Читаем файл частями по 1 МБ
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        with self.lock:
+            self.index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+            self._save_index()
+        return sha256
+
+    def make_key(self, file_path, kind, version):
+        """Вычисление ключа по содержимому файла, виду текста (извлеченный или очищенный) и версии обработчика"""
+        payload = '\x00'.join([self.fingerprint(file_path), str(kind), str(version)])  # Разделитель исключает коллизии склейки
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        """Путь к файлу записи (записи раскладываются по подпапкам по первым символам ключа)"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt.gz")
+
+    def get(self, key, count=True):
+        """Получение текста из кэша или None, если записи нет (count=False - без учета в статистике)"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                text = file.read()
+            os.utime(path)  # Время изменения отражает последнее использование записи
+        except (FileNotFoundError, EOFError, OSError):  # Записи нет или она повреждена
+            if count:
+                with self.lock:
+                    self.misses += 1
+            return None
+        if count:
+            with self.lock:
+                self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Сохранение текста в кэш в сжатом виде"""
+        if not self.enabled or not text:
+            return False
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"  # Пишем во временный файл, чтобы не оставить битую запись
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as file:
+                file.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Ошибка при сохранении кэша текста: {str(e)}")
+            return False
+        self.evict()  # Записей немного (по две на документ), поэтому размер проверяется при каждой записи
+        return True
+
+    def lookup(self, file_path, kind, version):
+        """Текст из кэша или None без вычисления; проверка наличия записи не учитывается в статистике"""
+        if not self.enabled:
+            return None
+        try:
+            key = self.make_key(file_path, kind, version)
+        except OSError:  # Файл недоступен
+            return None
+        return self.get(key, count=False)
+
+    def store(self, file_path, kind, version, text):
+        """Сохранение текста, вычисленного вне get_or_compute (например, отчета рядом с основной записью)"""
+        if not self.enabled:
+            return False
+        try:
+            key = self.make_key(file_path, kind, version)
+        except OSError:  # Файл недоступен - работаем без кэша
+            return False
+        return self.put(key, text)
+
+    def get_or_compute(self, file_path, kind, version, compute):
+        """Текст из кэша или результат compute(), который сохраняется в кэш"""
+        if not self.enabled:
+            return compute()
+        try:
+            key = self.make_key(file_path, kind, version)
+        except OSError:  # Файл недоступен - работаем без кэша
+            return compute()
+        text = self.get(key)
+        if text is None:
+            text = compute()
+            self.put(key, text)  # Пустой результат (ошибка извлечения) не сохраняется
+        return text
+
+    def evict(self):
+        """Удаление устаревших записей и давно не использованных записей при превышении размера кэша"""
+        with self.lock:
+            entries = []
+            total_size = 0
+            now = time.time()
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.txt.gz'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > self.max_age_seconds:  # Запись устарела
+                        self._remove(path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total_size += stat.st_size
+            for _, size, path in sorted(entries):  # Сначала удаляются давно не использованные записи
+                if total_size <= self.max_size_bytes:
+                    break
+                self._remove(path)
+                total_size -= size
+
+    @staticmethod
+    def _remove(path):
+        """Удаление файла записи"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def report(self):
+        """Вывод статистики кэша текста"""
+        if self.enabled and (self.hits or self.misses):
+            print(f"Кэш текста: попаданий {self.hits}, промахов {self.misses}")
@@ -1,4 +1,6 @@
+import hashlib  # Модуль для вычисления версии очистки по шаблонам
 import re  # Импортируем модуль регулярных выражений
+import time  # Модуль для замера времени этапов очистки
 
 class TextCleaner:  # Класс для очистки текста от ненужных элементов
     def __init__(self):  # Конструктор класса
@@ -8,70 +10,151 @@ class TextCleaner:  # Класс для очистки текста от нен
             'figures': r'(?i)Рисунок\s+\d+.*?\.|Рис\.\s*\d+.*?\.',  # Паттерн для поиска упоминаний рисунков
             'names': r'\b[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.|[А-ЯЁ]\.\s*[А-ЯЁ]\.\s+[А-ЯЁ][а-яё]+|[А-ЯЁ][а-яё]+\s+и\s+[А-ЯЁ][а-яё]+',  # Паттерн для поиска имен авторов
             'special_chars': r'[^\w\s.,!?;:()\-\"«»]',  # Паттерн для поиска специальных символов
-            'multiple_spaces': r'\s+',  # Паттерн для поиска множественных пробелов
-            'multiple_punctuation': r'\.{2,}|,{2,}|!{2,}|\?{2,}|;{2,}',  # Паттерн для поиска повторяющихся знаков препинания
-            'spaces_before_punctuation': r'\s+([.,!?;:])',  # Паттерн для поиска пробелов перед знаками препинания
-            'empty_lines': r'\n\s*\n',  # Паттерн для поиска пустых строк
+            'multiple_punctuation': r'([.,!?;])\1+',  # Паттерн для поиска повторяющихся знаков препинания
+            'spaces_before_punctuation': r'\s+(?=[.,!?;:])',  # Паттерн для поиска пробелов перед знаками препинания
+            'multiple_spaces': r'\s+',  # Паттерн для поиска множественных пробелов (и переносов строк)
             'dashes_underscores': r'[-_]+',  # Новый паттерн для тире и подчеркиваний
         }
+        # Шаблоны компилируются один раз; совместимые замены объединены в один проход
+        self.compiled = {name: re.compile(pattern) for name, pattern in self.patterns.items()}
+        self.compiled['separators'] = re.compile(f"{self.patterns['dashes_underscores']}|{self.patterns['special_chars']}")  # Тире, подчеркивания и спецсимволы
+        self.rules = [  # Этапы очистки в порядке выполнения: (название, функция)
+            ('literature', self.remove_literature_section),
+            ('figures', self.remove_figures),
+            ('names', self.remove_names),
+            ('separators', self.replace_separators),
+            ('multiple_punctuation', self.collapse_punctuation),
+            ('spaces', self.collapse_spaces),
+            ('strip', str.strip),
+        ]
+        self.revision = 1  # Версия логики очистки: увеличивается при изменении этапов (изменения шаблонов учитываются автоматически)
+
+    def get_version(self):  # Метод для получения версии очистки
+        """Версия очистки для кэша очищенного текста: ревизия и хеш шаблонов"""
+        patterns = '\x00'.join(f"{name}={pattern}" for name, pattern in sorted(self.patterns.items()))  # Шаблоны в постоянном порядке
+        return f"{self.revision}-{hashlib.sha256(patterns.encode('utf-8')).hexdigest()[:12]}"  # Ревизия и короткий хеш шаблонов
 
     def remove_literature_section(self, text):  # Метод для удаления раздела литературы
         """Удаление раздела литературы и всего после него"""
-        return re.split(self.patterns['literature'], text)[0]  # Разделяем текст по паттерну и берем первую часть
+        match = self.compiled['literature'].search(text)  # Ищем начало раздела литературы
+        return text[:match.start()] if match else text  # Берем текст до раздела (как первая часть re.split)
 
     def remove_figures(self, text):  # Метод для удаления упоминаний рисунков
         """Удаление упоминаний рисунков"""
-        return re.sub(self.patterns['figures'], '', text)  # Заменяем найденные упоминания рисунков на пустую строку
+        return self.compiled['figures'].sub('', text)  # Заменяем найденные упоминания рисунков на пустую строку
 
     def remove_names(self, text):  # Метод для удаления имен авторов
         """Удаление имен авторов в различных форматах"""
-        return re.sub(self.patterns['names'], '', text)  # Заменяем найденные имена на пустую строку
+        return self.compiled['names'].sub('', text)  # Заменяем найденные имена на пустую строку
+
+    def replace_separators(self, text):  # Метод для замены тире, подчеркиваний и специальных символов
+        """Замена тире, подчеркиваний и специальных символов пробелами за один проход"""
+        return self.compiled['separators'].sub(' ', text)  # Серия тире и подчеркиваний или спецсимвол становится пробелом
+
+    def collapse_punctuation(self, text):  # Метод для замены повторяющихся знаков препинания
+        """Замена повторяющихся знаков препинания одиночными"""
+        return self.compiled['multiple_punctuation'].sub(r'\1', text)  # Серия одинаковых знаков заменяется первым знаком
+
+    def collapse_spaces(self, text):  # Метод для нормализации пробелов
+        """Удаление пробелов перед знаками препинания и замена остальных пробельных серий одним пробелом"""
+        text = self.compiled['spaces_before_punctuation'].sub('', text)  # Удаляем пробелы перед знаками препинания
+        # Переносов строк после замены не остается, поэтому отдельные замены пустых строк и " ," не нужны
+        return self.compiled['multiple_spaces'].sub(' ', text)  # Заменяем пробельные серии одним пробелом
 
     def clean_text(self, text):  # Основной метод для очистки текста
         if not text:  # Проверка на пустой текст
             return text  # Возвращаем текст без изменений, если он пустой
         
         print("Начало очистки текста...")  # Вывод сообщения о начале очистки
-
-        # Удаление раздела литературы и всего после него
-        text = self.remove_literature_section(text)  # Вызываем метод для удаления раздела литературы
-
-        # Удаление упоминаний рисунков
-        text = self.remove_figures(text)  # Вызываем метод для удаления упоминаний рисунков
-
-        # Удаление имен авторов
-        text = self.remove_names(text)  # Вызываем метод для удаления имен авторов
-
-        # Удаление тире и подчеркиваний
-        text = re.sub(self.patterns['dashes_underscores'], ' ', text)  # Заменяем тире и подчеркивания на пробелы
-
-        # Удаление специальных символов
-        text = re.sub(self.patterns['special_chars'], ' ', text)  # Заменяем специальные символы на пробелы
-
-        # Замена множественных знаков препинания на одиночные
-        text = re.sub(self.patterns['multiple_punctuation'], lambda m: m.group()[0], text)  # Заменяем повторяющиеся знаки на один
-
-        # Удаление пробелов перед знаками препинания
-        text = re.sub(self.patterns['spaces_before_punctuation'], r'\1', text)  # Удаляем пробелы перед знаками препинания
-
-        # Удаление множественных пробелов и пустых строк
-        text = re.sub(self.patterns['multiple_spaces'], ' ', text)  # Заменяем множественные пробелы на один
-        text = re.sub(self.patterns['empty_lines'], '\n', text)  # Заменяем пустые строки на один перенос строки
-
-        # Дополнительная очистка
-        text = text.replace(' ,', ',')  # Удаляем пробел перед запятой
-        text = text.replace(' .', '.')  # Удаляем пробел перед точкой
-        text = text.replace(' !', '!')  # Удаляем пробел перед восклицательным знаком
-        text = text.replace(' ?', '?')  # Удаляем пробел перед вопросительным знаком
-        text = text.replace(' ;', ';')  # Удаляем пробел перед точкой с запятой
-        text = text.replace(' :', ':')  # Удаляем пробел перед двоеточием
-
-        # Удаление пробелов в начале и конце текста
-        text = text.strip()  # Удаляем пробелы в начале и конце текста
-
+        text = self.apply_patterns(text)  # Выполняем все этапы очистки
         print("Очистка текста завершена")  # Вывод сообщения о завершении очистки
         return text  # Возвращаем очищенный текст
 
+    def apply_patterns(self, text, timings=None, rules=None):  # Метод, выполняющий этапы очистки без вывода сообщений
+        """Все этапы очистки текста; timings - словарь для накопления времени каждого этапа (режим бенчмарка)"""
+        for name, rule in (rules or self.rules):  # Этапы выполняются в фиксированном порядке
+            if timings is None:
+                text = rule(text)
+            else:
+                started = time.perf_counter()  # Засекаем время этапа
+                text = rule(text)
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+        return text  # Возвращаем очищенный текст
+
+    def iter_clean(self, blocks):  # Метод для потоковой очистки текста, поступающего частями
+        """Очистка последовательности частей текста (страниц, абзацев); блоки выдаются готовыми к склейке без разделителя.
+
+        Шаблоны рисунков и имен захватывают переносы строк (например, "Иванов\nИ. И." на границе страниц), поэтому
+        они выполняются отдельными этапами: текст передается дальше только до границы строки, которую не пересекает
+        ни одно совпадение. Остальные этапы не выходят за пределы строки и выполняются для каждой части.
+        """
+        lines = self._iter_lines(blocks)  # Полные строки до раздела литературы
+        lines = self._iter_multiline(lines, 'figures', lookahead=1)  # "Рисунок" и номер могут быть на разных строках
+        lines = self._iter_multiline(lines, 'names', lookahead=2)  # Фамилия и инициалы могут занимать три строки
+        rules = [rule for rule in self.rules if rule[0] not in ('literature', 'figures', 'names')]
+        separator = ""  # Перед первым блоком пробел не нужен
+        for text in lines:
+            cleaned = self.apply_patterns(text, rules=rules)
+            if cleaned:
+                # Перенос строки при полной очистке становится пробелом, кроме пробела перед знаком препинания
+                yield (cleaned if cleaned[0] in '.,!?;:' else separator + cleaned)
+                separator = " "
+
+    def _iter_lines(self, blocks):  # Метод для разбиения потока частей на полные строки
+        """Полные строки текста (части соединяются без разделителя, как при извлечении всего документа) до раздела литературы"""
+        tail = ""  # Незавершенная строка из предыдущей части
+        for block in blocks:
+            text = tail + block
+            boundary = text.rfind('\n')
+            if boundary < 0:  # Полных строк пока нет
+                tail = text
+                continue
+            text, tail = text[:boundary + 1], text[boundary + 1:]
+            parts = self.compiled['literature'].split(text, maxsplit=1)  # Проверяем начало раздела литературы
+            yield parts[0]
+            if len(parts) > 1:  # Начался раздел литературы - остаток документа не нужен
+                return
+        if tail:  # Последняя строка документа
+            yield self.compiled['literature'].split(tail, maxsplit=1)[0]
+
+    def _iter_multiline(self, pieces, name, lookahead):  # Метод для потокового этапа с шаблоном через несколько строк
+        """Удаление совпадений шаблона name из потока частей, которые заканчиваются на границе строки.
+
+        lookahead - сколько непустых строк после границы может занять совпадение, начавшееся до нее. Граница
+        выбирается так, чтобы после нее оставалось столько полных непустых строк и ее не пересекало ни одно
+        совпадение: тогда удаление до границы не зависит от еще не полученного текста.
+        """
+        pattern = self.compiled[name]
+        buffer = ""  # Текст, который еще не передан дальше
+        for piece in pieces:
+            buffer += piece
+            cut = self._safe_cut(buffer, pattern, lookahead)
+            if cut:
+                yield pattern.sub('', buffer[:cut])
+                buffer = buffer[cut:]
+        if buffer:
+            yield pattern.sub('', buffer)
+
+    @staticmethod
+    def _safe_cut(text, pattern, lookahead):
+        """Начало строки, до которого текст можно очистить независимо от продолжения (0 - пока нельзя)"""
+        end = text.rfind('\n') + 1  # Конец полных строк
+        cut = end
+        remaining = lookahead
+        while cut > 0 and remaining:  # Отступаем на lookahead непустых строк от конца полных строк
+            line_end = cut
+            cut = text.rfind('\n', 0, line_end - 1) + 1
+            if text[cut:line_end].strip():
+                remaining -= 1
+        if remaining:
+            return 0
+        while cut > 0:
+            crossing = next((match for match in pattern.finditer(text, 0, end) if match.start() < cut < match.end()), None)
+            if crossing is None:
+                return cut
+            cut = text.rfind('\n', 0, crossing.start()) + 1  # Совпадение переносится целиком в следующую часть
+        return 0
+
     def clean_and_log(self, text):  # Метод для очистки с логированием
         """Метод для отладки с выводом информации о каждом этапе очистки"""
         print("Исходный размер текста:", len(text))  # Выводим размер исходного текста
@@ -86,13 +169,12 @@ class TextCleaner:  # Класс для очистки текста от нен
         text = self.remove_names(text)  # Удаляем имена авторов
         print("После удаления имен:", len(text))  # Выводим размер текста после удаления имен
         
-        text = re.sub(self.patterns['dashes_underscores'], ' ', text)  # Удаляем тире и подчеркивания
-        print("После удаления тире и подчеркиваний:", len(text))  # Выводим размер текста после удаления тире и подчеркиваний
-        
-        text = re.sub(self.patterns['special_chars'], ' ', text)  # Удаляем специальные символы
-        print("После удаления специальных символов:", len(text))  # Выводим размер текста после удаления специальных символов
+        text = self.replace_separators(text)  # Удаляем тире, подчеркивания и специальные символы
+        print("После удаления тире, подчеркиваний и специальных символов:", len(text))  # Выводим размер текста
         
-        text = self.clean_text(text)  # Выполняем полную очистку текста
+        # Повторная полная очистка: литература, рисунки и имена могут найтись заново после замены тире пробелами.
+        # Повторная замена тире и спецсимволов пропускается: после первой замены их в тексте не осталось
+        text = self.apply_patterns(text, rules=self.rules[:3] + self.rules[4:])  # Выполняем остальные этапы очистки
         print("Финальный размер текста:", len(text))  # Выводим размер финального текста
         
         return text  # Возвращаем очищенный текст
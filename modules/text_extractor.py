@@ -1,12 +1,96 @@
 import PyPDF2  # Библиотека для работы с PDF-файлами
-import docx    # Библиотека для работы с документами Microsoft Word
+import json    # Модуль для хранения границ страниц и отчета фильтра в кэше
 import os      # Модуль для работы с файловой системой и путями
+import time    # Модуль для замера времени извлечения страниц
+from concurrent.futures import ProcessPoolExecutor  # Пул процессов для параллельного извлечения страниц
+from .text_cache import TextCache  # Кэш извлеченного и очищенного текста
+from .docx_reader import iter_docx_text, is_docx  # Потоковое чтение документов Word (.docx)
+from .content_filter import ContentFilter  # Удаление колонтитулов, оглавления и таблиц с числами
+
+def extract_pdf_pages(file_path, start, end):  # Функция уровня модуля, чтобы ее можно было выполнить в другом процессе
+    """Извлечение текста страниц [start, end) с временем обработки каждой страницы"""
+    reader = PyPDF2.PdfReader(file_path)  # Каждый процесс открывает файл самостоятельно
+    pages = []  # Список (номер страницы, текст, время в секундах)
+    for index in range(start, end):  # Перебираем страницы диапазона
+        started = time.perf_counter()  # Засекаем время начала обработки страницы
+        text = reader.pages[index].extract_text()  # Извлекаем текст страницы
+        pages.append((index, text, time.perf_counter() - started))  # Сохраняем текст и время
+    return pages  # Возвращаем страницы диапазона
 
 class TextExtractor:  # Класс для извлечения текста из документов разных форматов
     def __init__(self, cleaner):  # Конструктор класса, принимает объект для очистки текста
         self.cleaner = cleaner    # Сохраняем объект cleaner как атрибут класса
+        env_workers = os.getenv('AI_PDF_WORKERS', '')  # Количество процессов из переменных окружения
+        self.pdf_workers = int(env_workers) if env_workers.isdigit() else (os.cpu_count() or 1)  # Процессов для извлечения PDF
+        self.min_parallel_pages = 8  # Документы короче обрабатываются в текущем процессе (запуск пула дороже)
+        self.pages_per_task = 4  # Минимальное количество страниц в одном задании пула
+        self.page_timings = []  # Время извлечения страниц последнего PDF: [(номер страницы, время, символов)]
+        self.version = 3  # Версия извлечения: увеличивается при изменении способа чтения файлов или записи кэша (сбрасывает кэш)
+        self.text_cache = TextCache()  # Кэш текста по отпечатку файла (путь, размер, время изменения, хеш содержимого)
+        self.content_filter = ContentFilter()  # Фильтр частей документа, не нужных ИИ (применяется перед очисткой)
+        self.page_offsets = {}  # Смещения начала страниц PDF в извлеченном тексте: {путь: [смещения]}
+        self.filter_reports = {}  # Отчеты фильтра содержимого по очищенным документам: {путь: отчет}
 
     def extract_raw_text(self, file_path):  # Основной метод для извлечения текста из файла
+        """Извлечение текста из файла (повторно разобранный файл берется из кэша вместе с границами страниц)"""
+        entry = self.text_cache.get_or_compute(file_path, 'raw', self.version,
+                                               lambda: self._make_raw_entry(file_path, self._extract_raw_text(file_path)))
+        return self._load_raw_entry(file_path, entry)
+
+    def _make_raw_entry(self, file_path, text):  # Метод для подготовки записи кэша извлеченного текста
+        """Запись кэша: текст и смещения страниц PDF в одной записи (None, если текст не извлечен)"""
+        if not text:
+            return None
+        return json.dumps({'text': text, 'pages': self.page_offsets.get(os.path.abspath(file_path))}, ensure_ascii=False)
+
+    def _load_raw_entry(self, file_path, entry):  # Метод для разбора записи кэша извлеченного текста
+        """Текст из записи кэша; смещения страниц запоминаются для фильтра колонтитулов"""
+        if entry is None:
+            return None
+        entry = json.loads(entry)
+        if entry.get('pages') is not None:
+            self.page_offsets[os.path.abspath(file_path)] = entry['pages']
+        return entry['text']
+
+    def extract_clean_text(self, file_path, raw_text=None, method='clean_text'):  # Метод для получения очищенного текста
+        """Очищенный текст файла из кэша или результат фильтрации содержимого и очистки методом очистителя method"""
+        version = f"{self.version}:{self.content_filter.get_version()}:{self.cleaner.get_version()}:{method}"  # Зависит от всех этапов
+        path = os.path.abspath(file_path)
+        self.filter_reports.pop(path, None)
+        def compute():  # Фильтрация и очистка выполняются только при промахе кэша
+            text = raw_text if raw_text is not None else self.extract_raw_text(file_path)  # Исходный текст
+            if not text:  # Текст не извлечен
+                return text
+            text, report = self.content_filter.filter(text, self.get_page_offsets(file_path))  # Удаляем колонтитулы, оглавление, таблицы
+            if report:  # Отчет сохраняется вместе с текстом, чтобы выводиться и при повторной обработке
+                self.filter_reports[path] = report
+                self.text_cache.store(file_path, 'filter_report', version, json.dumps(report))
+            return getattr(self.cleaner, method)(text)
+        text = self.text_cache.get_or_compute(file_path, 'clean', version, compute)
+        if path not in self.filter_reports and text and self.content_filter.enabled:  # Очищенный текст взят из кэша
+            report = self.text_cache.lookup(file_path, 'filter_report', version)
+            if report:
+                self.filter_reports[path] = json.loads(report)
+        return text
+
+    def get_filter_report(self, file_path):  # Метод для получения отчета фильтра содержимого
+        """Отчет фильтра содержимого для очищенного документа или None"""
+        return self.filter_reports.get(os.path.abspath(file_path))
+
+    def get_page_offsets(self, file_path):  # Метод для получения границ страниц PDF
+        """Смещения начала страниц в извлеченном тексте PDF (None для других форматов)"""
+        if os.path.splitext(file_path)[1].lower() != '.pdf':  # Страницы есть только у PDF
+            return None
+        path = os.path.abspath(file_path)
+        if path not in self.page_offsets:  # Текст извлекался в другом запуске - границы хранятся в записи извлеченного текста
+            entry = self.text_cache.lookup(file_path, 'raw', self.version)
+            if entry is not None:
+                self._load_raw_entry(file_path, entry)
+            else:  # Записи нет в кэше - извлекаем текст (запись сохраняется вместе с границами)
+                self.extract_raw_text(file_path)
+        return self.page_offsets.get(path)
+
+    def _extract_raw_text(self, file_path):  # Метод для извлечения текста из файла без кэша
         """Извлечение текста из файла"""
         try:  # Начало блока обработки исключений
             file_extension = os.path.splitext(file_path)[1].lower()  # Получаем расширение файла в нижнем регистре
@@ -22,27 +106,107 @@ class TextExtractor:  # Класс для извлечения текста из
             print(f"Ошибка при извлечении текста: {str(e)}")  # Выводим сообщение об ошибке
             return None  # Возвращаем None при возникновении ошибки
 
+    def iter_raw_text(self, file_path):  # Метод для потокового извлечения текста
+        """Извлечение текста по частям: страницы PDF или абзацы Word выдаются по мере чтения (ошибка чтения передается дальше)"""
+        file_extension = os.path.splitext(file_path)[1].lower()  # Получаем расширение файла в нижнем регистре
+        cache = self.text_cache  # Кэш извлеченного текста
+        key = None  # Ключ записи кэша извлеченного текста
+        try:  # Файл недоступен - ошибка будет выведена при чтении
+            key = cache.make_key(file_path, 'raw', self.version) if cache.enabled else None
+        except OSError:
+            pass
+        entry = cache.get(key) if key else None
+        if entry is not None:  # Файл уже разбирался - текст выдается без разбора (PDF - по страницам)
+            cached = self._load_raw_entry(file_path, entry)
+            offsets = (self.page_offsets.get(os.path.abspath(file_path)) if file_extension == '.pdf' else None) or [0]
+            offsets = offsets + [len(cached)]
+            for start, end in zip(offsets, offsets[1:]):
+                yield cached[start:end]
+            return
+        parts = []  # Части текста для сохранения в кэш после полного чтения файла
+        try:  # Начало блока обработки исключений
+            for part in self._iter_raw_parts(file_path, file_extension):  # Перебираем части по мере чтения
+                parts.append(part)
+                yield part
+        except Exception as e:  # Обрабатываем любые исключения
+            print(f"Ошибка при извлечении текста: {str(e)}")  # Выводим сообщение об ошибке
+            raise  # Часть текста уже выдана - документ, прочитанный не полностью, не должен считаться обработанным
+        if file_extension == '.pdf':  # Границы страниц для фильтра колонтитулов
+            self._save_page_offsets(file_path, [len(part) for part in parts])
+        if key:  # Файл прочитан полностью - сохраняем текст в том же виде, что и extract_raw_text
+            cache.put(key, self._make_raw_entry(file_path, "".join(parts)))
+
+    def _iter_raw_parts(self, file_path, file_extension):  # Метод для чтения частей файла без кэша
+        """Страницы PDF или абзацы Word по мере чтения"""
+        if file_extension == '.pdf':  # Если файл имеет расширение PDF
+            with open(file_path, 'rb') as file:  # Файл остается открытым, пока читаются страницы
+                for page in PyPDF2.PdfReader(file).pages:  # Страница разбирается только при запросе следующей части
+                    yield page.extract_text()  # Выдаем текст страницы
+        elif file_extension in ['.doc', '.docx']:  # Если файл имеет расширение Word
+            if self._check_word_format(file_path):  # Документ в формате OOXML
+                yield from iter_docx_text(file_path)  # Выдаем абзацы и строки таблиц по мере разбора
+        else:  # Если расширение не поддерживается
+            print(f"Неподдерживаемый формат файла: {file_extension}")  # Выводим сообщение об ошибке
+
     def _extract_from_pdf(self, file_path):  # Приватный метод для извлечения текста из PDF
         """Извлечение текста из PDF"""
         try:  # Начало блока обработки исключений
-            with open(file_path, 'rb') as file:  # Открываем файл в бинарном режиме
-                reader = PyPDF2.PdfReader(file)  # Создаем объект для чтения PDF
-                text = ""  # Инициализируем пустую строку для текста
-                for page in reader.pages:  # Перебираем все страницы документа
-                    text += page.extract_text()  # Извлекаем текст с каждой страницы
-                return text  # Возвращаем весь извлеченный текст
+            started = time.perf_counter()  # Засекаем общее время извлечения
+            page_count = len(PyPDF2.PdfReader(file_path).pages)  # Количество страниц документа
+            workers = min(self.pdf_workers, page_count // self.pages_per_task)  # Не запускаем процессы без работы
+            if page_count < self.min_parallel_pages or workers <= 1:  # Короткий документ или один процессор
+                workers = 1
+                pages = extract_pdf_pages(file_path, 0, page_count)  # Извлекаем все страницы в текущем процессе
+            else:
+                # Делим документ на диапазоны страниц: по несколько диапазонов на процесс для равномерной загрузки
+                step = max(self.pages_per_task, -(-page_count // (workers * 4)))
+                ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+                pages = []
+                with ProcessPoolExecutor(max_workers=workers) as executor:  # Пул процессов для извлечения
+                    futures = [executor.submit(extract_pdf_pages, file_path, start, end) for start, end in ranges]
+                    for future in futures:  # Результаты собираем в порядке страниц
+                        pages.extend(future.result())
+            self.page_timings = [(index + 1, seconds, len(text)) for index, text, seconds in pages]  # Время каждой страницы
+            self._save_page_offsets(file_path, [len(text) for _, text, _ in pages])  # Границы страниц для фильтра колонтитулов
+            self.report_page_timings(time.perf_counter() - started, workers)  # Выводим время извлечения страниц
+            return "".join(text for _, text, _ in pages)  # Соединяем текст страниц один раз
         except Exception as e:  # Обрабатываем исключения при чтении PDF
             print(f"Ошибка при чтении PDF: {str(e)}")  # Выводим сообщение об ошибке
             return None  # Возвращаем None при ошибке
 
+    def _save_page_offsets(self, file_path, page_lengths):  # Метод для сохранения границ страниц PDF
+        """Сохранение смещений начала страниц по их длинам"""
+        offsets = []  # Смещения начала страниц
+        position = 0
+        for length in page_lengths:
+            offsets.append(position)
+            position += length
+        self.page_offsets[os.path.abspath(file_path)] = offsets  # В кэш границы попадают вместе с извлеченным текстом
+
+    def report_page_timings(self, total_seconds, workers=1, slowest=3):  # Метод для вывода времени извлечения страниц
+        """Краткий отчет о времени извлечения страниц последнего PDF"""
+        if not self.page_timings:  # Если страниц нет
+            return  # Отчет не выводится
+        pages_seconds = sum(seconds for _, seconds, _ in self.page_timings)  # Суммарное время по страницам
+        slow_pages = sorted(self.page_timings, key=lambda page: page[1], reverse=True)[:slowest]  # Самые медленные страницы
+        slow_text = ", ".join(f"стр. {number} ({seconds:.2f} с)" for number, seconds, _ in slow_pages)
+        print(f"PDF: {len(self.page_timings)} страниц за {total_seconds:.2f} с (процессов: {workers}, "
+              f"сумма по страницам {pages_seconds:.2f} с, в среднем {pages_seconds / len(self.page_timings):.3f} с). "
+              f"Самые медленные: {slow_text}")
+
+    def _check_word_format(self, file_path):  # Метод для проверки формата документа Word
+        """Проверка, что документ Word сохранен в формате .docx (OOXML)"""
+        if is_docx(file_path):  # Zip-архив с word/document.xml (в том числе .docx с расширением .doc)
+            return True
+        print(f"Формат Word 97-2003 (.doc) не поддерживается: сохраните {os.path.basename(file_path)} в формате .docx")  # Выводим сообщение об ошибке
+        return False
+
     def _extract_from_word(self, file_path):  # Приватный метод для извлечения текста из Word
-        """Извлечение текста из Word"""
+        """Извлечение текста из Word: абзацы, таблицы и сноски в порядке документа"""
         try:  # Начало блока обработки исключений
-            doc = docx.Document(file_path)  # Создаем объект Document для работы с Word
-            text = ""  # Инициализируем пустую строку для текста
-            for paragraph in doc.paragraphs:  # Перебираем все абзацы в документе
-                text += paragraph.text + "\n"  # Добавляем текст абзаца и перенос строки
-            return text  # Возвращаем весь извлеченный текст
+            if not self._check_word_format(file_path):  # Двоичный формат .doc прочитать нельзя
+                return None  # Возвращаем None при неподдерживаемом формате
+            return "".join(iter_docx_text(file_path))  # Соединяем абзацы один раз
         except Exception as e:  # Обрабатываем исключения при чтении Word
             print(f"Ошибка при чтении Word: {str(e)}")  # Выводим сообщение об ошибке
             return None  # Возвращаем None при ошибке
@@ -0,0 +1,113 @@
+import json  # Модуль для работы с JSON
+import os  # Модуль для работы с файловой системой
+import threading  # Модуль для синхронизации потоков
+
+class TokenBudgetPlanner:  # Класс для расчета размера фрагментов по бюджету токенов модели
+    def __init__(self, count_tokens, stats_path='cache/token_budget.json', endpoint=None):  # Конструктор класса, принимает функцию подсчета токенов
+        self.count_tokens = count_tokens  # Функция подсчета токенов: count_tokens(text, model_name)
+        self.stats_path = stats_path  # Файл с наблюдаемыми размерами ответов между запусками
+        self.endpoint = endpoint or 'default'  # Адрес API: наблюдения тестового сервера не смешиваются с настоящим API
+        self.default_output_ratio = 0.6  # Ожидаемое отношение токенов ответа к токенам фрагмента, пока нет наблюдений
+        self.min_samples = 3  # Сколько наблюдений нужно, чтобы доверять статистике
+        self.max_samples = 200  # Сколько последних наблюдений хранится для каждой модели
+        self.safety_margin = 0.05  # Доля контекстного окна, которая остается свободной
+        self.min_chunk_tokens = 500  # Минимальный размер фрагмента в токенах
+        self.max_chunk_tokens = 12000  # Максимальный размер фрагмента в токенах, как бы ни были малы наблюдаемые ответы
+        self.save_every = 20  # Через сколько новых наблюдений статистика сохраняется на диск
+        self.unsaved = 0  # Наблюдения, еще не сохраненные на диск
+        self.message_overhead = 4  # Служебные токены на каждое сообщение чата
+        self.overheads = {}  # Токены шаблона промта {(модель, область): количество}
+        self.ratios = self._load_ratios()  # Наблюдаемые отношения ответ/фрагмент {'адрес API|модель|область': [отношения]}
+        self.lock = threading.Lock()  # Блокировка для обновления статистики из разных потоков
+        self.reset_run()
+
+    def _load_ratios(self):
+        """Загрузка наблюдений предыдущих запусков"""
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        except Exception as e:
+            print(f"Ошибка при чтении статистики токенов: {str(e)}")
+            return {}
+
+    def _save_ratios(self):
+        """Сохранение наблюдений (вызывается под блокировкой)"""
+        try:
+            os.makedirs(os.path.dirname(self.stats_path) or '.', exist_ok=True)
+            tmp_path = f"{self.stats_path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Пишем во временный файл, чтобы не оставить битую статистику
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.ratios, file)
+            os.replace(tmp_path, self.stats_path)
+            self.unsaved = 0
+        except Exception as e:
+            print(f"Ошибка при сохранении статистики токенов: {str(e)}")
+
+    def save(self):
+        """Сохранение несохраненных наблюдений (в конце запуска)"""
+        with self.lock:
+            if self.unsaved:
+                self._save_ratios()
+
+    def stats_key(self, model_name, domain):
+        """Ключ наблюдений: адрес API, модель и область"""
+        return f"{self.endpoint}|{model_name}|{domain}"
+
+    def prompt_overhead(self, model_name, domain, messages):
+        """Токены шаблона промта без текста фрагмента (считаются один раз для модели и области)"""
+        key = (model_name, domain)
+        if key not in self.overheads:
+            tokens = sum(self.count_tokens(message['content'], model_name) + self.message_overhead for message in messages)
+            self.overheads[key] = tokens + 3  # Токены начала ответа ассистента
+        return self.overheads[key]
+
+    def output_ratio(self, model_name, domain):
+        """Ожидаемое отношение токенов ответа к токенам фрагмента (90-й перцентиль наблюдений)"""
+        with self.lock:
+            ratios = sorted(self.ratios.get(self.stats_key(model_name, domain), []))
+        if len(ratios) < self.min_samples:
+            return self.default_output_ratio
+        return max(ratios[int(0.9 * (len(ratios) - 1))], 0.05)
+
+    def plan_chunk_tokens(self, model_name, domain, messages, context_limit, max_output_tokens, reserved_tokens=0):
+        """Максимальный размер фрагмента, при котором промт, фрагмент и ожидаемый ответ помещаются в контекст
+
+        reserved_tokens - токены, которые добавляются к промту вместе с фрагментом (список известных терминов).
+        """
+        overhead = self.prompt_overhead(model_name, domain, messages) + reserved_tokens
+        ratio = self.output_ratio(model_name, domain)
+        # Фрагмент + шаблон + ожидаемый ответ должны поместиться в контекстное окно
+        by_context = (context_limit * (1 - self.safety_margin) - overhead) / (1 + ratio)
+        # Ожидаемый ответ должен поместиться в ограничение max_tokens
+        by_output = max_output_tokens / ratio
+        return max(self.min_chunk_tokens, int(min(by_context, by_output, self.max_chunk_tokens)))
+
+    def record(self, model_name, domain, payload_tokens, output_tokens):
+        """Учет выполненного запроса: токены шаблона, текста фрагмента и ответа"""
+        with self.lock:
+            self.run['requests'] += 1
+            self.run['overhead_tokens'] += self.overheads.get((model_name, domain), 0)
+            self.run['payload_tokens'] += payload_tokens
+            self.run['output_tokens'] += output_tokens
+            if payload_tokens > 0:
+                ratios = self.ratios.setdefault(self.stats_key(model_name, domain), [])
+                ratios.append(round(output_tokens / payload_tokens, 4))
+                del ratios[:-self.max_samples]
+                self.unsaved += 1
+                if self.unsaved >= self.save_every:  # Диск не переписывается после каждого запроса
+                    self._save_ratios()
+
+    def reset_run(self):
+        """Сброс статистики текущего запуска"""
+        self.run = {'requests': 0, 'overhead_tokens': 0, 'payload_tokens': 0, 'output_tokens': 0}
+
+    def report(self):
+        """Вывод распределения токенов за запуск"""
+        run = self.run
+        if not run['requests']:
+            return
+        input_tokens = run['overhead_tokens'] + run['payload_tokens']
+        share = run['overhead_tokens'] / input_tokens if input_tokens else 0
+        print(f"Токены за запуск: запросов {run['requests']}, шаблон промта {run['overhead_tokens']} ({share:.0%} входа), "
+              f"текст документа {run['payload_tokens']}, ответ {run['output_tokens']}")
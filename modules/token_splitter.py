@@ -0,0 +1,112 @@
+import bisect  # Модуль для двоичного поиска в отсортированных списках
+import re  # Модуль регулярных выражений
+from functools import lru_cache  # Декоратор для кэширования результатов функций
+import tiktoken  # Библиотека для подсчета токенов
+
+# Конец предложения: знак препинания, за которым следует пробельный символ
+SENTENCE_END_PATTERN = re.compile(r'[.!?…](?=\s)')
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name):
+    """Получение кодировщика токенов для модели (создается один раз для каждой модели)"""
+    try:
+        if model_name and "gpt-4" in model_name:
+            return tiktoken.encoding_for_model("gpt-4")
+        return tiktoken.get_encoding("cl100k_base")  # Базовая кодировка для DeepSeek и остальных моделей
+    except Exception as e:
+        print(f"Ошибка при загрузке кодировщика токенов: {e}. Используется оценка 1 токен ~ 4 символа")
+        return None
+
+class TokenSplitter:  # Класс для разбиения текста на фрагменты по смещениям токенов
+    def __init__(self, model_name="gpt-4o"):  # Конструктор класса
+        self.model_name = model_name  # Имя модели, для которой считаются токены
+        self.encoding = get_encoding(model_name)  # Кэшированный кодировщик (None - используется оценка по символам)
+
+    def count_tokens(self, text):
+        """Подсчет количества токенов в тексте"""
+        if self.encoding is None:
+            return len(text) // 4  # Примерная оценка (1 токен ~ 4 символа)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def token_offsets(self, text):
+        """Смещения (в символах) начала каждого токена текста; текст кодируется один раз"""
+        if self.encoding is None:
+            return list(range(0, len(text), 4))
+        tokens = self.encoding.encode(text, disallowed_special=())
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        return offsets
+
+    @staticmethod
+    def _find_boundary(text, start, limit):
+        """Поиск наиболее подходящей границы фрагмента в диапазоне [start, limit)"""
+        # Граница абзаца
+        boundary = text.rfind('\n\n', start, limit)
+        if boundary > start:
+            return boundary
+        # Граница предложения (последнее совпадение в диапазоне)
+        boundary = -1
+        for match in SENTENCE_END_PATTERN.finditer(text, start, limit):
+            boundary = match.end()
+        if boundary > start:
+            return boundary
+        # Граница слова
+        boundary = max(text.rfind(' ', start, limit), text.rfind('\n', start, limit))
+        if boundary > start:
+            return boundary
+        # Подходящей границы нет - режем по токену
+        return limit
+
+    def split(self, text, max_tokens=4000):
+        """Разделение текста на фрагменты не длиннее max_tokens токенов по границам абзацев, предложений или слов"""
+        if not text:
+            return []
+
+        offsets = self.token_offsets(text)
+        if len(offsets) <= max_tokens:  # Текст помещается в лимит целиком
+            return [text]
+
+        chunks = []
+        position = 0  # Позиция начала текущего фрагмента в символах
+        token_index = 0  # Индекс первого токена текущего фрагмента
+        text_length = len(text)
+
+        while token_index < len(offsets):
+            end_index = token_index + max_tokens
+            if end_index >= len(offsets):  # Остаток текста помещается в один фрагмент
+                chunk = text[position:].strip()
+                if chunk:
+                    chunks.append(chunk)
+                break
+
+            limit = max(offsets[end_index], position + 1)  # Фрагмент всегда продвигается хотя бы на один символ
+            boundary = self._find_boundary(text, position, limit)
+            chunk = text[position:boundary].strip()
+            if chunk:
+                chunks.append(chunk)
+
+            # Пропускаем пробельные символы между фрагментами
+            position = boundary
+            while position < text_length and text[position].isspace():
+                position += 1
+            token_index = bisect.bisect_left(offsets, position)
+
+        return chunks
+
+    def iter_split(self, blocks, max_tokens=4000, separator=''):
+        """Потоковое разделение: фрагменты выдаются, как только за ними накоплен следующий текст"""
+        buffer = ""  # Текст, еще не выданный во фрагментах
+        next_check = max_tokens * 8  # Длина буфера в символах, при которой выполняется разбиение
+        for block in blocks:
+            buffer = f"{buffer}{separator}{block}" if buffer else block.lstrip()
+            if len(buffer) < next_check:  # Буфер заведомо помещается в фрагмент - токены не считаем
+                continue
+            chunks = self.split(buffer, max_tokens)
+            if len(chunks) <= 1:  # Текст плотный по символам - ждем следующих блоков
+                next_check = len(buffer) * 2
+                continue
+            # Последний фрагмент может продолжиться в следующих блоках - оставляем его в буфере
+            yield from chunks[:-1]
+            buffer = chunks[-1]
+            next_check = max_tokens * 8
+        if buffer:
+            yield from self.split(buffer, max_tokens)